@@ -1,8 +1,24 @@
-import pandas as pd
+from __future__ import annotations  # คำอธิบายชนิด pd.DataFrame ไม่ต้อง import pandas ตอนโหลดโมดูล
+
+import numpy as np
 import time
 import os
-import matplotlib.pyplot as plt
-from typing import Tuple
+import sys
+from typing import TYPE_CHECKING, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # BoxLoader core modules
+from extreme_points import ExtremePointIndex, box_corners
+from spatial_index import SpatialIndex
+from scoring import placement_scores, best_index
+from loader import read_order, log_bad_rows
+from placement_cache import fingerprint
+from feasibility import TABLE
+from metrics import plan_metrics
+from kernels import PackedBoxes, fit_mask
+from exporter import Placements, PIPELINE_CONVENTION, ROBOT_CONVENTION, export_placements
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ===== PARAMETERS =====
 CONTAINER_SPECS = {
@@ -14,109 +30,190 @@ CONTAINER_SPECS = {
 GAP = 5  # default gap (can be updated dynamically)
 
 # ===== CORE ALGORITHM =====
-def is_colliding(candidate, placed_boxes):
-    for box in placed_boxes:
-        if not (
-            candidate["X"] + candidate["Length"] <= box["X"] or
-            candidate["X"] >= box["X"] + box["Length"] or
-            candidate["Y"] + candidate["Width"] <= box["Y"] or
-            candidate["Y"] >= box["Y"] + box["Width"] or
-            candidate["Z"] + candidate["Height"] <= box["Z"] or
-            candidate["Z"] >= box["Z"] + box["Height"]
-        ):
-            return True
-    return False
-
-def is_supported_multibox(x, y, z, box_L, box_W, placed_boxes):
-    com_x = x + box_L / 2
-    com_y = y + box_W / 2
+def create_candidate_index(container_dims, floor_step=50):
+    # จุดเริ่มต้นบนพื้นทุก floor_step มม.; มุมของกล่องที่วางแล้วจะถูกเพิ่มทีละกล่องผ่าน add_placed_box
+    index = ExtremePointIndex(bounds=container_dims)
+    for x in range(0, container_dims[0], floor_step):
+        for y in range(0, container_dims[1], floor_step):
+            index.add_point(x, y, 0)
+    return index
+
+def add_placed_box(index, box):
+    x, y, z = box["X"], box["Y"], box["Z"]
+    L, W, H = box["Length"], box["Width"], box["Height"]
+    index.add_box(x, y, z, L, W, H, box_corners(x, y, z, L, W, H))
+
+def support_area(x, y, z, box_L, box_W, placed_boxes):
     if z == 0:
-        return True
-    support_area = 0
+        return box_L * box_W
+    area = 0
     for b in placed_boxes:
         if abs(b["Z"] + b["Height"] - z) < 1e-6:
-            if b["X"] <= com_x <= b["X"] + b["Length"] and b["Y"] <= com_y <= b["Y"] + b["Width"]:
-                return True
             overlap_x = max(0, min(x + box_L, b["X"] + b["Length"]) - max(x, b["X"]))
             overlap_y = max(0, min(y + box_W, b["Y"] + b["Width"]) - max(y, b["Y"]))
-            support_area += overlap_x * overlap_y
-    return support_area >= (box_L * box_W * 0.5)
-
-def generate_candidate_positions_with_floor(placed_boxes, gap, container_dims):
-    candidates = set()
-    for x in range(0, container_dims[0], 50):
-        for y in range(0, container_dims[1], 50):
-            candidates.add((x, y, 0))
-    for b in placed_boxes:
-        for dx in [0, b["Length"]]:
-            for dy in [0, b["Width"]]:
-                for dz in [0, b["Height"]]:
-                    x = b["X"] + dx
-                    y = b["Y"] + dy
-                    z = b["Z"] + dz
-                    if 0 <= x < container_dims[0] and 0 <= y < container_dims[1] and 0 <= z < container_dims[2]:
-                        candidates.add((x, y, z))
-    return sorted(list(candidates), key=lambda pos: (pos[2], pos[1], pos[0]))
-
-def greedy_surface_fit(df: pd.DataFrame, container_dims: Tuple[int, int, int], gap: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+            area += overlap_x * overlap_y
+    return area
+
+def edge_contact(x, y, z, box_L, box_W, box_H, container_dims, nearby_boxes):
+    # สัดส่วนด้าน (ซ้าย ขวา หน้า หลัง) ที่ชิดผนังหรือชิดกล่องข้างเคียง
+    flush = [x == 0, x + box_L == container_dims[0], y == 0, y + box_W == container_dims[1]]
+    for b in nearby_boxes:
+        if b["Z"] >= z + box_H or b["Z"] + b["Height"] <= z:
+            continue
+        overlap_y = b["Y"] < y + box_W and y < b["Y"] + b["Width"]
+        overlap_x = b["X"] < x + box_L and x < b["X"] + b["Length"]
+        flush[0] |= overlap_y and b["X"] + b["Length"] == x
+        flush[1] |= overlap_y and b["X"] == x + box_L
+        flush[2] |= overlap_x and b["Y"] + b["Width"] == y
+        flush[3] |= overlap_x and b["Y"] == y + box_W
+    return sum(flush) / 4
+
+def fit_nearby(index, packed, points, dims, container_dims, first_only=False):
+    # kernels.fit_mask ทีละกลุ่มของจุดที่มุมอยู่ในช่อง grid เดียวกันของ SpatialIndex โดยตรวจเฉพาะกล่องใกล้เคียง
+    # (กล่องที่ชนหรือรองรับฐานต้องซ้อนทับฐานบนระนาบ จึงอยู่ในช่องที่ฐานครอบคลุมเสมอ)
+    mask = np.zeros(len(points), dtype=bool)
+    inside = np.flatnonzero((points[:, 0] + dims[0] <= container_dims[0]) & (points[:, 1] + dims[1] <= container_dims[1])
+                            & (points[:, 2] + dims[2] <= container_dims[2]))
+    first = len(points)
+    for rows, ids in sorted(index.nearby_groups(points[inside, 0], points[inside, 1], dims[0], dims[1]),
+                            key=lambda group: group[0][0]):
+        rows = inside[rows]
+        if rows[0] > first:
+            break  # first_only: กลุ่มที่เหลือเริ่มหลังตำแหน่งแรกที่พบแล้ว
+        found = fit_mask(packed.boxes[ids], points[rows], dims, container_dims, first_only)
+        mask[rows] = found
+        if first_only and found.any():
+            first = min(first, rows[found.argmax()])
+    if first_only and mask.any():
+        mask[first + 1:] = False
+    return mask
+
+def find_first_fit(candidates, index, packed, dims, container_dims):
+    # ตรวจทุกจุดพร้อมกันด้วย fit_nearby: ไม่ชนกล่องอื่น และฐานวางบนกล่องด้านล่างอย่างน้อยครึ่งหนึ่งหรือจุดศูนย์กลาง
+    points = candidates.as_array()
+    mask = fit_nearby(index, packed, points, dims, container_dims, first_only=True)
+    if not mask.any():
+        return None
+    x, y, z = points[mask.argmax()].tolist()
+    return x, y, z, dims
+
+def find_best_fit(candidates, index, packed, orientations, container_dims):
+    # ประเมินทุกตำแหน่งที่วางได้ของทุกแนวการหมุน แล้วเลือกคะแนนสูงสุด (contact, edge waste, max height)
+    points = candidates.as_array()
+    masks = [fit_nearby(index, packed, points, dims, container_dims) for dims in orientations]
+    found, contact, edge, top = [], [], [], []
+    for i in np.flatnonzero(np.logical_or.reduce(masks)):
+        x, y, z = points[i].tolist()
+        for mask, (box_L, box_W, box_H) in zip(masks, orientations):
+            if not mask[i]:
+                continue
+            below = index.resting_on(z, x, y, box_L, box_W)
+            found.append((x, y, z, (box_L, box_W, box_H)))
+            contact.append(min(1.0, support_area(x, y, z, box_L, box_W, below) / (box_L * box_W)))
+            edge.append(edge_contact(x, y, z, box_L, box_W, box_H, container_dims, index.nearby(x, y, box_L, box_W)))
+            top.append(z + box_H)
+    k = best_index(placement_scores(contact, edge, top, container_dims[2]))
+    return None if k is None else found[k]
+
+def greedy_surface_fit(df: pd.DataFrame, container_dims: Tuple[int, int, int], gap: int,
+                       strategy: str = "first_fit", cache=None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # strategy: "first_fit" = ตำแหน่งแรกที่วางได้, "best_fit" = ลองทั้ง L×W และ W×L แล้วเลือกคะแนนสูงสุด
+    # ไม่ตรวจน้ำหนัก (Weight / Max weight) ของกล่องที่วางซ้อนกัน ต่างจาก HeightmapEngine ของ BoxLoader
+    # cache: PlacementCache (ถ้ามี) คืนผลเดิมทันทีเมื่อรายการกล่อง ขนาดตู้ gap และ strategy เหมือนเดิม
+    import pandas as pd  # โหลดเมื่อสร้าง DataFrame เท่านั้น (การ import โมดูลนี้จึงไม่ต้องรอ pandas)
+    key = None
+    if cache is not None:
+        ordered = df.sort_values("Priority", kind="stable")  # ลำดับเดียวกับที่ใช้วาง
+        key = fingerprint("pipeline", list(ordered.columns), ordered.values.tolist(), container_dims, gap, strategy)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0].copy(), cached[1].copy()
     placed, roller = [], []
+    candidates = create_candidate_index(container_dims)
+    index = SpatialIndex(cell_size=250)  # ใช้หากล่องใกล้เคียงแทนการวนทุกกล่องใน placed
+    packed = PackedBoxes()  # พิกัดของกล่องที่วางแล้วแบบ array (แถวที่ i คือกล่องที่ i ใน index) สำหรับ fit_mask
     for priority in sorted(df["Priority"].unique()):
         df_priority = df[df["Priority"] == priority]
-        for _, row in df_priority.iterrows():
-            for _ in range(int(row["QTY"])):  # ใช้ QTY เพื่อเพิ่มจำนวนกล่อง
-                box_L = int(row["Length"] + gap)
-                box_W = int(row["Width"] + gap)
-                box_H = int(row["Height"] + gap)
-                candidates = generate_candidate_positions_with_floor(placed, gap, container_dims)
-                placed_flag = False
-                for x, y, z in candidates:
-                    if x + box_L > container_dims[0] or y + box_W > container_dims[1] or z + box_H > container_dims[2]:
-                        continue
-                    candidate_box = {"X": x, "Y": y, "Z": z, "Length": box_L, "Width": box_W, "Height": box_H}
-                    if not is_colliding(candidate_box, placed) and is_supported_multibox(x, y, z, box_L, box_W, placed):
-                        candidate_box.update({"SKU": row["BoxTypes"], "Priority": row["Priority"]})
-                        placed.append(candidate_box)
-                        placed_flag = True
-                        break
-                if not placed_flag:
-                    roller.append(row.to_dict())
+        for row in df_priority.to_dict("records"):  # dict ต่อแถว (เร็วกว่า iterrows ที่สร้าง Series ทุกแถว)
+            box_L = int(row["Length"] + gap)
+            box_W = int(row["Width"] + gap)
+            box_H = int(row["Height"] + gap)
+            orientations = list(dict.fromkeys([(box_L, box_W, box_H), (box_W, box_L, box_H)]))
+            if strategy != "best_fit":
+                orientations = orientations[:1]
+            # ตาราง feasibility: SKU ที่ใหญ่กว่าตู้ทุกแนวการหมุนไป free roller ทั้งแถวโดยไม่ต้องค้นหา
+            if TABLE.lookup(row["BoxTypes"], orientations, container_dims, gap, grid=False).best is None:
+                roller.extend([row] * int(row["QTY"]))
+                continue
+            for unit in range(int(row["QTY"])):  # ใช้ QTY เพื่อเพิ่มจำนวนกล่อง
+                if strategy == "best_fit":
+                    found = find_best_fit(candidates, index, packed, orientations, container_dims)
+                else:
+                    found = find_first_fit(candidates, index, packed, orientations[0], container_dims)
+                if found is None:  # ไม่มีกล่องใหม่ ชิ้นที่เหลือของแถวนี้จึงวางไม่ได้เช่นกัน
+                    roller.extend([row] * (int(row["QTY"]) - unit))
+                    break
+                x, y, z, (L, W, H) = found
+                candidate_box = {"X": x, "Y": y, "Z": z, "Length": L, "Width": W, "Height": H,
+                                 "SKU": row["BoxTypes"], "Priority": row["Priority"]}
+                placed.append(candidate_box)
+                add_placed_box(candidates, candidate_box)
+                index.insert(candidate_box, x, y, z, L, W, H)
+                packed.append(x, y, z, L, W, H)
     df_placed = pd.DataFrame(placed)
-    df_unplaced = pd.DataFrame(roller)
-    df_placed["Z"] = df_placed["Z"] + df_placed["Height"]  # convert to top of box
+    df_unplaced = pd.DataFrame(roller)  # Z ของ df_placed คือฐานกล่อง (แปลงเป็นผิวบนตอนส่งออกเท่านั้น)
+    if key is not None:
+        cache.put(key, (df_placed.copy(), df_unplaced.copy()))
     return df_placed, df_unplaced
 
 # ===== VISUALIZATION =====
 def plot_3d(df: pd.DataFrame, container_dims: Tuple[int, int, int], utilization: float):
+    import matplotlib.pyplot as plt  # โหลดเมื่อวาดภาพเท่านั้น
+
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
     ax.set_xlim([0, container_dims[0]])
     ax.set_ylim([0, container_dims[1]])
     ax.set_zlim([0, container_dims[2]])
     for box in df.itertuples():
-        ax.bar3d(box.X, box.Y, box.Z - box.Height, box.Length, box.Width, box.Height, shade=True)
+        ax.bar3d(box.X, box.Y, box.Z, box.Length, box.Width, box.Height, shade=True)
     plt.title(f"3D Box Placement (Utilization: {utilization:.2f}%)")
     plt.savefig("placement_visualization.png")
     plt.show()
 
 # ===== EXPORT FILES =====
-def export_output(df_placed: pd.DataFrame, df_unplaced: pd.DataFrame):
-    df_placed.to_csv("placed_boxes.csv", index=False)
-    df_unplaced.to_csv("free_roller_boxes.csv", index=False)
+def export_output(df_placed: pd.DataFrame, df_unplaced: pd.DataFrame, export_dir: str = ".",
+                  convention=ROBOT_CONVENTION, fmt: str = "csv"):
+    # แปลงหน่วยและ Z (ฐาน/ผิวบน) ตาม convention ของ exporter โดยไม่แก้ไข DataFrame เดิม
+    placed = Placements(df_placed["SKU"].to_numpy(), df_placed["Priority"].to_numpy(),
+                        df_placed[["X", "Y", "Z"]].to_numpy(), df_placed[["Length", "Width", "Height"]].to_numpy(),
+                        convention=PIPELINE_CONVENTION) if len(df_placed) else Placements([], [], [], [])
+    unplaced = Placements(df_unplaced["BoxTypes"].to_numpy(), df_unplaced["Priority"].to_numpy(),
+                          np.full((len(df_unplaced), 3), np.nan), df_unplaced[["Length", "Width", "Height"]].to_numpy(),
+                          convention=PIPELINE_CONVENTION) if len(df_unplaced) else Placements([], [], [], [])
+    export_placements(placed, "placed_boxes", export_dir, convention, fmt)
+    export_placements(unplaced, "free_roller_boxes", export_dir, convention, fmt)
 
 # ===== MAIN LOOP =====
 def determine_container_type(container_type: str, pallet_height: int):
     return CONTAINER_SPECS[container_type](pallet_height) if container_type == "pallet" else CONTAINER_SPECS[container_type]
 
 def main():
+    import pandas as pd
+
     # อ่านข้อมูลจากไฟล์ forinput.csv
     input_file_path = "D:\\forimport.csv"
     if not os.path.exists(input_file_path):
         print(f"Error: File {input_file_path} not found.")
         return
 
-    # โหลดข้อมูลกล่องจากไฟล์ CSV
-    df = pd.read_csv(input_file_path)
+    # โหลดข้อมูลกล่องจากไฟล์ CSV (รองรับชื่อคอลัมน์ BoxType/w/l/h และรายงานแถวที่ผิดรูปแบบ)
+    order = read_order(input_file_path)
+    log_bad_rows(order.bad_rows)
+    df = pd.DataFrame(order.columns)
     print("Input data loaded successfully.")
+    if df["Weight"].gt(0).any():
+        print("Warning: this pipeline does not check Max weight; boxes may be stacked beyond their load limit.")
 
     # กำหนดประเภทคอนเทนเนอร์และความสูงของพาเลท (ถ้าใช้พาเลท)
     container_type = "pallet"  # ตัวอย่าง: "pallet", "f15", "f5"
@@ -126,10 +223,16 @@ def main():
     # เรียกใช้ฟังก์ชันจัดเรียงกล่อง
     df_placed, df_unplaced = greedy_surface_fit(df, container_dims, GAP)
 
-    # คำนวณการใช้งานพื้นที่
-    total_volume = container_dims[0] * container_dims[1] * container_dims[2]
-    used_volume = (df_placed["Length"] * df_placed["Width"] * df_placed["Height"]).sum()
-    utilization = (used_volume / total_volume) * 100 if total_volume > 0 else 0
+    # คำนวณการใช้งานพื้นที่และคุณภาพการวางจากขนาดจริงของกล่อง (ขนาดใน df_placed รวม GAP ทุกแกน)
+    position, dims = np.empty((0, 3)), np.empty((0, 3))
+    if len(df_placed):
+        position = df_placed[["X", "Y", "Z"]].to_numpy()
+        dims = df_placed[["Length", "Width", "Height"]].to_numpy() - GAP
+    metrics = plan_metrics(position, dims, (0, 0, 0, *container_dims))
+    utilization = metrics["utilization"]
+    print(f"Utilization: {utilization:.2f}%  Max height: {metrics['max_height']:.0f} mm  "
+          f"Void: {metrics['void_fraction']:.2f}%  CoG offset: {metrics['cog_offset']:.1f}%  "
+          f"Min support: {metrics['support_min'] * 100:.0f}%")
 
     # แสดงผลการจัดเรียงกล่องในรูปแบบ 3D
     plot_3d(df_placed, container_dims, utilization)
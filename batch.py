@@ -0,0 +1,241 @@
+# batch.py
+import argparse
+import csv
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from exporter import FORMATS, HAVE_PYARROW
+from loader import load_boxes_from_file
+from main import export_to_csv, plan_order, PLACEMENT_ENGINE, OCCUPANCY_BACKEND
+from placement_cache import PlacementCache
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ['Order', 'Boxes', 'Bad Rows', 'Containers', 'Placed', 'Unplaced', 'Volume Utilization (%)',
+                  'Max Height (cm)', 'Void Fraction (%)', 'CoG Offset (%)', 'Min Support (%)', 'Unsupported',
+                  'Wall Time (s)', 'Pallet Memory (KB)', 'Cache Hits', 'Status']
+
+
+def find_order_files(source):
+    """
+    Resolves a directory or glob pattern to a sorted list of order CSV files.
+
+    Args:
+        source (str): Directory containing *.csv files, or a glob pattern.
+
+    Returns:
+        list: Sorted file paths (sorted so results do not depend on the file system order).
+    """
+    pattern = os.path.join(source, '*.csv') if os.path.isdir(source) else source
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def order_root(files):
+    """
+    Returns the deepest folder containing every order file; order names are taken relative to it.
+
+    Args:
+        files (list): Order CSV paths.
+
+    Returns:
+        str: Common folder, or None when the files share no folder (e.g. different drives).
+    """
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    except ValueError:
+        return None
+
+
+def order_name(filepath, root=None):
+    """
+    Names an order after its file: the path relative to root without the extension, so that files with the
+    same name in different folders (e.g. orders/*/*.csv) get different names and output folders.
+
+    Args:
+        filepath (str): Path to the order CSV.
+        root (str): Folder from order_root (None = the file name only).
+    """
+    if root is None:
+        return os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.splitext(os.path.relpath(os.path.abspath(filepath), root))[0]
+
+
+def plan_order_file(filepath, output_dir, engine=PLACEMENT_ENGINE, strategy="first_fit", plot=False,
+                    occupancy=OCCUPANCY_BACKEND, cache=None, fmt="csv", root=None):
+    """
+    Plans a single order file and writes its placed (one file per container) and to_free_roller CSV files.
+
+    Args:
+        filepath (str): Path to the order CSV.
+        output_dir (str): Root output folder; each order gets a sub-folder named after the file (see order_name).
+        engine (str): Placement engine passed to Pallet.arrange_boxes.
+        strategy (str): Placement strategy passed to Pallet.arrange_boxes.
+        plot (bool): Also save the pallet visualization images.
+        occupancy (str): Occupancy backend of each pallet ('dense' or 'bitpacked').
+        cache (PlacementCache): Placement cache shared by all orders (None = always plan).
+        fmt (str): Format of the result files ('csv', 'jsonl', 'parquet' or 'arrow').
+        root (str): Folder the order name is taken relative to (see order_root; None = the file name only).
+
+    Returns:
+        dict: One summary row (see SUMMARY_FIELDS).
+    """
+    order = order_name(filepath, root)
+    start_time = time.perf_counter()
+    try:
+        boxes, bad_rows = load_boxes_from_file(filepath)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading order {filepath}: {e}")
+        return {
+            'Order': order,
+            'Boxes': 0,
+            'Bad Rows': 0,
+            'Containers': '',
+            'Placed': 0,
+            'Unplaced': 0,
+            'Volume Utilization (%)': 0.0,
+            'Wall Time (s)': round(time.perf_counter() - start_time, 4),
+            'Status': 'load error',
+        }
+    try:
+        result = plan_order(boxes, engine=engine, strategy=strategy, workers=1, occupancy=occupancy,
+                            cache=cache)
+    except Exception as e:
+        logger.error(f"Error planning order {filepath}: {e}")
+        return {
+            'Order': order,
+            'Boxes': sum(box.qty for box in boxes),  # Same count as a planned order (one per unit)
+            'Bad Rows': len(bad_rows),
+            'Containers': '',
+            'Placed': 0,
+            'Unplaced': 0,
+            'Volume Utilization (%)': 0.0,
+            'Wall Time (s)': round(time.perf_counter() - start_time, 4),
+            'Status': 'plan error',
+        }
+    order_dir = os.path.join(output_dir, order)
+    for number, load in enumerate(result['loads'], start=1):
+        container_type = load['container'].container_type
+        export_to_csv(f'placed_{number}_{container_type}.csv', load['placed'], export_dir=order_dir,
+                      fmt=fmt)
+    export_to_csv('to_free_roller.csv', result['unplaced'], export_dir=order_dir, fmt=fmt)
+    if plot:
+        from visualization import render_views  # Headless: worker processes have no display
+        for number, load in enumerate(result['loads'], start=1):
+            container_type = load['container'].container_type
+            render_views(load['pallet'], [load['container']], utilization=load['utilization'],
+                         output_file=os.path.join(order_dir, f'pallet_visualization_{number}_{container_type}.png'))
+    metrics = result['metrics']  # All containers of the order combined, see metrics.merge
+    return {
+        'Order': order,
+        'Boxes': len(result['placed']) + len(result['unplaced']),
+        'Bad Rows': len(bad_rows),
+        'Containers': '/'.join(load['container'].container_type for load in result['loads']),
+        'Placed': len(result['placed']),
+        'Unplaced': len(result['unplaced']),
+        'Volume Utilization (%)': round(metrics['utilization'], 2),
+        'Max Height (cm)': round(metrics['max_height'], 1),
+        'Void Fraction (%)': round(metrics['void_fraction'], 2),
+        'CoG Offset (%)': round(metrics['cog_offset'], 1),
+        'Min Support (%)': round(metrics['support_min'] * 100, 1),
+        'Unsupported': metrics['unsupported'],
+        'Wall Time (s)': round(time.perf_counter() - start_time, 4),
+        'Pallet Memory (KB)': round(result['memory_bytes'] / 1024, 1),
+        'Cache Hits': result['cache_hits'],
+        'Status': 'ok',
+    }
+
+
+def run_batch(files, output_dir, workers=None, chunksize=1, engine=PLACEMENT_ENGINE, strategy="first_fit",
+              plot=False, occupancy=OCCUPANCY_BACKEND, cache=None, fmt="csv"):
+    """
+    Plans every order file in a bounded process pool.
+
+    Args:
+        files (list): Order CSV paths.
+        output_dir (str): Root output folder.
+        workers (int): Number of worker processes (default: CPU count, at most one per file).
+        chunksize (int): Number of files handed to a worker at a time.
+        engine (str): Placement engine passed to Pallet.arrange_boxes.
+        strategy (str): Placement strategy passed to Pallet.arrange_boxes.
+        plot (bool): Also save the pallet visualization images.
+        occupancy (str): Occupancy backend of each pallet ('dense' or 'bitpacked').
+        cache (PlacementCache): Placement cache; worker processes share its on-disk tier.
+        fmt (str): Format of the result files ('csv', 'jsonl', 'parquet' or 'arrow').
+
+    Returns:
+        list: Summary rows in the same order as ``files``, whatever the worker count.
+    """
+    if not files:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    task = partial(plan_order_file, output_dir=output_dir, engine=engine, strategy=strategy, plot=plot,
+                   occupancy=occupancy, cache=cache, fmt=fmt, root=order_root(files))
+    if workers == 1:
+        return [task(path) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(task, files, chunksize=max(1, chunksize)))
+
+
+def write_summary(filepath, rows):
+    """
+    Writes the batch summary table to a CSV file.
+
+    Args:
+        filepath (str): Destination CSV path.
+        rows (list): Summary rows from run_batch.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    with open(filepath, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    """
+    Command line entry point: python batch.py <directory-or-glob> -o <output-dir>
+    """
+    parser = argparse.ArgumentParser(description="Plan many order CSV files in parallel.")
+    parser.add_argument('source', help="Directory of order CSV files or a glob pattern")
+    parser.add_argument('-o', '--output-dir', default='batch_output', help="Folder for per-order results")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes")
+    parser.add_argument('--chunksize', type=int, default=1, help="Order files per worker task")
+    parser.add_argument('--engine', default=PLACEMENT_ENGINE, choices=['voxel', 'heightmap', 'extreme_point'])
+    parser.add_argument('--strategy', default='first_fit', choices=['first_fit', 'best_fit', 'beam', 'layer'])
+    parser.add_argument('--occupancy', default=OCCUPANCY_BACKEND, choices=['dense', 'bitpacked'])
+    parser.add_argument('--cache', metavar='PATH', help="SQLite file that caches placements between runs")
+    parser.add_argument('--format', default='csv', choices=sorted(FORMATS), help="Format of the result files")
+    parser.add_argument('--plot', action='store_true', help="Save pallet images for every order (off by default)")
+    args = parser.parse_args(argv)
+    if args.format in ('parquet', 'arrow') and not HAVE_PYARROW:
+        parser.error(f"--format {args.format} requires pyarrow")
+
+    files = find_order_files(args.source)
+    if not files:
+        print(f"Error: No order files found for {args.source}")
+        return 1
+
+    start_time = time.perf_counter()
+    cache = PlacementCache(path=args.cache) if args.cache else None
+    rows = run_batch(files, args.output_dir, workers=args.workers, chunksize=args.chunksize,
+                     engine=args.engine, strategy=args.strategy, plot=args.plot, occupancy=args.occupancy,
+                     cache=cache, fmt=args.format)
+    write_summary(os.path.join(args.output_dir, 'summary.csv'), rows)
+
+    print(f"{'Order':<30}{'Placed':>8}{'Unplaced':>10}{'Util (%)':>10}{'Void (%)':>10}{'Time (s)':>10}")
+    print("-" * 78)
+    for row in rows:
+        print(f"{row['Order']:<30}{row['Placed']:>8}{row['Unplaced']:>10}"
+              f"{row['Volume Utilization (%)']:>10.2f}{row.get('Void Fraction (%)', 0.0):>10.2f}"
+              f"{row['Wall Time (s)']:>10.3f}")
+    print("-" * 78)
+    print(f"Orders: {len(rows)}  Total Wall Time: {time.perf_counter() - start_time:.3f} seconds")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
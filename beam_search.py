@@ -0,0 +1,150 @@
+# beam_search.py
+import time
+
+from feasibility import TABLE
+
+_UNSET = object()  # ยังไม่มีการตัดสินใจในช่วง lookahead
+
+# เวลาสูงสุดเริ่มต้น (วินาที) ของการค้นหาแบบ beam ต่อการเรียก plan() หนึ่งครั้ง (หนึ่งตู้)
+# เวลารวมของทั้ง order จำกัดด้วย deadline ที่ส่งมาจาก main.plan_order
+DEFAULT_TIME_BUDGET = 10.0
+
+
+class BeamState:
+    """
+    คลาส BeamState: สถานะพาเลทบางส่วนระหว่างค้นหาแบบ beam
+    ใช้ HeightmapEngine แบบ copy-on-write และเก็บการตัดสินใจเป็น linked list (ใช้ส่วนต้นร่วมกับสถานะแม่)
+    """
+    __slots__ = ("engine", "decisions", "placed_volume", "fit_sum", "placed_count", "first")
+
+    def __init__(self, engine, decisions=None, placed_volume=0.0, fit_sum=0.0, placed_count=0, first=_UNSET):
+        self.engine = engine
+        self.decisions = decisions  # (decision, parent) หรือ None; decision = (x, y, z, orientation) หรือ None
+        self.placed_volume = placed_volume
+        self.fit_sum = fit_sum  # ผลรวมคะแนนตำแหน่ง (พื้นที่รองรับ ขอบชิด ความสูง) ของกล่องที่วาง
+        self.placed_count = placed_count
+        self.first = first  # การตัดสินใจแรกในช่วง lookahead ปัจจุบัน (None = ข้ามกล่อง)
+
+    def child(self, decision, volume=0.0, fit=0.0, sku=None):
+        """
+        สร้างสถานะลูกหลังตัดสินใจวาง (หรือข้าม) กล่องหนึ่งชิ้น (sku ใช้น้ำหนักและ max_weight ของกล่อง)
+        """
+        engine = self.engine
+        if decision is not None:
+            x, y, z, orientation, dims = decision
+            engine = engine.copy()
+            engine.place(x, y, z, *dims, sku.weight, sku.max_weight)
+            decision = (x, y, z, orientation)
+        return BeamState(engine, (decision, self.decisions), self.placed_volume + volume,
+                         self.fit_sum + fit, self.placed_count + (decision is not None),
+                         decision if self.first is _UNSET else self.first)
+
+    def score(self, capacity, fit_weight):
+        """
+        คะแนนของสถานะ: สัดส่วนปริมาตรที่วางแล้ว + fit_weight x ผลรวมคะแนนตำแหน่งของกล่องที่วาง
+        """
+        return self.placed_volume / capacity + fit_weight * self.fit_sum
+
+
+class BeamPlanner:
+    """
+    คลาส BeamPlanner: วางกล่องตามลำดับความสำคัญ (ไม่สลับลำดับ) โดยมองล่วงหน้า depth ชิ้น
+    เก็บสถานะที่ดีที่สุด beam_width สถานะในแต่ละชั้น แล้วยืนยันเฉพาะการวางชิ้นแรกก่อนเลื่อนไปชิ้นถัดไป
+    เมื่อเกิน time_budget จะเปลี่ยนเป็น first fit ทีละชิ้น (ไม่ให้คะแนนตำแหน่ง) สำหรับกล่องที่เหลือ
+    """
+
+    # ค่าที่มีผลต่อผลการวาง (ใช้สร้าง key ของ PlacementCache)
+    SETTINGS = ("beam_width", "depth", "branching", "time_budget", "fit_weight", "score_weights")
+
+    def __init__(self, beam_width=4, depth=2, branching=3, time_budget=DEFAULT_TIME_BUDGET, fit_weight=0.05,
+                 score_weights=None):
+        """
+        Constructor ของคลาส BeamPlanner
+        Args:
+            beam_width (int): จำนวนสถานะที่เก็บไว้ในแต่ละชั้น
+            depth (int): จำนวนกล่องที่มองล่วงหน้า
+            branching (int): จำนวนตำแหน่งที่ดีที่สุดที่ลองต่อกล่องหนึ่งชิ้นในแต่ละสถานะ
+            time_budget (float): เวลาสูงสุด (วินาที) สำหรับการค้นหาแบบ beam; None = ไม่จำกัด (ไม่มีขอบเขตเวลา)
+            fit_weight (float): น้ำหนักของคะแนนตำแหน่ง (ความมั่นคงและความแน่น) เทียบกับปริมาตรที่วางได้
+            score_weights (dict): น้ำหนักเกณฑ์ให้คะแนนตำแหน่ง (ดู scoring.DEFAULT_WEIGHTS)
+        """
+        self.beam_width = max(1, int(beam_width))
+        self.depth = max(1, int(depth))
+        self.branching = max(1, int(branching))
+        self.time_budget = time_budget
+        self.fit_weight = fit_weight
+        self.score_weights = score_weights
+        self.timed_out = False  # True หากรอบล่าสุดใช้เวลาเกิน time_budget
+
+    def _expand(self, state, sku, branching):
+        """
+        สร้างสถานะลูกจากตำแหน่งที่ดีที่สุด branching ตำแหน่งของกล่อง sku (หรือข้ามกล่องหากวางไม่ได้)
+        """
+        orientations = sku.can_rotate()
+        ranked = state.engine.ranked_positions(orientations, self.score_weights, limit=branching, weight=sku.weight)
+        if not ranked:
+            return [state.child(None)]
+        volume = sku.get_volume()
+        return [state.child((x, y, z, orientation, orientations[orientation]), volume, fit, sku)
+                for fit, x, y, z, orientation, _ in ranked]
+
+    @staticmethod
+    def _first_fit(engine, sku):
+        """
+        ตำแหน่งแรกที่วางได้ของกล่อง sku ลองแนวการหมุนตามลำดับ (ใช้หลังเกิน time_budget)
+        Returns:
+            tuple: (x, y, z, orientation) หรือ None หากวางไม่ได้
+        """
+        for orientation, (dx, dy, dz) in enumerate(sku.can_rotate()):
+            position = engine.find_position(dx, dy, dz, sku.weight)
+            if position is not None:
+                return (*position, orientation)
+        return None
+
+    def plan(self, engine, batches, deadline=None):
+        """
+        วางกล่องทุกชิ้นใน batches ด้วย engine (HeightmapEngine) และบันทึกตำแหน่งลงใน BoxBatch
+        Args:
+            engine (HeightmapEngine): engine ที่มีผิวบนของพาเลทปัจจุบัน (จะถูกอัปเดตตามการวางจริง)
+            batches (list): รายการ BoxBatch เรียงตามลำดับความสำคัญ
+            deadline (float): เวลา time.perf_counter() ที่ต้องเปลี่ยนเป็น first fit แม้ยังไม่ครบ time_budget
+                (เช่น เวลาที่เหลือของทั้ง order); None = ใช้ time_budget อย่างเดียว
+        Returns:
+            HeightmapEngine: engine หลังวางกล่องทั้งหมด
+        """
+        sequence = [(batch, k) for batch in batches for k in range(batch.qty)]
+        capacity = engine.nx * engine.ny * (engine.container_height - engine.frame_height)
+        if self.time_budget is not None:
+            own = time.perf_counter() + self.time_budget
+            deadline = own if deadline is None else min(deadline, own)
+        self.timed_out = False
+        current = BeamState(engine)
+        # BoxBatch ที่วางไม่ได้แล้ว (ผิวบนสูงขึ้นเท่านั้น ชิ้นที่เหลือจึงวางไม่ได้เช่นกัน)
+        # เริ่มจาก SKU ที่ตาราง feasibility ระบุว่าวางไม่ได้แม้ในตู้ว่าง จึงไม่ต้องค้นหาเลย
+        exhausted = {id(batch) for batch in batches if TABLE.for_engine(batch.sku, engine).best is None}
+        for step, (batch, k) in enumerate(sequence):
+            if id(batch) in exhausted:
+                continue
+            if deadline is not None and not self.timed_out and time.perf_counter() > deadline:
+                self.timed_out = True
+            if self.timed_out:
+                decision = self._first_fit(current.engine, batch.sku)
+            else:
+                beam = [BeamState(current.engine)]
+                for ahead in range(min(self.depth, len(sequence) - step)):
+                    upcoming = sequence[step + ahead][0]
+                    if id(upcoming) in exhausted:
+                        continue
+                    children = [child for state in beam for child in self._expand(state, upcoming.sku,
+                                                                                  self.branching)]
+                    children.sort(key=lambda state: -state.score(capacity, self.fit_weight))
+                    beam = children[:self.beam_width]
+                decision = beam[0].first
+            if decision is None:
+                exhausted.add(id(batch))
+                continue
+            x, y, z, orientation = decision
+            dims = batch.dims(orientation)
+            current = current.child((x, y, z, orientation, dims), sku=batch.sku)
+            batch.set_position(k, (x, y, z), orientation)
+        return current.engine
@@ -0,0 +1,421 @@
+# benchmark.py
+import argparse
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource  # Unix only; peak RSS is reported as None elsewhere
+except ImportError:
+    resource = None
+
+from box import Box, BoxBatch
+from metrics import plan_metrics
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_PATH = os.path.join(ROOT, "New folder", "robot_packing_pipeline_final.py")
+BOX_COUNTS = [50, 200, 1000, 5000]
+
+# Entry points whose import time is measured; none of them may import the plotting or DataFrame stack
+IMPORT_MODULES = ["main", "batch", "service", "pallet", "loader", "exporter"]
+LAZY_MODULES = ("matplotlib", "mpl_toolkits", "pandas")  # Only imported when plotting or using DataFrames
+IMPORT_REPEATS = 5
+_IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(json.dumps([time.perf_counter() - start, sorted({{name.split('.')[0] for name in sys.modules}}"
+    " & set({lazy!r}))]))\n"
+)
+
+# SKU shape of csvData.csv (mm): size ranges, weights, conveyors and QTY per row
+SKU_WIDTH_RANGE = (185, 1010)
+SKU_LENGTH_RANGE = (155, 665)
+SKU_HEIGHT_RANGE = (85, 630)
+SKU_QTY_RANGE = (3, 30)
+SKU_MAX_WEIGHTS = [10, 15, 20, 25, 30, 50]
+SKU_CONVEYORS = [1, 2]
+
+# Engine name -> (runner, largest order it is run on); larger orders are recorded as skipped
+ENGINES = {
+    "voxel": ("pallet", {"engine": "voxel"}, 200),
+    "heightmap": ("pallet", {"engine": "heightmap"}, None),
+    "heightmap_best_fit": ("pallet", {"engine": "heightmap", "strategy": "best_fit"}, None),
+    "heightmap_beam": ("pallet", {"engine": "heightmap", "strategy": "beam"}, 1000),
+    "heightmap_layer": ("pallet", {"engine": "heightmap", "strategy": "layer"}, None),
+    "extreme_point": ("pallet", {"engine": "extreme_point"}, 1000),
+    "pipeline": ("pipeline", {"strategy": "first_fit"}, 1000),
+    "pipeline_best_fit": ("pipeline", {"strategy": "best_fit"}, 1000),
+}
+
+
+def generate_order(n_boxes, seed=0):
+    """
+    Generates a synthetic order shaped like csvData.csv.
+
+    Args:
+        n_boxes (int): Total number of boxes (sum of QTY).
+        seed (int): Random seed; the same (n_boxes, seed) always gives the same order.
+
+    Returns:
+        list: Order rows as dicts with the csvData.csv columns (sizes in mm, priority follows row order).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    remaining = n_boxes
+    while remaining > 0:
+        qty = min(remaining, int(rng.integers(SKU_QTY_RANGE[0], SKU_QTY_RANGE[1] + 1)))
+        rows.append({
+            'BoxTypes': f"S{len(rows) + 1:03d}",
+            'Width': int(rng.integers(*SKU_WIDTH_RANGE, endpoint=True)) // 5 * 5,
+            'Length': int(rng.integers(*SKU_LENGTH_RANGE, endpoint=True)) // 5 * 5,
+            'Height': int(rng.integers(*SKU_HEIGHT_RANGE, endpoint=True)) // 5 * 5,
+            'Max weight': int(rng.choice(SKU_MAX_WEIGHTS)),
+            'Conveyor': int(rng.choice(SKU_CONVEYORS)),
+            'Priority': len(rows) + 1,
+            'QTY': qty,
+        })
+        remaining -= qty
+    return rows
+
+
+def order_to_boxes(rows):
+    """
+    Converts generated order rows to Box objects (mm -> cm, like loader.load_boxes_from_csv).
+    """
+    return [Box(box_type=row['BoxTypes'], width=row['Width'] / 10, length=row['Length'] / 10,
+                height=row['Height'] / 10, max_weight=row['Max weight'], conveyor=row['Conveyor'],
+                priority=row['Priority'], qty=row['QTY'], weight=row.get('Weight', 0.0)) for row in rows]
+
+
+def _load_pipeline():
+    """
+    Imports the robot packing pipeline script (it lives in a folder that is not a package).
+    """
+    spec = importlib.util.spec_from_file_location("robot_packing_pipeline_final", PIPELINE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PlacementClock:
+    """
+    Records the time of every placement so per-box latency can be derived after a run.
+    The latency of a box is the time since the previous placement (or the start), so it
+    includes any failed attempts made in between.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Starts timing (called by the runners after imports and input conversion, right before planning).
+        """
+        self.start = time.perf_counter()
+        self.stamps = []
+
+    def tick(self):
+        self.stamps.append(time.perf_counter())
+
+    def latencies(self):
+        return np.diff(np.asarray([self.start] + self.stamps))
+
+
+def _run_pallet(rows, clock, engine, strategy="first_fit", container_type="F15"):
+    """
+    Plans the order into one container with Pallet.arrange_boxes (through main.plan_container).
+    """
+    from main import plan_container
+
+    original = BoxBatch.set_position
+
+    def set_position(batch, i, position, orientation=0):
+        original(batch, i, position, orientation)
+        clock.tick()
+
+    boxes = order_to_boxes(rows)
+    BoxBatch.set_position = set_position
+    try:
+        clock.reset()
+        result = plan_container(boxes, container_type, engine=engine, strategy=strategy)
+    finally:
+        BoxBatch.set_position = original
+    return len(result["placed"]), len(result["unplaced"]), result["metrics"]
+
+
+def _run_pipeline(rows, clock, strategy="first_fit", container_type="f15"):
+    """
+    Plans the order with greedy_surface_fit of the robot packing pipeline script.
+    """
+    import pandas as pd
+
+    pipeline = _load_pipeline()
+    original = pipeline.add_placed_box
+
+    def add_placed_box(index, box):
+        original(index, box)
+        clock.tick()
+
+    pipeline.add_placed_box = add_placed_box
+    container_dims = pipeline.CONTAINER_SPECS[container_type]
+    df = pd.DataFrame(rows)
+    clock.reset()
+    df_placed, df_unplaced = pipeline.greedy_surface_fit(df, container_dims, pipeline.GAP,
+                                                         strategy=strategy)
+    # Placed dims include the gap on every axis; metrics are taken on the real box sizes
+    dims = df_placed[["Length", "Width", "Height"]].to_numpy() - pipeline.GAP if len(df_placed) else np.empty((0, 3))
+    position = df_placed[["X", "Y", "Z"]].to_numpy() if len(df_placed) else np.empty((0, 3))
+    metrics = plan_metrics(position, dims, (0, 0, 0, *container_dims))
+    return len(df_placed), len(df_unplaced), metrics
+
+
+RUNNERS = {"pallet": _run_pallet, "pipeline": _run_pipeline}
+
+
+def _peak_rss_kb():
+    """
+    Peak resident set size of this process in KB, or None if the platform cannot report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes, Linux KB
+
+
+def run_case(engine, n_boxes, seed=0):
+    """
+    Runs one benchmark case. Meant to be called in a fresh process so peak RSS belongs to this case only.
+
+    Returns:
+        dict: Case result (see run_benchmark).
+    """
+    runner, options, _ = ENGINES[engine]
+    rows = generate_order(n_boxes, seed)
+    clock = PlacementClock()
+    placed, unplaced, metrics = RUNNERS[runner](rows, clock, **options)
+    total_time = time.perf_counter() - clock.start
+    latencies = clock.latencies() * 1000
+    percentiles = np.percentile(latencies, [50, 90, 99]) if latencies.size else [None] * 3
+    return {
+        'engine': engine,
+        'boxes': n_boxes,
+        'seed': seed,
+        'status': 'ok',
+        'total_time_s': round(total_time, 4),
+        'placed': placed,
+        'unplaced': unplaced,
+        'utilization_pct': round(metrics['utilization'], 2),
+        'quality': {
+            'height_fill_pct': round(metrics['height_fill'], 2),
+            'void_fraction_pct': round(metrics['void_fraction'], 2),
+            'cog_offset_pct': round(metrics['cog_offset'], 2),
+            'cog_height_pct': round(metrics['cog_height'], 2),
+            'support_min_pct': round(metrics['support_min'] * 100, 2),
+            'support_mean_pct': round(metrics['support_mean'] * 100, 2),
+            'unsupported': metrics['unsupported'],
+            'support_hist': metrics['support_hist'],
+        },
+        'latency_ms': {
+            'p50': _round(percentiles[0]),
+            'p90': _round(percentiles[1]),
+            'p99': _round(percentiles[2]),
+            'max': _round(latencies.max() if latencies.size else None),
+        },
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def measure_import(module, repeats=IMPORT_REPEATS):
+    """
+    Imports a module in fresh interpreters (started from the repository folder) and times the import statement.
+
+    Args:
+        module (str): Module name, e.g. 'main'.
+        repeats (int): Number of fresh interpreters; the median is reported.
+
+    Returns:
+        dict: Import time in ms (median and min), the LAZY_MODULES it imported and a status
+            ('ok', or 'eager import' when it imported one of LAZY_MODULES).
+    """
+    probe = _IMPORT_PROBE.format(module=module, lazy=LAZY_MODULES)
+    samples = []
+    loaded = []
+    try:
+        for _ in range(max(1, repeats)):
+            output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                                    cwd=ROOT).stdout
+            seconds, loaded = json.loads(output.splitlines()[-1])
+            samples.append(seconds * 1000)
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        return {'module': module, 'status': f'error: {e}'}
+    return {
+        'module': module,
+        'status': 'eager import' if loaded else 'ok',
+        'import_ms': round(float(np.median(samples)), 2),
+        'min_ms': round(min(samples), 2),
+        'lazy_modules_loaded': loaded,
+    }
+
+
+def measure_imports(modules=IMPORT_MODULES, repeats=IMPORT_REPEATS):
+    """
+    Runs measure_import for every module and prints one row per module.
+
+    Returns:
+        list: One result dict per module.
+    """
+    results = []
+    for module in modules:
+        result = measure_import(module, repeats)
+        results.append(result)
+        if 'import_ms' not in result:
+            print(f"{module:<20}  {result['status']}")
+        else:
+            print(f"{module:<20}{result['import_ms']:>10.1f}{result['min_ms']:>10.1f}  {result['status']}"
+                  f"{' (' + ', '.join(result['lazy_modules_loaded']) + ')' if result['lazy_modules_loaded'] else ''}")
+    return results
+
+
+def _round(value, digits=4):
+    return None if value is None else round(float(value), digits)
+
+
+def _git_commit():
+    """
+    Current git commit of the working tree, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(engines=None, box_counts=BOX_COUNTS, seed=0):
+    """
+    Runs every (engine, box count) case, each in its own process.
+
+    Args:
+        engines (list): Names from ENGINES (default: all).
+        box_counts (list): Order sizes to generate.
+        seed (int): Seed of the synthetic orders (shared by all engines so they plan the same orders).
+
+    Returns:
+        dict: 'meta' (commit, python, platform, seed, timestamp) and 'results' (one dict per case).
+    """
+    engines = list(ENGINES) if engines is None else engines
+    results = []
+    # spawn: every case starts from a clean interpreter, so peak RSS is not inherited from earlier cases
+    context = multiprocessing.get_context("spawn")
+    for n_boxes in box_counts:
+        for engine in engines:
+            limit = ENGINES[engine][2]
+            if limit is not None and n_boxes > limit:
+                result = {'engine': engine, 'boxes': n_boxes, 'seed': seed, 'status': 'skipped'}
+                results.append(result)
+                print(_format_row(result))
+                continue
+            with context.Pool(1) as pool:
+                try:
+                    result = pool.apply(run_case, (engine, n_boxes, seed))
+                except Exception as e:
+                    logger.error(f"Benchmark case {engine}/{n_boxes} failed: {e}")
+                    result = {'engine': engine, 'boxes': n_boxes, 'seed': seed, 'status': f'error: {e}'}
+            results.append(result)
+            print(_format_row(result))
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def _format_row(result):
+    if result['status'] != 'ok':
+        return f"{result['engine']:<20}{result['boxes']:>7}  {result['status']}"
+    return (f"{result['engine']:<20}{result['boxes']:>7}{result['total_time_s']:>10.3f}"
+            f"{result['latency_ms']['p50'] or 0:>10.3f}{result['latency_ms']['p99'] or 0:>10.3f}"
+            f"{result['utilization_pct']:>8.2f}{result['quality']['void_fraction_pct']:>8.2f}"
+            f"{result['peak_rss_kb'] or 0:>12}")
+
+
+def compare(baseline, current):
+    """
+    Prints the total time ratio (current / baseline) of every case present in both result files,
+    then the import time ratio of every module measured in both.
+    """
+    before = {(r['engine'], r['boxes']): r for r in baseline['results'] if r['status'] == 'ok'}
+    print(f"{'Engine':<20}{'Boxes':>7}{'Before (s)':>12}{'After (s)':>12}{'Ratio':>8}{'Util diff':>11}")
+    for result in current['results']:
+        old = before.get((result['engine'], result['boxes']))
+        if old is None or result['status'] != 'ok':
+            continue
+        ratio = result['total_time_s'] / old['total_time_s'] if old['total_time_s'] else float('inf')
+        print(f"{result['engine']:<20}{result['boxes']:>7}{old['total_time_s']:>12.3f}{result['total_time_s']:>12.3f}"
+              f"{ratio:>8.2f}{result['utilization_pct'] - old['utilization_pct']:>+11.2f}")
+    before = {r['module']: r for r in baseline.get('imports', []) if 'import_ms' in r}
+    after = [r for r in current.get('imports', []) if r['module'] in before and 'import_ms' in r]
+    if after:
+        print(f"{'Import':<20}{'Before (ms)':>19}{'After (ms)':>12}{'Ratio':>8}")
+    for result in after:
+        old = before[result['module']]['import_ms']
+        print(f"{result['module']:<20}{old:>19.1f}{result['import_ms']:>12.1f}"
+              f"{result['import_ms'] / old if old else float('inf'):>8.2f}")
+
+
+def main(argv=None):
+    """
+    Command line entry point: python benchmark.py -o results.json [--compare baseline.json]
+    Exits with status 1 if a measured entry point imports one of LAZY_MODULES.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the placement engines on seeded synthetic orders.")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="JSON file for the results")
+    parser.add_argument('-e', '--engines', nargs='+', choices=list(ENGINES), default=None)
+    parser.add_argument('-n', '--boxes', nargs='+', type=int, default=BOX_COUNTS, help="Order sizes (boxes)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', metavar='BASELINE', help="Earlier result file to compare against")
+    parser.add_argument('--imports-only', action='store_true', help="Only measure the import time of entry points")
+    parser.add_argument('--no-imports', action='store_true', help="Skip the import time measurement")
+    args = parser.parse_args(argv)
+
+    imports = []
+    if not args.no_imports:
+        print(f"{'Module':<20}{'Import (ms)':>10}{'Min (ms)':>10}  Status")
+        print("-" * 52)
+        imports = measure_imports()
+        print()
+    if args.imports_only:
+        args.engines = []
+    print(f"{'Engine':<20}{'Boxes':>7}{'Total (s)':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'Util %':>8}{'Void %':>8}"
+          f"{'RSS (KB)':>12}")
+    print("-" * 85)
+    report = run_benchmark(args.engines, args.boxes, args.seed)
+    report['imports'] = imports
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), report)
+    return 1 if any(result['status'] == 'eager import' for result in imports) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,69 @@
 # box.py
+import numpy as np
+
+
+# สีของกล่องตามชนิด (ตารางเดียวใช้ร่วมกันทุกกล่อง)
+COLOR_MAP = {
+    'C12': (1, 0, 0),    # Red
+    'C11': (0, 0, 1),    # Blue
+    'C3': (0, 1, 0),     # Green
+    'C4': (1, 1, 0),     # Yellow
+    'C5': (0.5, 0, 0.5), # Purple
+    'C6': (0.8, 0.8, 0), # Light Yellow
+    'C22': (0.2, 0.8, 0), # Dark Green
+    'C29': (0.8, 0.4, 0), # Brownish Orange
+    'C31': (0.4, 0.2, 0.8), # Violet
+    'C19': (0.7, 0.7, 0.7), # Grey
+    'C13': (0.9, 0.6, 0),  # Gold
+    'C15': (0.3, 0.5, 0.1), # Dark Green
+    'C16': (0.9, 0.1, 0.4), # Light Red
+    'C17': (0.1, 0.9, 0.5), # Mint Green
+    'JP1': (1, 0.5, 0),    # Orange
+    'JP2': (0, 1, 1),      # Cyan
+    'JP3': (1, 0, 1),      # Magenta
+    'C1': (0.2, 0.2, 0.8), # Navy Blue
+    'C10': (0.8, 0.8, 0.8), # Light Grey
+}
+DEFAULT_COLOR = (0.7, 0.7, 0.7)  # Default gray if no match
+
+# ชนิดของกล่องที่พบใน process นี้ (type_id คือตำแหน่งในรายการ)
+BOX_TYPES = []
+_TYPE_IDS = {}
+
+# กล่องทีละชิ้นแบบ structured array: ข้อมูล SKU + ตำแหน่ง (NaN = ยังไม่ได้วาง) และดัชนีการหมุนใน Box.can_rotate()
+BOX_DTYPE = np.dtype([
+    ("type_id", np.int32),
+    ("dims", np.float64, 3),  # (กว้าง, ยาว, สูง) ก่อนหมุน (ซม.)
+    ("weight", np.float64),
+    ("max_weight", np.float64),
+    ("conveyor", np.int32),
+    ("priority", np.int32),
+    ("position", np.float64, 3),
+    ("orientation", np.int8),
+])
+
+
+def type_id(box_type):
+    """
+    คืนหมายเลขของชนิดกล่อง (ลงทะเบียนชนิดใหม่เมื่อยังไม่เคยพบ)
+    """
+    found = _TYPE_IDS.get(box_type)
+    if found is None:
+        found = _TYPE_IDS[box_type] = len(BOX_TYPES)
+        BOX_TYPES.append(box_type)
+    return found
+
+
 class Box:
     """
     คลาส Box: แทนกล่องสินค้าแต่ละชิ้น
+    ใช้ __slots__ จึงไม่มี __dict__ ต่อชิ้น (ใช้เฉพาะตอนรับข้อมูลเข้าและส่งผลลัพธ์ออก ภายใน engine ใช้ BOX_DTYPE)
     """
-    def __init__(self, box_type, width, length, height, max_weight, conveyor, priority, qty=1):
+
+    __slots__ = ("box_type", "width", "length", "height", "max_weight", "conveyor", "priority", "qty", "weight",
+                 "position", "color")
+
+    def __init__(self, box_type, width, length, height, max_weight, conveyor, priority, qty=1, weight=0.0):
         """
         Constructor ของคลาส Box
         Args:
@@ -15,6 +75,7 @@ class Box:
             conveyor (int): หมายเลขสายพานลำเลียง
             priority (int): ลำดับความสำคัญในการจัดเรียง (ยิ่งน้อยยิ่งสำคัญ)
             qty (int): จำนวนกล่องชนิดนี้
+            weight (float): น้ำหนักของกล่องหนึ่งชิ้น (หน่วย: กิโลกรัม) 0 = ไม่ทราบ (ไม่นำไปคิดภาระของกล่องด้านล่าง)
         """
         self.box_type = box_type
         self.width = width
@@ -24,37 +85,17 @@ class Box:
         self.conveyor = conveyor
         self.priority = priority
         self.qty = qty
+        self.weight = weight
         self.position = None  # ตำแหน่งของกล่องบนพาเลท (x, y, z)
         self.color = self._assign_color()  # กำหนดสีของกล่อง
 
     def _assign_color(self):
         """
-        กำหนดสีให้กับกล่องตามชนิดของกล่อง
+        กำหนดสีให้กับกล่องตามชนิดของกล่อง (จาก COLOR_MAP)
         Returns:
             tuple: สีของกล่องในรูปแบบ RGB (red, green, blue)
         """
-        color_map = {
-            'C12': (1, 0, 0),    # Red
-            'C11': (0, 0, 1),    # Blue
-            'C3': (0, 1, 0),     # Green
-            'C4': (1, 1, 0),     # Yellow
-            'C5': (0.5, 0, 0.5), # Purple
-            'C6': (0.8, 0.8, 0), # Light Yellow
-            'C22': (0.2, 0.8, 0), # Dark Green
-            'C29': (0.8, 0.4, 0), # Brownish Orange
-            'C31': (0.4, 0.2, 0.8), # Violet
-            'C19': (0.7, 0.7, 0.7), # Grey
-            'C13': (0.9, 0.6, 0),  # Gold
-            'C15': (0.3, 0.5, 0.1), # Dark Green
-            'C16': (0.9, 0.1, 0.4), # Light Red
-            'C17': (0.1, 0.9, 0.5), # Mint Green
-            'JP1': (1, 0.5, 0),    # Orange
-            'JP2': (0, 1, 1),      # Cyan
-            'JP3': (1, 0, 1),      # Magenta
-            'C1': (0.2, 0.2, 0.8), # Navy Blue
-            'C10': (0.8, 0.8, 0.8), # Light Grey
-        }
-        return color_map.get(self.box_type, (0.7, 0.7, 0.7))  # Default gray if no match
+        return COLOR_MAP.get(self.box_type, DEFAULT_COLOR)
 
     def get_volume(self):
         """
@@ -82,3 +123,169 @@ class Box:
         if self.position:
             return f"{self.box_type}(P{self.priority}): {self.width * 10}x{self.length * 10}x{self.height * 10} mm @ {self.position}"
         return f"{self.box_type}(P{self.priority}): {self.width * 10}x{self.length * 10}x{self.height * 10} mm"
+
+
+def group_boxes(boxes):
+    """
+    รวมกล่องที่อยู่ติดกันและเป็น SKU เดียวกัน (ชนิด ขนาด น้ำหนัก สายพาน ลำดับความสำคัญ) ให้เป็น Box เดียวที่มี qty
+    ใช้ส่งกล่องที่วางไม่ได้กลับเข้าไปจัดเรียงใหม่โดยยังวางเป็นชุด (BoxBatch) ได้
+    Args:
+        boxes (list): รายการกล่อง (มักเป็นกล่องทีละชิ้นที่ qty=1)
+    Returns:
+        list: รายการ Box ใหม่ที่ยังไม่มีตำแหน่ง
+    """
+    grouped = []
+    last_key = None
+    for box in boxes:
+        key = (box.box_type, box.width, box.length, box.height, box.max_weight, box.conveyor, box.priority,
+               box.weight)
+        if key == last_key:
+            grouped[-1].qty += box.qty
+        else:
+            grouped.append(Box(box.box_type, box.width, box.length, box.height, box.max_weight, box.conveyor,
+                               box.priority, qty=box.qty, weight=box.weight))
+            last_key = key
+    return grouped
+
+
+class BoxBatch:
+    """
+    คลาส BoxBatch: กล่องชนิดเดียวกันหลายชิ้นตามค่า QTY
+    ใช้ข้อมูล SKU (Box) ร่วมกัน และเก็บแต่ละชิ้นเป็น structured array (BOX_DTYPE) ใน records
+    positions และ orientations เป็น view ของ records ที่ engine อ่าน/เขียนได้โดยตรง
+    """
+    def __init__(self, sku, qty=None):
+        """
+        Constructor ของคลาส BoxBatch
+        Args:
+            sku (Box): ข้อมูลกล่องต้นแบบ (ชนิด ขนาด น้ำหนัก สายพาน ลำดับความสำคัญ)
+            qty (int): จำนวนชิ้น (ค่าเริ่มต้นคือ sku.qty)
+        """
+        self.sku = sku
+        self.qty = int(sku.qty if qty is None else qty)
+        self.records = expand_records(sku, self.qty)
+        self.positions = self.records["position"]  # ตำแหน่ง (x, y, z) ของแต่ละชิ้น; NaN = ยังไม่ได้วาง
+        self.orientations = self.records["orientation"]  # ดัชนีใน sku.can_rotate() ของแต่ละชิ้น
+
+    @property
+    def placed_mask(self):
+        """
+        Returns:
+            np.ndarray: อาร์เรย์ bool ว่าชิ้นใดวางแล้ว
+        """
+        return ~np.isnan(self.positions[:, 0])
+
+    def dims(self, orientation=0):
+        """
+        คืนขนาด (กว้าง, ยาว, สูง) ของกล่องในแนวการหมุนที่กำหนด
+        """
+        return self.sku.can_rotate()[orientation]
+
+    def set_position(self, index, position, orientation=0):
+        """
+        บันทึกตำแหน่งและการหมุนของชิ้นที่ index
+        """
+        self.positions[index] = position
+        self.orientations[index] = orientation
+
+    def _instance(self, index):
+        """
+        สร้าง Box ใหม่สำหรับชิ้นที่ index (ไม่แก้ไข sku เพราะผู้เรียกอาจใช้ sku เดียวกันวางหลายครั้ง)
+        """
+        width, length, height = self.dims(self.orientations[index])
+        sku = self.sku
+        box = Box(sku.box_type, width, length, height, sku.max_weight, sku.conveyor, sku.priority, qty=1,
+                  weight=sku.weight)
+        box.position = tuple(float(v) for v in self.positions[index]) if self.placed_mask[index] else None
+        return box
+
+    def to_records(self, placed=None):
+        """
+        คืนสำเนาของ records (สำหรับส่งต่อโดยไม่ต้องสร้าง Box ทีละชิ้น)
+        Args:
+            placed (bool): True = เฉพาะชิ้นที่วางแล้ว, False = เฉพาะชิ้นที่ยังวางไม่ได้, None = ทุกชิ้น
+        Returns:
+            np.ndarray: structured array ชนิด BOX_DTYPE
+        """
+        return self.records.copy() if placed is None else self.records[self.placed_mask == placed]
+
+    def to_boxes(self, placed=True):
+        """
+        แปลงเป็นรายการ Box ทีละชิ้น (ใช้เฉพาะตอนส่งผลลัพธ์ออก)
+        Args:
+            placed (bool): True = เฉพาะชิ้นที่วางแล้ว, False = เฉพาะชิ้นที่ยังวางไม่ได้
+        Returns:
+            list: รายการ Box
+        """
+        if self.qty == 1:
+            return [self._instance(0)] if bool(self.placed_mask[0]) == placed else []
+        return from_records(self.records[self.placed_mask == placed])
+
+
+def expand_records(sku, qty=None):
+    """
+    สร้าง records ของกล่อง qty ชิ้นจาก SKU เดียว (ยังไม่ได้วาง)
+    Args:
+        sku (Box): ข้อมูลกล่องต้นแบบ
+        qty (int): จำนวนชิ้น (ค่าเริ่มต้นคือ sku.qty)
+    Returns:
+        np.ndarray: structured array ชนิด BOX_DTYPE
+    """
+    records = np.zeros(int(sku.qty if qty is None else qty), dtype=BOX_DTYPE)
+    records["type_id"] = type_id(sku.box_type)
+    records["dims"] = (sku.width, sku.length, sku.height)
+    records["weight"] = sku.weight
+    records["max_weight"] = sku.max_weight
+    records["conveyor"] = sku.conveyor
+    records["priority"] = sku.priority
+    records["position"] = np.nan
+    return records
+
+
+def to_records(boxes):
+    """
+    แปลงรายการ Box เป็น records โดยขยายตาม qty (ตำแหน่งของ Box ที่วางแล้วถูกคัดลอกไปทุกชิ้น)
+    Args:
+        boxes (list): รายการ Box
+    Returns:
+        np.ndarray: structured array ชนิด BOX_DTYPE
+    """
+    if not boxes:
+        return np.zeros(0, dtype=BOX_DTYPE)
+    records = np.concatenate([expand_records(box) for box in boxes])
+    nan = (np.nan, np.nan, np.nan)
+    records["position"] = np.repeat([box.position or nan for box in boxes], [box.qty for box in boxes], axis=0)
+    return records
+
+
+def placed_dims(records):
+    """
+    ขนาด (กว้าง, ยาว, สูง) ของแต่ละชิ้นตามการหมุน (orientation 1 = สลับกว้างกับยาว ตาม Box.can_rotate)
+    Returns:
+        np.ndarray: ขนาด (n, 3)
+    """
+    dims = records["dims"].copy()
+    rotated = records["orientation"] == 1
+    dims[rotated] = dims[rotated][:, [1, 0, 2]]
+    return dims
+
+
+def from_records(records):
+    """
+    แปลง records กลับเป็น Box ทีละชิ้น (qty=1, ขนาดตามการหมุน) สำหรับส่งผลลัพธ์ออก
+    Args:
+        records (np.ndarray): structured array ชนิด BOX_DTYPE
+    Returns:
+        list: รายการ Box
+    """
+    dims = placed_dims(records).tolist()
+    positions = records["position"]
+    placed = (~np.isnan(positions[:, 0])).tolist()
+    boxes = []
+    for t, (width, length, height), max_weight, conveyor, priority, weight, position, ok in zip(
+            records["type_id"].tolist(), dims, records["max_weight"].tolist(), records["conveyor"].tolist(),
+            records["priority"].tolist(), records["weight"].tolist(), positions.tolist(), placed):
+        box = Box(BOX_TYPES[t], width, length, height, max_weight, conveyor, priority, weight=weight)
+        box.position = tuple(position) if ok else None
+        boxes.append(box)
+    return boxes
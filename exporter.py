@@ -0,0 +1,270 @@
+# exporter.py
+import csv
+import json
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from box import BOX_TYPES, placed_dims
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:  # CSV and JSON lines still work
+    pa = feather = pq = None
+    HAVE_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+# Folder for exported files; override with the BOXLOADER_EXPORT_DIR environment variable
+DEFAULT_EXPORT_DIR = os.environ.get("BOXLOADER_EXPORT_DIR", "BoxLoadExport")
+
+# --- Coordinate conventions -------------------------------------------------------------------------------
+# Every exported number is in one unit and every Z refers to one face of the box; both are chosen here only.
+UNIT_SCALE = {"cm": 1.0, "mm": 10.0}  # Factor from centimetres
+Z_REFERENCES = ("bottom", "top")  # Z of the underside or of the top face of the box
+
+Convention = namedtuple("Convention", ["units", "z_ref"])
+PLAN_CONVENTION = Convention("cm", "bottom")  # Pallet / Box.position: centimetres, Z = underside
+PIPELINE_CONVENTION = Convention("mm", "bottom")  # greedy_surface_fit result: millimetres, Z = underside
+ROBOT_CONVENTION = Convention("mm", "top")  # Robot controller: millimetres, Z = top face (where the gripper releases)
+EXPORT_CONVENTION = Convention("mm", "bottom")  # Default for exported plans (same unit as the order file)
+
+FIELDS = ("box_type", "priority", "x", "y", "z", "width", "length", "height", "qty")
+CSV_LABELS = {"box_type": "Box Type", "priority": "Priority", "x": "Position X", "y": "Position Y",
+              "z": "Position Z", "width": "Width", "length": "Length", "height": "Height", "qty": "Quantity"}
+LENGTH_FIELDS = ("x", "y", "z", "width", "length", "height")  # Fields converted between units
+
+
+def check_convention(convention):
+    """
+    Validates a coordinate convention.
+
+    Args:
+        convention (Convention): Units ('cm' or 'mm') and Z reference ('bottom' or 'top').
+
+    Returns:
+        Convention: The convention as a Convention tuple.
+    """
+    convention = Convention(*convention)
+    if convention.units not in UNIT_SCALE:
+        raise ValueError(f"Unknown export units: {convention.units}")
+    if convention.z_ref not in Z_REFERENCES:
+        raise ValueError(f"Unknown Z reference: {convention.z_ref}")
+    return convention
+
+
+class Placements:
+    """
+    Column arrays of placed (or unplaced) boxes in one coordinate convention.
+    Positions of unplaced boxes are NaN.
+    """
+
+    def __init__(self, box_type, priority, position, dims, qty=None, convention=PLAN_CONVENTION):
+        """
+        Args:
+            box_type (sequence): Box type of each box.
+            priority (sequence): Priority of each box.
+            position (array-like): (n, 3) x, y, z of each box; NaN rows are unplaced.
+            dims (array-like): (n, 3) width (x axis), length (y axis), height of each box as placed.
+            qty (sequence): Quantity of each row (default 1).
+            convention (Convention): Units and Z reference of position and dims.
+        """
+        self.box_type = np.asarray(box_type, dtype=object)
+        n = len(self.box_type)
+        self.priority = np.asarray(priority, dtype=np.int64).reshape(n)
+        self.position = np.asarray(position, dtype=np.float64).reshape(n, 3)
+        self.dims = np.asarray(dims, dtype=np.float64).reshape(n, 3)
+        self.qty = np.ones(n, dtype=np.int64) if qty is None else np.asarray(qty, dtype=np.int64).reshape(n)
+        self.convention = check_convention(convention)
+
+    def __len__(self):
+        return len(self.box_type)
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        """
+        Builds the arrays from Box objects (centimetres, Z = underside).
+
+        Args:
+            boxes (list): Box objects; boxes without a position are exported as unplaced.
+        """
+        nan = (np.nan, np.nan, np.nan)
+        return cls([box.box_type for box in boxes], [box.priority for box in boxes],
+                   [box.position or nan for box in boxes],
+                   [(box.width, box.length, box.height) for box in boxes],
+                   [box.qty for box in boxes], PLAN_CONVENTION)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds the arrays from box records (box.BOX_DTYPE, centimetres, Z = underside) without creating Boxes.
+
+        Args:
+            records (np.ndarray): Structured array of boxes, e.g. from BoxBatch.to_records.
+        """
+        return cls(np.array(BOX_TYPES, dtype=object)[records["type_id"]], records["priority"],
+                   records["position"], placed_dims(records), None, PLAN_CONVENTION)
+
+    @property
+    def placed_mask(self):
+        """
+        Returns:
+            np.ndarray: Boolean array, True for boxes with a position.
+        """
+        return ~np.isnan(self.position[:, 0])
+
+    def to(self, convention):
+        """
+        Converts to another convention. The arrays of this object are never modified.
+
+        Args:
+            convention (Convention): Target units and Z reference.
+
+        Returns:
+            Placements: A new object (or self when the convention is already the same).
+        """
+        convention = check_convention(convention)
+        if convention == self.convention:
+            return self
+        scale = UNIT_SCALE[convention.units] / UNIT_SCALE[self.convention.units]
+        position = self.position * scale
+        dims = self.dims * scale
+        if convention.z_ref != self.convention.z_ref:
+            sign = 1.0 if convention.z_ref == "top" else -1.0
+            position[:, 2] += sign * dims[:, 2]
+        return Placements(self.box_type, self.priority, position, dims, self.qty, convention)
+
+    def columns(self):
+        """
+        Returns:
+            dict: Field name (see FIELDS) -> column array.
+        """
+        x, y, z = self.position.T
+        width, length, height = self.dims.T
+        return {"box_type": self.box_type, "priority": self.priority, "x": x, "y": y, "z": z,
+                "width": width, "length": length, "height": height, "qty": self.qty}
+
+
+def _csv_column(values, mask=None):
+    """
+    Converts a column to Python values for csv.writer in one pass: whole-number float columns become ints
+    (no trailing '.0') and entries outside mask become None (written as empty fields).
+    """
+    values = np.asarray(values)
+    known = np.ones(len(values), dtype=bool) if mask is None else mask
+    if values.dtype.kind == "f" and np.array_equal(values[known], np.round(values[known])):
+        values = np.where(known, values, 0).astype(np.int64)
+    if known.all():
+        return values.tolist()
+    column = values.astype(object)
+    column[~known] = None
+    return column.tolist()
+
+
+def _headers(convention):
+    """
+    CSV header of each field, with the unit (and the Z reference) in the label.
+    """
+    labels = dict(CSV_LABELS)
+    for field in LENGTH_FIELDS:
+        labels[field] = f"{labels[field]} ({convention.units})"
+    labels["z"] = f"{CSV_LABELS['z']} ({convention.z_ref}, {convention.units})"
+    return [labels[field] for field in FIELDS]
+
+
+def write_csv(placements, path):
+    """
+    Writes the placements as CSV (all rows in a single writerows call).
+    """
+    placed = placements.placed_mask
+    columns = placements.columns()
+    values = [_csv_column(columns[field], placed if field in ("x", "y", "z") else None) for field in FIELDS]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(_headers(placements.convention))
+        writer.writerows(zip(*values))
+
+
+def placement_dicts(placements):
+    """
+    One JSON-serialisable dict per box, carrying its units and Z reference; unplaced boxes have null x, y and z.
+
+    Returns:
+        list: Dicts with the keys of FIELDS plus 'units' and 'z_ref'.
+    """
+    placed = placements.placed_mask
+    columns = {field: values.tolist() for field, values in placements.columns().items()}
+    for field in ("x", "y", "z"):
+        columns[field] = [value if ok else None for value, ok in zip(columns[field], placed.tolist())]
+    units, z_ref = placements.convention
+    return [{**dict(zip(FIELDS, row)), "units": units, "z_ref": z_ref}
+            for row in zip(*(columns[field] for field in FIELDS))]
+
+
+def write_jsonl(placements, path):
+    """
+    Writes one JSON object per box (for the robot controller), see placement_dicts.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(json.dumps(row) + "\n" for row in placement_dicts(placements))
+
+
+def _arrow_table(placements):
+    """
+    Builds a pyarrow Table; the convention is stored in the schema metadata and unplaced positions are null.
+    """
+    if not HAVE_PYARROW:
+        raise ImportError("Parquet/Arrow export requires pyarrow (pip install pyarrow)")
+    unplaced = ~placements.placed_mask
+    arrays = [pa.array(values, mask=unplaced if field in ("x", "y", "z") else None)
+              for field, values in placements.columns().items()]
+    units, z_ref = placements.convention
+    return pa.table(arrays, names=list(FIELDS), metadata={"units": units, "z_ref": z_ref})
+
+
+def write_parquet(placements, path):
+    """
+    Writes the placements as a Parquet file (requires pyarrow).
+    """
+    pq.write_table(_arrow_table(placements), path)
+
+
+def write_arrow(placements, path):
+    """
+    Writes the placements as an Arrow IPC (Feather v2) file (requires pyarrow).
+    """
+    feather.write_feather(_arrow_table(placements), path)
+
+
+FORMATS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet, "arrow": write_arrow}
+
+
+def export_placements(placements, filename, export_dir=None, convention=EXPORT_CONVENTION, fmt=None):
+    """
+    Writes placements to a file in the export folder.
+
+    Args:
+        placements (Placements): Boxes to export (in any convention).
+        filename (str): File name; its extension is replaced to match fmt when fmt is given.
+        export_dir (str): Folder to write into (default: DEFAULT_EXPORT_DIR); created if missing.
+        convention (Convention): Units and Z reference of the written coordinates.
+        fmt (str): 'csv', 'jsonl', 'parquet' or 'arrow' (default: from the file extension).
+
+    Returns:
+        str: Path of the written file.
+    """
+    stem, extension = os.path.splitext(filename)
+    fmt = fmt or extension.lstrip(".").lower() or "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    export_dir = DEFAULT_EXPORT_DIR if export_dir is None else export_dir
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.join(export_dir, f"{stem}.{fmt}")
+    FORMATS[fmt](placements.to(convention), path)
+    logger.debug(f"Exported {len(placements)} rows to {path}")
+    return path
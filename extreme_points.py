@@ -0,0 +1,104 @@
+# extreme_points.py
+import bisect
+
+import numpy as np
+
+
+def box_corners(x, y, z, dx, dy, dz):
+    """
+    คืนมุมทั้ง 8 ของกล่องที่มุมล่างซ้ายอยู่ที่ (x, y, z)
+    """
+    return [(x + ox, y + oy, z + oz) for ox in (0, dx) for oy in (0, dy) for oz in (0, dz)]
+
+
+def extreme_points(x, y, z, dx, dy, dz):
+    """
+    คืน extreme point 3 จุดที่กล่องใหม่สร้างขึ้น (ด้านขวา, ด้านหลัง และด้านบนของกล่อง)
+    """
+    return [(x + dx, y, z), (x, y + dy, z), (x, y, z + dz)]
+
+
+class ExtremePointIndex:
+    """
+    คลาส ExtremePointIndex: ดัชนีจุดวางกล่อง (extreme/corner point) ที่อัปเดตทีละกล่อง
+    จุดถูกเก็บเรียงตาม (z, y, x) เสมอ และจุดที่ตกอยู่ในกล่องที่วางแล้วจะถูกตัดทิ้งทันที
+    """
+
+    def __init__(self, points=(), bounds=None):
+        """
+        Constructor ของคลาส ExtremePointIndex
+        Args:
+            points (iterable): จุดเริ่มต้น (x, y, z) เช่น มุมของพื้นตู้
+            bounds (tuple): ขอบเขต (x_max, y_max, z_max) แบบไม่รวมขอบ; จุดที่อยู่นอกขอบเขตจะไม่ถูกเพิ่ม
+        """
+        self.bounds = bounds
+        self._keys = []  # รายการจุดแบบ (z, y, x) ที่เรียงลำดับแล้ว
+        self._live = set()  # จุดที่ยังใช้งานได้ สำหรับตรวจจุดซ้ำ
+        self._array = None  # ผลของ as_array() ล่าสุด (ล้างเมื่อจุดเปลี่ยน)
+        for point in points:
+            self.add_point(*point)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        """
+        วนลูปจุดทั้งหมดตามลำดับ (z, y, x) โดยคืนค่าเป็น (x, y, z)
+        """
+        return ((x, y, z) for z, y, x in list(self._keys))
+
+    def __contains__(self, point):
+        x, y, z = point
+        return (z, y, x) in self._live
+
+    def as_array(self):
+        """
+        คืนจุดทั้งหมดเป็น array (x, y, z) ขนาด (n, 3) ตามลำดับ (z, y, x) เดียวกับ __iter__
+        array ถูกเก็บไว้จนกว่าจะมีการเพิ่มหรือตัดจุด (ห้ามแก้ไขค่าใน array)
+        """
+        if self._array is None:
+            self._array = np.ascontiguousarray(np.array(self._keys).reshape(-1, 3)[:, ::-1])
+        return self._array
+
+    def add_point(self, x, y, z):
+        """
+        เพิ่มจุดใหม่ลงในดัชนี (ข้ามจุดที่ซ้ำหรืออยู่นอกขอบเขต)
+        Returns:
+            bool: True หากเพิ่มจุดได้
+        """
+        if self.bounds is not None:
+            x_max, y_max, z_max = self.bounds
+            if not (0 <= x < x_max and 0 <= y < y_max and 0 <= z < z_max):
+                return False
+        key = (z, y, x)
+        if key in self._live:
+            return False
+        self._live.add(key)
+        bisect.insort(self._keys, key)
+        self._array = None
+        return True
+
+    def add_box(self, x, y, z, dx, dy, dz, points=None):
+        """
+        อัปเดตดัชนีหลังวางกล่อง: ตัดจุดที่อยู่ภายในกล่อง [x, x+dx) x [y, y+dy) x [z, z+dz)
+        แล้วเพิ่มจุดใหม่ที่กล่องสร้างขึ้น
+        Args:
+            x, y, z (float): ตำแหน่งมุมล่างซ้ายของกล่อง
+            dx, dy, dz (float): ขนาดของกล่อง (รวมช่องว่างระหว่างกล่องแล้ว)
+            points (iterable): จุดใหม่ที่ต้องการเพิ่ม (ค่าเริ่มต้นคือ extreme_points ของกล่อง)
+        """
+        x_end, y_end, z_end = x + dx, y + dy, z + dz
+        # จุดเรียงตาม z อยู่แล้ว จึงตรวจเฉพาะช่วง z ที่กล่องครอบคลุม
+        lo = bisect.bisect_left(self._keys, (z,))
+        hi = bisect.bisect_left(self._keys, (z_end,))
+        kept = [key for key in self._keys[lo:hi] if not (y <= key[1] < y_end and x <= key[2] < x_end)]
+        if len(kept) != hi - lo:
+            self._live.difference_update(set(self._keys[lo:hi]) - set(kept))
+            self._keys[lo:hi] = kept
+            self._array = None
+        if points is None:
+            points = extreme_points(x, y, z, dx, dy, dz)
+        for point in points:
+            px, py, pz = point
+            if not (x <= px < x_end and y <= py < y_end and z <= pz < z_end):
+                self.add_point(px, py, pz)
@@ -0,0 +1,210 @@
+# feasibility.py
+import argparse
+import json
+import logging
+import os
+from collections import namedtuple
+
+from heightmap import _cells
+from placement_cache import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# การเรียงกล่องแนวการหมุนเดียวเป็นบล็อกในตู้ว่าง: วางได้หรือไม่, จำนวนต่อแถว (แกน x), จำนวนแถว (แกน y),
+# จำนวนต่อชั้น และจำนวนชั้น (จำกัดด้วยความสูงและ max_weight ของกล่องล่างสุด)
+Tiling = namedtuple("Tiling", ["fits", "per_row", "rows", "per_layer", "layers"])
+
+# ตารางของ SKU หนึ่งในตู้หนึ่ง: Tiling ตามลำดับของ orientations และแนวการหมุนที่ได้บล็อกใหญ่ที่สุด (None = วางไม่ได้)
+SkuFit = namedtuple("SkuFit", ["tilings", "best"])
+
+
+def axis_count(space, size, step):
+    """
+    จำนวนชิ้นที่เรียงต่อกันได้ตามแกนเดียว (ชิ้นต้องอยู่ในพื้นที่ทั้งชิ้น ชิ้นถัดไปห่างจากชิ้นก่อน step)
+    """
+    if size <= 0 or size > space:
+        return 0
+    return int((space - size) // step) + 1
+
+
+def stack_limit(weight, max_weight):
+    """
+    จำนวนกล่องที่ซ้อนตรงกันได้สูงสุดโดยกล่องล่างสุดไม่รับน้ำหนักเกิน max_weight (None = ไม่จำกัด)
+    """
+    if weight <= 0 or max_weight is None:
+        return None
+    return int((max_weight + 1e-9) // weight) + 1
+
+
+def tiling(fit_x, fit_y, step_x, step_y, dz, space, weight=0.0, max_weight=None):
+    """
+    คำนวณการเรียงกล่องเป็นบล็อกในตู้ว่าง
+    Args:
+        fit_x, fit_y: ขนาดฐานที่ต้องอยู่ภายในตู้
+        step_x, step_y: ระยะจากชิ้นหนึ่งถึงชิ้นถัดไป (รวมช่องว่างระหว่างกล่อง)
+        dz (float): ความสูงของกล่อง
+        space (tuple): (ยาว, กว้าง, สูง) ของพื้นที่วางในหน่วยเดียวกับขนาดกล่อง
+        weight, max_weight (float): น้ำหนักของกล่องและน้ำหนักสูงสุดที่วางทับได้
+    Returns:
+        Tiling
+    """
+    length, width, height = space
+    per_row = axis_count(length, fit_x, step_x)
+    rows = axis_count(width, fit_y, step_y)
+    layers = int((height + 1e-9) // dz) if dz > 0 else 0
+    limit = stack_limit(weight, max_weight)
+    if limit is not None:
+        layers = min(layers, limit)
+    fits = per_row > 0 and rows > 0 and layers > 0
+    return Tiling(fits, per_row, rows, per_row * rows, layers) if fits else Tiling(False, 0, 0, 0, 0)
+
+
+def _best(tilings):
+    """
+    แนวการหมุนที่วางได้จำนวนชิ้นมากที่สุดในบล็อกเดียว (เท่ากันเลือกแนวที่มาก่อน)
+    """
+    capacity = [found.per_layer * found.layers for found in tilings]
+    if not any(capacity):
+        return None
+    return capacity.index(max(capacity))
+
+
+class FeasibilityTable:
+    """
+    คลาส FeasibilityTable: ตารางที่คำนวณไว้ล่วงหน้าต่อ (SKU, ตู้, ระยะห่าง) ว่า SKU วางได้ในแนวการหมุนใด
+    วางได้กี่ชิ้นต่อแถวและต่อชั้น และบล็อกขนาดเดียวกันที่ใหญ่ที่สุด
+    เก็บในหน่วยความจำและบันทึกเป็นไฟล์ JSON ได้ (SKU และตู้แทบไม่เปลี่ยน จึงใช้ซ้ำได้ทุกรอบ)
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None):
+        """
+        Constructor ของคลาส FeasibilityTable
+        Args:
+            path (str): ไฟล์ JSON ของตาราง (None = ใช้เฉพาะหน่วยความจำ); โหลดทันทีหากมีไฟล์อยู่แล้ว
+        """
+        self.path = None
+        self._entries = {}
+        self._dirty = False
+        if path is not None:
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, path):
+        """
+        โหลดตารางจากไฟล์ (ไฟล์ที่ไม่มีหรืออ่านไม่ได้ถือเป็นตารางว่าง) และใช้ไฟล์นี้ใน save()
+        Returns:
+            int: จำนวนรายการที่โหลดได้
+        """
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Feasibility table {path} ignored: {e}")
+            return 0
+        if data.get("version") != self.VERSION:
+            return 0
+        for key, (tilings, best) in data.get("entries", {}).items():
+            self._entries.setdefault(key, SkuFit(tuple(Tiling(*found) for found in tilings), best))
+        return len(data.get("entries", {}))
+
+    def save(self, path=None):
+        """
+        บันทึกตารางเป็นไฟล์ JSON (เขียนไฟล์ชั่วคราวแล้วแทนที่ จึงไม่มีไฟล์ที่เขียนไม่ครบ)
+        Args:
+            path (str): ไฟล์ปลายทาง (ค่าเริ่มต้นคือไฟล์ที่โหลดไว้); ไม่บันทึกหากไม่มีรายการใหม่
+        """
+        path = path or self.path
+        if path is None or (not self._dirty and path == self.path):
+            return
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"version": self.VERSION, "entries": self._entries}, file, separators=(",", ":"))
+        os.replace(temporary, path)
+        self.path = path
+        self._dirty = False
+
+    def lookup(self, box_type, orientations, space, gap=0.0, weight=0.0, max_weight=None, grid=True):
+        """
+        คืนตารางของ SKU ในพื้นที่ space (คำนวณและเก็บไว้เมื่อยังไม่มี)
+        Args:
+            box_type (str): ชนิดของกล่อง
+            orientations (list): ขนาด (dx, dy, dz) ของแต่ละแนวการหมุน เช่น Box.can_rotate()
+            space (tuple): (ยาว, กว้าง, สูง) ของพื้นที่วาง
+            gap (float): ระยะห่างระหว่างกล่อง
+            weight, max_weight (float): น้ำหนักของกล่องและน้ำหนักสูงสุดที่วางทับได้
+            grid (bool): True = พื้นที่เป็นจำนวนช่องของ HeightmapEngine (ขนาดกล่องปัดขึ้นเป็นช่อง และช่องว่าง
+                ยื่นเกินผนังได้เหมือน HeightmapEngine.place_row); False = ขนาดกล่องรวมช่องว่างแล้ว
+        Returns:
+            SkuFit
+        """
+        key = fingerprint("feasibility", box_type, orientations, space, gap, weight, max_weight, grid)
+        found = self._entries.get(key)
+        if found is None:
+            tilings = []
+            for dx, dy, dz in orientations:
+                if grid:
+                    tilings.append(tiling(_cells(dx), _cells(dy), _cells(dx + gap), _cells(dy + gap), dz, space,
+                                          weight, max_weight))
+                else:
+                    tilings.append(tiling(dx, dy, dx, dy, dz, space, weight, max_weight))
+            found = self._entries[key] = SkuFit(tuple(tilings), _best(tilings))
+            self._dirty = True
+        return found
+
+    def for_engine(self, sku, engine):
+        """
+        ตารางของ SKU (Box) ในตู้ของ HeightmapEngine (ทุกแนวการหมุนของ Box.can_rotate)
+        """
+        return self.lookup(sku.box_type, sku.can_rotate(), (engine.nx, engine.ny,
+                           engine.container_height - engine.frame_height), engine.gap, sku.weight, sku.max_weight)
+
+
+# ตารางที่ใช้ร่วมกันใน process นี้ (main.run โหลดจากไฟล์ที่สร้างด้วยคำสั่ง python feasibility.py)
+TABLE = FeasibilityTable()
+
+
+def precompute(boxes, table=TABLE):
+    """
+    คำนวณตารางของทุก SKU ใน boxes สำหรับทุกตู้ใน main.CONTAINER_TYPES ด้วยพาเลทและระยะเผื่อความสูงของ main
+    Returns:
+        int: จำนวนรายการในตาราง
+    """
+    from heightmap import HeightmapEngine
+    from main import CONTAINER_TYPES, HEIGHT_MARGIN, new_pallet
+
+    pallet = new_pallet()
+    for container_type in CONTAINER_TYPES.values():
+        container = container_type()
+        engine = HeightmapEngine(pallet, (pallet.width - container.length) / 2, (pallet.length - container.width) / 2,
+                                 container.length, container.width, container.height - HEIGHT_MARGIN)
+        for box in boxes:
+            table.for_engine(box, engine)
+    return len(table)
+
+
+def main():
+    from loader import load_boxes_from_file
+    from main import FEASIBILITY_TABLE_FILE
+
+    parser = argparse.ArgumentParser(description="Precompute the SKU feasibility table for every container type.")
+    parser.add_argument("orders", nargs="+", help="Order CSV files listing the SKU catalogue")
+    parser.add_argument("--output", default=FEASIBILITY_TABLE_FILE, help="JSON file to write (extended if it exists)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    TABLE.load(args.output)
+    for filepath in args.orders:
+        boxes, _ = load_boxes_from_file(filepath)
+        precompute(boxes)
+    TABLE.save(args.output)
+    logger.info(f"Feasibility table: {len(TABLE)} entries written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# heightmap.py
+import math
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scoring import placement_scores, best_index
+from instrumentation import STATS
+from support_graph import SupportGraph
+
+
+def _cells(value):
+    """
+    แปลงความยาว (เซนติเมตร) เป็นจำนวนช่องของกริด 1 ซม. โดยปัดขึ้น
+    """
+    return int(math.ceil(value - 1e-9))
+
+
+def window_max(grid, fx, fy):
+    """
+    หาค่าสูงสุดในทุกหน้าต่างขนาด fx x fy ของกริด 2 มิติ (แยกทำทีละแกน)
+    Returns:
+        np.ndarray: อาร์เรย์ขนาด (nx - fx + 1, ny - fy + 1)
+    """
+    rows = sliding_window_view(grid, fx, axis=0).max(axis=-1)
+    return sliding_window_view(rows, fy, axis=1).max(axis=-1)
+
+
+def window_min(grid, fx, fy):
+    """
+    หาค่าต่ำสุดในทุกหน้าต่างขนาด fx x fy ของกริด 2 มิติ (แยกทำทีละแกน)
+    Returns:
+        np.ndarray: อาร์เรย์ขนาด (nx - fx + 1, ny - fy + 1)
+    """
+    rows = sliding_window_view(grid, fx, axis=0).min(axis=-1)
+    return sliding_window_view(rows, fy, axis=1).min(axis=-1)
+
+
+class HeightmapEngine:
+    """
+    คลาส HeightmapEngine: เครื่องมือจัดวางแบบ 2.5 มิติ เก็บความสูงผิวบนสุดของแต่ละช่อง (x, y)
+    ภายในตู้คอนเทนเนอร์ แล้วหาตำแหน่ง z ต่ำสุดของฐานกล่องด้วย window-max แทนการไล่ทุกค่า z
+    และเก็บกล่องที่เป็นผิวบนของแต่ละช่อง (owner) กับ SupportGraph เพื่อไม่ให้กล่องด้านล่างรับน้ำหนักเกิน max_weight
+    """
+
+    # จำนวนตำแหน่งที่ตรวจสอบพื้นที่รองรับพร้อมกันในแต่ละรอบ
+    SUPPORT_CHUNK = 256
+
+    def __init__(self, pallet, container_x, container_y, container_length, container_width, container_height,
+                 support_threshold=0.5):
+        """
+        Constructor ของคลาส HeightmapEngine
+        Args:
+            pallet (Pallet): พาเลทที่ใช้วางกล่อง (ใช้ค่า frame_height, gap และกล่องที่วางไว้แล้ว)
+            container_x (float): ตำแหน่ง x ของตู้คอนเทนเนอร์บนพาเลท
+            container_y (float): ตำแหน่ง y ของตู้คอนเทนเนอร์บนพาเลท
+            container_length (float): ความยาวของตู้คอนเทนเนอร์ (แกน x)
+            container_width (float): ความกว้างของตู้คอนเทนเนอร์ (แกน y)
+            container_height (float): ความสูงสูงสุดที่ผิวบนของกล่องวางได้
+            support_threshold (float): สัดส่วนพื้นที่รองรับขั้นต่ำของฐานกล่อง
+        """
+        self.x0 = int(container_x)
+        self.y0 = int(container_y)
+        self.nx = max(0, min(int(container_x + container_length), int(pallet.width)) - self.x0)
+        self.ny = max(0, min(int(container_y + container_width), int(pallet.length)) - self.y0)
+        self.container_height = container_height
+        self.frame_height = pallet.frame_height
+        self.gap = pallet.gap
+        self.support_threshold = support_threshold
+        self.heights = np.full((self.nx, self.ny), float(pallet.frame_height))  # ความสูงผิวบนของแต่ละช่อง
+        self.owner = np.full((self.nx, self.ny), -1, dtype=np.int32)  # กล่องใน graph ที่เป็นผิวบน (-1 = พื้นพาเลท)
+        self.graph = SupportGraph()
+        self._owns_heights = True  # False เมื่อ heights, owner และ graph ใช้ร่วมกับสำเนาจาก copy()
+        for box in pallet.boxes:  # นำกล่องที่วางไว้แล้วมาสร้างผิวบน
+            x, y, z = box.position
+            self.place(x, y, z, box.width, box.length, box.height, box.weight, box.max_weight)
+
+    def _window(self, x, y, dx, dy):
+        """
+        แปลงพิกัดและขนาดกล่องเป็นช่วงดัชนีในกริด (ตัดให้อยู่ในตู้)
+        """
+        i0 = max(0, int(x) - self.x0)
+        j0 = max(0, int(y) - self.y0)
+        i1 = min(self.nx, int(x) - self.x0 + _cells(dx))
+        j1 = min(self.ny, int(y) - self.y0 + _cells(dy))
+        return i0, i1, j0, j1
+
+    def support_ratio(self, x, y, z, dx, dy):
+        """
+        คำนวณสัดส่วนของฐานกล่องที่วางอยู่บนผิวที่ระดับ z พอดี
+        """
+        i0, i1, j0, j1 = self._window(x, y, dx, dy)
+        window = self.heights[i0:i1, j0:j1]
+        return np.count_nonzero(window == z) / window.size if window.size else 0.0
+
+    def contacts(self, x, y, z, dx, dy):
+        """
+        กล่องที่ฐานของกล่องที่ระดับ z สัมผัส พร้อมจำนวนช่องที่สัมผัส
+        Returns:
+            dict: {หมายเลขกล่องใน graph (-1 = พื้นพาเลท): จำนวนช่อง}
+        """
+        i0, i1, j0, j1 = self._window(x, y, dx, dy)
+        touching = self.owner[i0:i1, j0:j1][self.heights[i0:i1, j0:j1] == z]
+        nodes, counts = np.unique(touching, return_counts=True)
+        return dict(zip(nodes.tolist(), counts.tolist()))
+
+    def load_ok(self, x, y, z, dx, dy, weight):
+        """
+        ตรวจว่ากล่องน้ำหนัก weight ที่ตำแหน่งนี้ไม่ทำให้กล่องด้านล่างรับน้ำหนักเกิน
+        """
+        if weight <= 0 or z == self.frame_height or not len(self.graph):
+            return True
+        ok = self.graph.can_add(self.contacts(x, y, z, dx, dy), weight)
+        if not ok:
+            STATS.reject("load")
+        return ok
+
+    def feasible_positions(self, dx, dy, dz):
+        """
+        หาตำแหน่งฐานที่วางได้ทั้งหมดของกล่องขนาด dx x dy x dz (ยังไม่ตรวจพื้นที่รองรับ)
+        Returns:
+            tuple: (ix, iy, zs, flat) ดัชนีในกริด, ความสูงฐาน และ flag ว่าฐานเรียบทั้งหน้า
+                   เรียงตาม (z, y, x) จากน้อยไปมาก หรือ None หากไม่มีตำแหน่ง
+        """
+        fx, fy = _cells(dx), _cells(dy)
+        if fx > self.nx or fy > self.ny or fx <= 0 or fy <= 0:
+            return None
+        zmax = window_max(self.heights, fx, fy)
+        feasible = zmax + dz <= self.container_height + 1e-9
+        if STATS.enabled:
+            STATS.count("candidates", feasible.size)
+            STATS.reject("height", feasible.size - np.count_nonzero(feasible))
+        if not feasible.any():
+            return None
+        ix, iy = np.nonzero(feasible)
+        zs = zmax[ix, iy]
+        flat = window_min(self.heights, fx, fy)[ix, iy] == zs
+        order = np.lexsort((ix, iy, zs))
+        return ix[order], iy[order], zs[order], flat[order]
+
+    def find_position(self, dx, dy, dz, weight=0.0):
+        """
+        หาตำแหน่งที่ต่ำที่สุด (เรียงตาม z, y, x) ที่กล่องวางได้ มีพื้นที่รองรับเพียงพอ และไม่ทำให้กล่องด้านล่างรับน้ำหนักเกิน
+        Args:
+            dx (float): ความกว้างของกล่อง (แกน x)
+            dy (float): ความยาวของกล่อง (แกน y)
+            dz (float): ความสูงของกล่อง
+            weight (float): น้ำหนักของกล่อง (0 = ไม่ตรวจภาระ)
+        Returns:
+            tuple: ตำแหน่ง (x, y, z) ของมุมล่างซ้ายของกล่อง หรือ None หากวางไม่ได้
+        """
+        candidates = self.feasible_positions(dx, dy, dz)
+        if candidates is None:
+            return None
+        ix, iy, zs, flat = candidates
+        fx, fy = _cells(dx), _cells(dy)
+        windows = sliding_window_view(self.heights, (fx, fy))
+        for start in range(0, len(zs), self.SUPPORT_CHUNK):
+            stop = start + self.SUPPORT_CHUNK
+            cx, cy, cz, cflat = ix[start:stop], iy[start:stop], zs[start:stop], flat[start:stop]
+            supported = cflat | (cz == self.frame_height)
+            if not supported.all():
+                if STATS.enabled:
+                    STATS.count("support_checks", len(supported) - np.count_nonzero(supported))
+                contact = (windows[cx, cy] == cz[:, None, None]).sum(axis=(1, 2))
+                supported |= contact / (fx * fy) >= self.support_threshold
+                if STATS.enabled:
+                    STATS.reject("support", len(supported) - np.count_nonzero(supported))
+            for k in np.flatnonzero(supported):
+                x, y, z = self.x0 + int(cx[k]), self.y0 + int(cy[k]), float(cz[k])
+                if self.load_ok(x, y, z, dx, dy, weight):
+                    return x, y, z
+        return None
+
+    def supported_positions(self, dx, dy, dz):
+        """
+        หาตำแหน่งที่วางได้และมีพื้นที่รองรับเพียงพอทั้งหมด พร้อมค่าที่ใช้ให้คะแนน
+        Returns:
+            tuple: (ix, iy, zs, contact, edge) ดัชนีในกริด, ความสูงฐาน, สัดส่วนพื้นที่รองรับ
+                   และสัดส่วนขอบที่ชิดผนัง/กล่องข้างเคียง หรือ None หากไม่มีตำแหน่ง
+        """
+        candidates = self.feasible_positions(dx, dy, dz)
+        if candidates is None:
+            return None
+        ix, iy, zs, flat = candidates
+        fx, fy = _cells(dx), _cells(dy)
+        windows = sliding_window_view(self.heights, (fx, fy))
+        contact = np.ones(len(zs))
+        rough = np.flatnonzero(~flat)
+        for start in range(0, len(rough), self.SUPPORT_CHUNK):
+            chunk = rough[start:start + self.SUPPORT_CHUNK]
+            contact[chunk] = (windows[ix[chunk], iy[chunk]] == zs[chunk, None, None]).sum(axis=(1, 2)) / (fx * fy)
+        keep = (contact >= self.support_threshold) | (zs == self.frame_height)
+        if STATS.enabled:
+            STATS.count("support_checks", len(rough))
+            STATS.reject("support", len(keep) - np.count_nonzero(keep))
+        if not keep.any():
+            return None
+        ix, iy, zs, contact = ix[keep], iy[keep], zs[keep], contact[keep]
+        # ขอบที่ติดผนังตู้ (ค่า inf) หรือมีผิวข้างเคียงสูงกว่าฐานของกล่อง ถือว่าชิด
+        padded = np.pad(self.heights, 1, constant_values=np.inf)
+        along_y = iy[:, None] + 1 + np.arange(fy)[None, :]
+        along_x = ix[:, None] + 1 + np.arange(fx)[None, :]
+        touching = ((padded[ix[:, None], along_y] > zs[:, None]).sum(axis=1)
+                    + (padded[ix[:, None] + fx + 1, along_y] > zs[:, None]).sum(axis=1)
+                    + (padded[along_x, iy[:, None]] > zs[:, None]).sum(axis=1)
+                    + (padded[along_x, iy[:, None] + fy + 1] > zs[:, None]).sum(axis=1))
+        edge = touching / (2 * (fx + fy))
+        return ix, iy, zs, contact, edge
+
+    def ranked_positions(self, orientations, weights=None, limit=1, weight=0.0, deadline=None):
+        """
+        จัดอันดับตำแหน่งและแนวการหมุนที่วางได้ทั้งหมดตามคะแนน
+        Args:
+            orientations (list): ขนาด (dx, dy, dz) ของแต่ละแนวการหมุน เช่น Box.can_rotate()
+            weights (dict): น้ำหนักของเกณฑ์ให้คะแนน (ดู scoring.DEFAULT_WEIGHTS)
+            limit (int): จำนวนตำแหน่งที่ต้องการ
+            weight (float): น้ำหนักของกล่อง ใช้ข้ามตำแหน่งที่ทำให้กล่องด้านล่างรับน้ำหนักเกิน (0 = ไม่ตรวจ)
+            deadline (float): เวลา time.perf_counter() ที่ต้องหยุดค้นหา เมื่อเลยแล้วจะไม่ลองแนวการหมุนถัดไป
+                และหยุดตรวจภาระ แล้วคืนเฉพาะตำแหน่งที่จัดอันดับได้แล้ว; None = ไม่จำกัด
+        Returns:
+            list: [(score, x, y, z, orientation, contact), ...] เรียงจากคะแนนมากไปน้อย
+                  (คะแนนเท่ากันเรียงตาม (z, y, x) และแนวการหมุน)
+        """
+        ranked = []
+        seen = set()
+        for orientation, (dx, dy, dz) in enumerate(orientations):
+            if (dx, dy, dz) in seen:  # กล่องฐานจัตุรัสไม่ต้องคำนวณซ้ำ
+                continue
+            seen.add((dx, dy, dz))
+            found = self.supported_positions(dx, dy, dz)
+            if found is None:
+                continue
+            ix, iy, zs, contact, edge = found
+            with STATS.phase("score"):
+                scores = placement_scores(contact, edge, zs + dz, self.container_height, weights)
+                if weight > 0 and len(self.graph):  # ตรวจภาระเฉพาะตำแหน่งที่คะแนนสูงจนกว่าจะครบ limit
+                    top = []
+                    for k in np.argsort(-scores, kind="stable"):
+                        if len(top) == limit or (deadline is not None and time.perf_counter() > deadline):
+                            break
+                        if self.load_ok(self.x0 + int(ix[k]), self.y0 + int(iy[k]), float(zs[k]), dx, dy, weight):
+                            top.append(k)
+                elif limit == 1:
+                    top = [best_index(scores)]
+                else:
+                    top = np.argsort(-scores, kind="stable")[:limit]
+            ranked.extend((float(scores[k]), self.x0 + int(ix[k]), self.y0 + int(iy[k]), float(zs[k]), orientation,
+                           float(contact[k])) for k in top)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        ranked.sort(key=lambda item: -item[0])  # stable: ตำแหน่งที่มาก่อนยังคงมาก่อนเมื่อคะแนนเท่ากัน
+        return ranked[:limit]
+
+    def best_position(self, orientations, weights=None, weight=0.0, deadline=None):
+        """
+        เลือกตำแหน่งและแนวการหมุนที่ได้คะแนนสูงสุดจากทุกตำแหน่งที่วางได้ (best fit)
+        Args:
+            orientations (list): ขนาด (dx, dy, dz) ของแต่ละแนวการหมุน เช่น Box.can_rotate()
+            weights (dict): น้ำหนักของเกณฑ์ให้คะแนน (ดู scoring.DEFAULT_WEIGHTS)
+            weight (float): น้ำหนักของกล่อง (0 = ไม่ตรวจภาระของกล่องด้านล่าง)
+            deadline (float): เวลา time.perf_counter() ที่ต้องหยุดค้นหา (ดู ranked_positions); None = ไม่จำกัด
+        Returns:
+            tuple: (x, y, z, orientation) หรือ None หากวางไม่ได้ทุกแนว (หรือหมดเวลาก่อนพบตำแหน่ง)
+        """
+        ranked = self.ranked_positions(orientations, weights, limit=1, weight=weight, deadline=deadline)
+        return ranked[0][1:5] if ranked else None
+
+    def copy(self):
+        """
+        สร้างสำเนาของ engine แบบ copy-on-write: ใช้อาร์เรย์ heights ร่วมกันจนกว่าฝั่งใดฝั่งหนึ่งจะวางกล่อง
+        Returns:
+            HeightmapEngine: สำเนาที่แก้ไขได้อิสระ
+        """
+        clone = object.__new__(HeightmapEngine)
+        clone.__dict__.update(self.__dict__)
+        clone._owns_heights = self._owns_heights = False
+        return clone
+
+    def _writable_heights(self):
+        """
+        คืนอาร์เรย์ heights ที่แก้ไขได้ (คัดลอก heights, owner และ graph ก่อนหากยังใช้ร่วมกับสำเนาอื่น)
+        """
+        if not self._owns_heights:
+            self.heights = self.heights.copy()
+            self.owner = self.owner.copy()
+            self.graph = self.graph.copy()
+            self._owns_heights = True
+        return self.heights
+
+    def place(self, x, y, z, dx, dy, dz, weight=0.0, max_load=None):
+        """
+        ปรับผิวบนของกริดหลังวางกล่อง (รวมช่องว่างระหว่างกล่อง) และเพิ่มกล่องลงใน SupportGraph
+        Args:
+            weight (float): น้ำหนักของกล่อง (กระจายลงกล่องด้านล่างตามพื้นที่สัมผัส)
+            max_load (float): น้ำหนักสูงสุดที่วางทับกล่องนี้ได้ (None = ไม่จำกัด)
+        """
+        heights = self._writable_heights()
+        node = self.graph.add(z, weight, max_load, self.contacts(x, y, z, dx, dy))
+        i0, i1, j0, j1 = self._window(x, y, dx + self.gap, dy + self.gap)
+        region = heights[i0:i1, j0:j1]
+        self.owner[i0:i1, j0:j1][region < z + dz] = node
+        np.maximum(region, z + dz, out=region)
+
+    def place_block(self, dx, dy, dz, count, per_row, rows, layers, weight=0.0, max_load=None):
+        """
+        วางกล่องขนาดเดียวกันเป็นบล็อก per_row x rows x layers บนพื้นตู้ที่ยังว่าง เรียงตาม x, y แล้วจึงชั้น
+        ตำแหน่งคำนวณจากขนาดกล่องโดยตรง ซึ่งเป็นตำแหน่งเดียวกับที่ find_position และ place_row จะเลือกทีละชิ้น
+        ผิวบนถูกปรับทีละแถว และชั้นถัดไปวางเฉพาะเมื่อไม่เกินความสูงของตู้และกล่องด้านล่างไม่รับน้ำหนักเกิน
+        Args:
+            dx, dy, dz (float): ขนาดของกล่อง
+            count (int): จำนวนชิ้นที่ต้องการวาง
+            per_row, rows, layers (int): ขนาดของบล็อก (ดู feasibility.FeasibilityTable)
+            weight (float): น้ำหนักของกล่องหนึ่งชิ้น
+            max_load (float): น้ำหนักสูงสุดที่วางทับกล่องได้ (None = ไม่จำกัด)
+        Returns:
+            list: ตำแหน่ง (x, y, z) ของชิ้นที่วางได้ตามลำดับ (ว่างหากตู้มีกล่องอยู่แล้ว)
+        """
+        if len(self.graph) or count <= 0:
+            return []
+        heights = self._writable_heights()
+        step_x, step_y, area = _cells(dx + self.gap), _cells(dy + self.gap), _cells(dx) * _cells(dy)
+        positions = []
+        below = None  # หมายเลขใน graph ของกล่องในชั้นก่อนหน้า (ชั้นบนวางตรงกันทุกชิ้น)
+        z = float(self.frame_height)
+        for _ in range(layers):
+            if len(positions) == count or z + dz > self.container_height + 1e-9:
+                break
+            if below is not None and not self.load_ok(self.x0, self.y0, z, dx, dy, weight):
+                break  # ทุกกองสูงเท่ากัน กองแรกรับไม่ได้จึงรับไม่ได้ทุกกอง
+            nodes = []
+            for row in range(rows):
+                n = min(per_row, count - len(positions))
+                if n <= 0:
+                    break
+                first = len(self.graph)
+                for col in range(n):
+                    contacts = {-1 if below is None else below[len(nodes)]: area}
+                    nodes.append(self.graph.add(z, weight, max_load, contacts))
+                    positions.append((self.x0 + step_x * col, self.y0 + step_y * row, z))
+                i1, j0, j1 = min(self.nx, step_x * n), step_y * row, min(self.ny, step_y * (row + 1))
+                heights[:i1, j0:j1] = z + dz
+                self.owner[:i1, j0:j1] = np.repeat(np.arange(first, first + n, dtype=np.int32), step_x)[:i1, None]
+            below = nodes
+            z = z + dz
+        return positions
+
+    def place_row(self, x, y, z, dx, dy, dz, count, weight=0.0, max_load=None):
+        """
+        วางกล่องขนาดเดียวกันต่อกันเป็นแถวตามแกน x เริ่มจาก (x, y, z) ได้สูงสุด count ชิ้น
+        ชิ้นถัดไปจะถูกวางเฉพาะเมื่อฐานเรียบที่ระดับ z ทั้งหน้า ซึ่งเป็นตำแหน่งเดียวกับที่
+        find_position จะเลือกให้ชิ้นนั้น จึงไม่ต้องค้นหาใหม่ทีละชิ้น
+        Args:
+            x, y, z (float): ตำแหน่งของชิ้นแรก (ได้จาก find_position)
+            dx, dy, dz (float): ขนาดของกล่อง
+            count (int): จำนวนชิ้นที่ต้องการวาง
+            weight (float): น้ำหนักของกล่องหนึ่งชิ้น (แถวหยุดเมื่อชิ้นถัดไปทำให้กล่องด้านล่างรับน้ำหนักเกิน)
+            max_load (float): น้ำหนักสูงสุดที่วางทับกล่องได้ (None = ไม่จำกัด)
+        Returns:
+            list: ตำแหน่ง x ของชิ้นที่วางได้ (ชิ้นแรกเสมอ)
+        """
+        step, fx, fy = _cells(dx + self.gap), _cells(dx), _cells(dy)
+        i, j = int(x) - self.x0, int(y) - self.y0
+        more = max(0, min(count - 1, (self.nx - i - step - fx) // step + 1))
+        run = 0
+        if more:
+            starts = i + step * np.arange(1, more + 1)
+            tiles = self.heights[starts[:, None] + np.arange(fx)[None, :], j:j + fy]  # (more, fx, fy)
+            flat = (tiles.max(axis=(1, 2)) == z) & (tiles.min(axis=(1, 2)) == z)
+            run = more if flat.all() else int(np.argmin(flat))
+        xs = []
+        for k in range(run + 1):  # ชิ้นในแถวไม่ทับซ้อนกัน ค่า flat ที่คำนวณก่อนวางจึงยังใช้ได้
+            row_x = int(x) + step * k
+            if k and not self.load_ok(row_x, y, z, dx, dy, weight):
+                break
+            self.place(row_x, y, z, dx, dy, dz, weight, max_load)
+            xs.append(row_x)
+        return xs
@@ -0,0 +1,145 @@
+# instrumentation.py
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+_NO_PHASE = nullcontext()  # ใช้ซ้ำเมื่อปิดการวัดผล จึงไม่สร้าง object ใหม่ทุกครั้ง
+
+
+class _Phase:
+    """
+    context manager ที่บวกเวลาที่ใช้ในบล็อกเข้ากับ phase หนึ่ง
+    """
+
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.phase_seconds[self.name] += time.perf_counter() - self.start
+        self.stats.phase_calls[self.name] += 1
+        return False
+
+
+class Instrumentation:
+    """
+    คลาส Instrumentation: ตัวนับและเวลาของแต่ละ phase ของการวางกล่อง
+    ปิดไว้โดยค่าเริ่มต้น โค้ดใน hot path ตรวจ enabled ก่อนคำนวณค่าที่จะนับ จึงแทบไม่มีต้นทุนเมื่อปิด
+
+    ชื่อตัวนับที่ใช้: candidates (ตำแหน่งที่พิจารณา), collision_checks, support_checks,
+    rejected.<เหตุผล> (bounds / height / collision / support / infeasible), scans (การไล่หาตำแหน่งด้วย kernel)
+    และ blocks (กล่องที่วางเป็นบล็อกตามตาราง feasibility โดยไม่ต้องค้นหา)
+    phase ที่ใช้: load, place, score, plot, export (score ถูกนับรวมอยู่ใน place ด้วย)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = Counter()
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = Counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        ล้างตัวนับและเวลาทั้งหมด
+        """
+        self.counters.clear()
+        self.phase_seconds.clear()
+        self.phase_calls.clear()
+
+    def count(self, name, n=1):
+        """
+        เพิ่มตัวนับ name ขึ้น n (ไม่ทำอะไรเมื่อปิด)
+        """
+        if self.enabled:
+            self.counters[name] += int(n)
+
+    def reject(self, reason, n=1):
+        """
+        นับตำแหน่งที่ถูกตัดทิ้งตามเหตุผล
+        """
+        if self.enabled:
+            self.counters["rejected." + reason] += int(n)
+
+    def phase(self, name):
+        """
+        Returns:
+            context manager ที่จับเวลาบล็อกเป็น phase name (ไม่จับเวลาเมื่อปิด)
+        """
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {"counters": {...}, "phases": {name: {"seconds": float, "calls": int}}}
+        """
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "phases": {name: {"seconds": round(seconds, 6), "calls": self.phase_calls[name]}
+                       for name, seconds in self.phase_seconds.items()},
+        }
+
+    def log_summary(self, level=logging.INFO):
+        """
+        เขียนตัวนับและเวลาของแต่ละ phase ลง logging
+        """
+        data = self.snapshot()
+        for name, phase in data["phases"].items():
+            logger.log(level, f"phase {name:<10}{phase['seconds']:>10.4f} s ({phase['calls']} calls)")
+        for name, value in data["counters"].items():
+            logger.log(level, f"count {name:<24}{value:>10}")
+
+    def write_trace(self, path, **meta):
+        """
+        บันทึก snapshot เป็นไฟล์ JSON
+        Args:
+            path (str): ไฟล์ปลายทาง
+            **meta: ข้อมูลประกอบที่เขียนไว้ใน key "meta" (เช่น ชื่อไฟล์ order)
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"meta": meta, **self.snapshot()}, file, indent=2)
+
+
+STATS = Instrumentation()  # ตัววัดผลของ process นี้ (ใช้ร่วมกันทุกโมดูล)
+
+
+@contextmanager
+def profiled(path=None, sort="cumulative", limit=25):
+    """
+    รันบล็อกภายใต้ cProfile แล้วบันทึกสถิติ
+    Args:
+        path (str): ไฟล์สำหรับ pstats (เปิดดูด้วย python -m pstats หรือ snakeviz); None = ไม่บันทึกไฟล์
+        sort (str): คีย์ที่ใช้เรียงตอนเขียนสรุปลง logging
+        limit (int): จำนวนฟังก์ชันในสรุป
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+            logger.info(f"Profile written to {path}")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats(sort).print_stats(limit)
+        logger.info(text.getvalue())
@@ -0,0 +1,365 @@
+# kernels.py
+# ตรวจการชน พื้นที่รองรับ และพื้นที่ว่างทีละหลายตำแหน่ง
+# ใช้ Numba (ถ้าติดตั้ง) คอมไพล์ลูปที่หยุดทันทีเมื่อพบตำแหน่งแรก มิฉะนั้นใช้ NumPy แบบ vectorized
+# ทั้งสองแบบใช้นิพจน์และชนิดข้อมูลเดียวกับการตรวจทีละตำแหน่งเดิม จึงให้ผลเหมือนกันทุกประการ
+import itertools
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # ใช้ NumPy แทน
+    njit = None
+    HAVE_NUMBA = False
+
+USE_NUMBA = HAVE_NUMBA  # ตั้งเป็น False เพื่อบังคับใช้ NumPy (เช่น เพื่อเปรียบเทียบผล)
+
+# ลำดับคอลัมน์ของ array กล่องแบบ packed: x, y, z, ความยาว (แกน x), ความกว้าง (แกน y), ความสูง
+BOX_FIELDS = ("X", "Y", "Z", "Length", "Width", "Height")
+
+
+class PackedBoxes:
+    """
+    คลาส PackedBoxes: กล่องที่วางแล้วเก็บเป็น array int32 ขนาด (n, 6) ตาม BOX_FIELDS (ขยายขนาดแบบเท่าตัว)
+    """
+
+    def __init__(self, capacity=64):
+        self.data = np.zeros((max(1, capacity), 6), dtype=np.int32)
+        self.count = 0
+
+    def append(self, x, y, z, dx, dy, dz):
+        if self.count == len(self.data):
+            self.data = np.concatenate([self.data, np.zeros_like(self.data)])
+        self.data[self.count] = (x, y, z, dx, dy, dz)
+        self.count += 1
+
+    @property
+    def boxes(self):
+        """
+        Returns:
+            np.ndarray: กล่องที่วางแล้ว ขนาด (count, 6)
+        """
+        return self.data[:self.count]
+
+
+def _box_sums(table, x0, x1, y0, y1, z0, z1):
+    """
+    ผลรวมของช่องในช่วง [x0, x1) x [y0, y1) x [z0, z1) จาก integral volume (รับ array ที่ broadcast กันได้)
+    """
+    return (table[x1, y1, z1] - table[x0, y1, z1] - table[x1, y0, z1] - table[x1, y1, z0]
+            + table[x0, y0, z1] + table[x0, y1, z0] + table[x1, y0, z0] - table[x0, y0, z0])
+
+
+def integral_volume(grid, out=None):
+    """
+    สร้าง integral volume (ผลรวมสะสม 3 มิติ) ของตาราง occupancy เพื่อนับช่องที่ถูกจองในกล่องใดๆ ได้ใน O(1)
+    Args:
+        grid (np.ndarray): ตาราง bool ขนาด (W, L, H)
+        out (np.ndarray): ตาราง int32 ขนาด (W + 1, L + 1, H + 1) ที่จะเขียนทับ (None = สร้างใหม่)
+    Returns:
+        np.ndarray: int32 ขนาด (W + 1, L + 1, H + 1) โดย table[i, j, k] = จำนวนช่องที่ถูกจองใน grid[:i, :j, :k]
+    """
+    table = np.zeros(tuple(n + 1 for n in grid.shape), dtype=np.int32) if out is None else out
+    table[0], table[:, 0], table[:, :, 0] = 0, 0, 0
+    np.cumsum(grid, axis=0, dtype=np.int32, out=table[1:, 1:, 1:])
+    np.cumsum(table[1:, 1:, 1:], axis=1, out=table[1:, 1:, 1:])
+    np.cumsum(table[1:, 1:, 1:], axis=2, out=table[1:, 1:, 1:])
+    return table
+
+
+def update_integral(table, added, x0, y0, z0):
+    """
+    ปรับ integral volume ในที่เดิมเมื่อช่อง added (ที่มุม (x0, y0, z0)) เพิ่งถูกจอง แทนการสร้างตารางใหม่ทั้งหมด
+    Args:
+        table (np.ndarray): integral volume จาก integral_volume()
+        added (np.ndarray): ตาราง bool ของช่องที่ถูกจองใหม่ (ช่องที่ถูกจองอยู่แล้วต้องเป็น False)
+        x0, y0, z0 (int): มุมของ added ในตาราง occupancy
+    """
+    if not added.any():
+        return
+    partial = np.cumsum(added, axis=0, dtype=np.int32)
+    np.cumsum(partial, axis=1, out=partial)
+    np.cumsum(partial, axis=2, out=partial)
+    # table[i, j, k] เพิ่มขึ้นเท่ากับจำนวนช่องของ added ใน [:i, :j, :k]; เกินขอบของ added ใช้ค่าที่ขอบ (broadcast)
+    axes = [((slice(start + 1, start + n + 1), slice(None)), (slice(start + n + 1, None), slice(-1, None)))
+            for start, n in zip((x0, y0, z0), added.shape)]
+    for (tx, px), (ty, py), (tz, pz) in itertools.product(*axes):
+        table[tx, ty, tz] += partial[px, py, pz]
+
+
+def _area_table(counts, out):
+    """
+    integral ของตาราง 2 มิติ counts ขนาด (W, L) ลงใน out ขนาด (W + 1, L + 1)
+    """
+    out[0], out[:, 0] = 0, 0
+    np.cumsum(counts, axis=0, dtype=out.dtype, out=out[1:, 1:])
+    np.cumsum(out[1:, 1:], axis=1, out=out[1:, 1:])
+    return out
+
+
+def _area_sums(table, x0, x1, y0, y1):
+    return table[x1, y1] - table[x0, y1] - table[x1, y0] + table[x0, y0]
+
+
+def column_tables(shape):
+    """
+    ตารางทำงานของ first_free_voxel_columns สำหรับ occupancy ขนาด shape (จัดสรรครั้งเดียวแล้วใช้ซ้ำ)
+    Returns:
+        np.ndarray: int32 ขนาด (2, W + 1, L + 1)
+    """
+    return np.zeros((2, shape[0] + 1, shape[1] + 1), dtype=np.int32)
+
+
+def _point_mask_numpy(table, xs, ys, zs, dx, dy, dz, frame_height, threshold):
+    """
+    ตรวจแต่ละตำแหน่ง (xs[i], ys[i], zs[i]) แบบเดียวกับ Pallet.is_space_available และ has_sufficient_support
+    """
+    width, length, height = (n - 1 for n in table.shape)
+    xs = np.asarray(xs, dtype=np.int64)
+    ys = np.asarray(ys, dtype=np.int64)
+    zs = np.asarray(zs, dtype=np.int64)
+    x_end = (xs + dx).astype(np.int64)  # int(x + dx) เหมือนการตรวจทีละตำแหน่ง
+    y_end = (ys + dy).astype(np.int64)
+    z_end = (zs + dz).astype(np.int64)
+    inside = (x_end <= width) & (y_end <= length) & (z_end <= height)
+    cx, cy, cz = np.minimum(x_end, width), np.minimum(y_end, length), np.minimum(z_end, height)
+    free = inside & (_box_sums(table, xs, cx, ys, cy, zs, cz) == 0)
+    support = _box_sums(table, xs, cx, ys, cy, 0, np.minimum(zs, height)) / (dx * dy) >= threshold
+    return free & ((zs == frame_height) | support)
+
+
+def _first_point_python(table, xs, ys, zs, dx, dy, dz, frame_height, threshold):
+    mask = _point_mask_numpy(table, xs, ys, zs, dx, dy, dz, frame_height, threshold)
+    return int(np.argmax(mask)) if mask.any() else -1
+
+
+def _first_voxel_python(table, x_range, y_range, z_range, dx, dy, dz, frame_height, threshold):
+    xs = np.arange(*x_range)
+    ys = np.arange(*y_range)
+    if not xs.size or not ys.size:
+        return None
+    gy, gx = np.meshgrid(ys, xs, indexing="ij")  # ลำดับการไล่ (y, x) ในแต่ละชั้น z
+    gx, gy = gx.ravel(), gy.ravel()
+    for z in range(*z_range):
+        mask = _point_mask_numpy(table, gx, gy, np.full(gx.shape, z), dx, dy, dz, frame_height, threshold)
+        if mask.any():
+            k = int(np.argmax(mask))
+            return int(gx[k]), int(gy[k]), z
+    return None
+
+
+def _collide_mask_numpy(boxes, xs, ys, zs, dx, dy, dz):
+    """
+    การชนของแต่ละตำแหน่งกับกล่องทุกใบใน boxes (ซ้อนทับกันทั้ง 3 แกน)
+    """
+    bx, by, bz, bdx, bdy, bdz = (boxes[:, i][None, :].astype(np.int64) for i in range(6))
+    xs, ys, zs = (np.asarray(v, dtype=np.int64)[:, None] for v in (xs, ys, zs))
+    apart = ((xs + dx <= bx) | (xs >= bx + bdx) | (ys + dy <= by) | (ys >= by + bdy)
+             | (zs + dz <= bz) | (zs >= bz + bdz))
+    return ~apart.all(axis=1)
+
+
+def _support_mask_numpy(boxes, xs, ys, zs, dx, dy):
+    """
+    พื้นที่รองรับของแต่ละตำแหน่ง: อยู่บนพื้น จุดศูนย์กลางฐานอยู่บนกล่องด้านล่าง หรือฐานทับกล่องด้านล่างอย่างน้อยครึ่งหนึ่ง
+    """
+    bx, by, bdx, bdy = (boxes[:, i][None, :].astype(np.int64) for i in (0, 1, 3, 4))
+    top = (boxes[:, 2].astype(np.int64) + boxes[:, 5])[None, :]
+    xs, ys, zs = (np.asarray(v, dtype=np.int64)[:, None] for v in (xs, ys, zs))
+    resting = np.abs(top - zs) < 1e-6
+    com_x, com_y = xs + dx / 2, ys + dy / 2
+    centered = resting & (bx <= com_x) & (com_x <= bx + bdx) & (by <= com_y) & (com_y <= by + bdy)
+    overlap_x = np.maximum(0, np.minimum(xs + dx, bx + bdx) - np.maximum(xs, bx))
+    overlap_y = np.maximum(0, np.minimum(ys + dy, by + bdy) - np.maximum(ys, by))
+    area = np.where(resting, overlap_x * overlap_y, 0).sum(axis=1)
+    return (zs[:, 0] == 0) | centered.any(axis=1) | (area >= dx * dy * 0.5)
+
+
+def _fit_mask_python(boxes, points, dx, dy, dz, limit_x, limit_y, limit_z):
+    xs, ys, zs = points[:, 0], points[:, 1], points[:, 2]
+    mask = (xs + dx <= limit_x) & (ys + dy <= limit_y) & (zs + dz <= limit_z)
+    if len(boxes) and mask.any():
+        rows = np.flatnonzero(mask)
+        ok = ~_collide_mask_numpy(boxes, xs[rows], ys[rows], zs[rows], dx, dy, dz)
+        ok[ok] = _support_mask_numpy(boxes, xs[rows][ok], ys[rows][ok], zs[rows][ok], dx, dy)
+        mask[rows] = ok
+    elif mask.any():
+        mask &= zs == 0  # ยังไม่มีกล่อง: วางได้เฉพาะบนพื้น (ไม่มีผิวรองรับ)
+    return mask
+
+
+if HAVE_NUMBA:
+    @njit(cache=True)
+    def _box_sum_nb(table, x0, x1, y0, y1, z0, z1):
+        return (table[x1, y1, z1] - table[x0, y1, z1] - table[x1, y0, z1] - table[x1, y1, z0]
+                + table[x0, y0, z1] + table[x0, y1, z0] + table[x1, y0, z0] - table[x0, y0, z0])
+
+    @njit(cache=True)
+    def _point_ok_nb(table, x, y, z, dx, dy, dz, frame_height, threshold):
+        width, length, height = table.shape[0] - 1, table.shape[1] - 1, table.shape[2] - 1
+        x_end, y_end, z_end = int(x + dx), int(y + dy), int(z + dz)
+        if x_end > width or y_end > length or z_end > height:
+            return False
+        if _box_sum_nb(table, x, x_end, y, y_end, z, z_end) != 0:
+            return False
+        if z == frame_height:
+            return True
+        return _box_sum_nb(table, x, x_end, y, y_end, 0, min(z, height)) / (dx * dy) >= threshold
+
+    @njit(cache=True)
+    def _first_point_nb(table, xs, ys, zs, dx, dy, dz, frame_height, threshold):
+        for i in range(len(xs)):
+            if _point_ok_nb(table, xs[i], ys[i], zs[i], dx, dy, dz, frame_height, threshold):
+                return i
+        return -1
+
+    @njit(cache=True)
+    def _first_voxel_nb(table, x0, x1, y0, y1, z0, z1, dx, dy, dz, frame_height, threshold):
+        for z in range(z0, z1):
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    if _point_ok_nb(table, x, y, z, dx, dy, dz, frame_height, threshold):
+                        return x, y, z
+        return -1, -1, -1
+
+    @njit(cache=True)
+    def _fit_ok_nb(boxes, x, y, z, dx, dy, dz):
+        for b in range(boxes.shape[0]):
+            bx, by, bz = boxes[b, 0], boxes[b, 1], boxes[b, 2]
+            if not (x + dx <= bx or x >= bx + boxes[b, 3] or y + dy <= by or y >= by + boxes[b, 4]
+                    or z + dz <= bz or z >= bz + boxes[b, 5]):
+                return False
+        if z == 0:
+            return True
+        com_x, com_y = x + dx / 2, y + dy / 2
+        area = 0
+        for b in range(boxes.shape[0]):
+            bx, by = boxes[b, 0], boxes[b, 1]
+            if abs(boxes[b, 2] + boxes[b, 5] - z) < 1e-6:
+                if bx <= com_x <= bx + boxes[b, 3] and by <= com_y <= by + boxes[b, 4]:
+                    return True
+                area += max(0, min(x + dx, bx + boxes[b, 3]) - max(x, bx)) * \
+                    max(0, min(y + dy, by + boxes[b, 4]) - max(y, by))
+        return area >= dx * dy * 0.5
+
+    @njit(cache=True)
+    def _fit_mask_nb(boxes, points, dx, dy, dz, limit_x, limit_y, limit_z, first_only):
+        mask = np.zeros(points.shape[0], dtype=np.bool_)
+        for i in range(points.shape[0]):
+            x, y, z = points[i, 0], points[i, 1], points[i, 2]
+            if x + dx > limit_x or y + dy > limit_y or z + dz > limit_z:
+                continue
+            if _fit_ok_nb(boxes, x, y, z, dx, dy, dz):
+                mask[i] = True
+                if first_only:
+                    break
+        return mask
+
+
+def first_free_point(table, points, dx, dy, dz, frame_height, threshold=0.5):
+    """
+    หาตำแหน่งแรกใน points ที่ว่างและมีพื้นที่รองรับเพียงพอ (แบบ Pallet.is_space_available และ has_sufficient_support)
+    Args:
+        table (np.ndarray): integral volume จาก integral_volume()
+        points (np.ndarray): ตำแหน่ง (x, y, z) แบบจำนวนเต็ม ขนาด (n, 3) ตามลำดับที่ต้องการลอง
+        dx, dy, dz (float): ขนาดของกล่อง
+        frame_height (float): ความสูงพื้นพาเลท (วางบนพื้นไม่ต้องตรวจพื้นที่รองรับ)
+        threshold (float): สัดส่วนพื้นที่รองรับขั้นต่ำ
+    Returns:
+        int: ดัชนีใน points หรือ -1 หากไม่มี
+    """
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 3)
+    if not len(points):
+        return -1
+    if USE_NUMBA:
+        return int(_first_point_nb(table, points[:, 0], points[:, 1], points[:, 2], float(dx), float(dy), float(dz),
+                                   float(frame_height), float(threshold)))
+    return _first_point_python(table, points[:, 0], points[:, 1], points[:, 2], dx, dy, dz, frame_height, threshold)
+
+
+def first_free_voxel(table, x_range, y_range, z_range, dx, dy, dz, frame_height, threshold=0.5):
+    """
+    ไล่ทุกช่องตามลำดับ z, y, x (แบบ engine 'voxel') แล้วคืนตำแหน่งแรกที่ว่างและมีพื้นที่รองรับเพียงพอ
+    Args:
+        table (np.ndarray): integral volume จาก integral_volume()
+        x_range, y_range, z_range (tuple): ช่วง (start, stop) ของแต่ละแกน
+        dx, dy, dz (float): ขนาดของกล่อง
+        frame_height (float): ความสูงพื้นพาเลท
+        threshold (float): สัดส่วนพื้นที่รองรับขั้นต่ำ
+    Returns:
+        tuple: (x, y, z) หรือ None หากไม่มี
+    """
+    if USE_NUMBA:
+        x, y, z = _first_voxel_nb(table, *x_range, *y_range, *z_range, float(dx), float(dy), float(dz),
+                                  float(frame_height), float(threshold))
+        return None if x < 0 else (int(x), int(y), int(z))
+    return _first_voxel_python(table, x_range, y_range, z_range, dx, dy, dz, frame_height, threshold)
+
+
+def first_free_voxel_columns(occupancy, tables, x_range, y_range, z_range, dx, dy, dz, frame_height, threshold=0.5):
+    """
+    ผลเดียวกับ first_free_voxel แต่ไม่ต้องใช้ตาราง bool หรือ integral volume เต็มขนาด:
+    ในแต่ละชั้น z นับช่องที่ถูกจองต่อคอลัมน์ (x, y) ด้วย occupancy.column_counts() แล้วตรวจทุกตำแหน่ง (y, x)
+    ของชั้นนั้นพร้อมกันจาก integral 2 มิติ ใช้กับ backend ที่ไม่ได้เก็บตาราง bool (เช่น BitPackedOccupancy)
+    Args:
+        occupancy: backend ใน occupancy.OCCUPANCY_BACKENDS
+        tables (np.ndarray): ตารางทำงานจาก column_tables(occupancy.shape) (ถูกเขียนทับ)
+        x_range, y_range, z_range (tuple): ช่วง (start, stop) ของแต่ละแกน
+        dx, dy, dz (float): ขนาดของกล่อง
+        frame_height (float): ความสูงพื้นพาเลท
+        threshold (float): สัดส่วนพื้นที่รองรับขั้นต่ำ
+    Returns:
+        tuple: (x, y, z) หรือ None หากไม่มี
+    """
+    width, length, height = occupancy.shape
+    xs = np.arange(*x_range)
+    ys = np.arange(*y_range)
+    z_start, z_stop = z_range
+    if not xs.size or not ys.size or z_start >= z_stop:
+        return None
+    gy, gx = np.meshgrid(ys, xs, indexing="ij")  # ลำดับการไล่ (y, x) ในแต่ละชั้น z
+    gx, gy = gx.ravel(), gy.ravel()
+    x_end = (gx + dx).astype(np.int64)  # int(x + dx) เหมือนการตรวจทีละตำแหน่ง
+    y_end = (gy + dy).astype(np.int64)
+    inside = (x_end <= width) & (y_end <= length)
+    cx, cy = np.minimum(x_end, width), np.minimum(y_end, length)
+    layer, below = tables
+    _area_table(occupancy.column_counts(0, z_start), below)  # ช่องที่ถูกจองใต้ชั้น z (สำหรับพื้นที่รองรับ)
+    for z in range(z_start, z_stop):
+        z_end = int(z + dz)
+        if z_end > height:
+            return None  # ชั้นที่สูงกว่านี้ก็เกินตู้เช่นกัน
+        free = inside & (_area_sums(_area_table(occupancy.column_counts(z, z_end), layer), gx, cx, gy, cy) == 0)
+        if z != frame_height:
+            free &= _area_sums(below, gx, cx, gy, cy) / (dx * dy) >= threshold
+        if free.any():
+            k = int(np.argmax(free))
+            return int(gx[k]), int(gy[k]), z
+        below += _area_table(occupancy.column_counts(z, z + 1), layer)
+    return None
+
+
+def fit_mask(boxes, points, dims, container_dims, first_only=False):
+    """
+    ตรวจทุกตำแหน่งใน points ว่าวางกล่องได้หรือไม่: อยู่ในตู้ ไม่ชนกล่องใดใน boxes
+    และมีฐานรองรับ (ดู _collide_mask_numpy และ _support_mask_numpy)
+    Args:
+        boxes (np.ndarray): กล่องที่วางแล้ว ขนาด (n, 6) ตาม BOX_FIELDS (เช่น PackedBoxes.boxes)
+        points (np.ndarray): ตำแหน่ง (x, y, z) แบบจำนวนเต็ม ขนาด (m, 3)
+        dims (tuple): ขนาดของกล่อง (ความยาว, ความกว้าง, ความสูง) แบบจำนวนเต็ม
+        container_dims (tuple): ขนาดของตู้
+        first_only (bool): หยุดเมื่อพบตำแหน่งแรก (ตำแหน่งหลังจากนั้นจะเป็น False)
+    Returns:
+        np.ndarray: bool ขนาด (m,)
+    """
+    points = np.asarray(points, dtype=np.int32).reshape(-1, 3)
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 6)
+    dx, dy, dz = (int(v) for v in dims)
+    if USE_NUMBA:
+        return _fit_mask_nb(boxes, points, dx, dy, dz, *(int(v) for v in container_dims), first_only)
+    mask = _fit_mask_python(boxes, points, dx, dy, dz, *container_dims)
+    if first_only and mask.any():
+        first = int(np.argmax(mask))
+        mask[first + 1:] = False
+    return mask
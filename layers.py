@@ -0,0 +1,228 @@
+# layers.py
+import numpy as np
+
+from heightmap import _cells
+from instrumentation import STATS
+
+
+class Skyline:
+    """
+    คลาส Skyline: จัดวางสี่เหลี่ยมบนพื้นที่ 2 มิติแบบ skyline (bottom-left)
+    เก็บขอบบนของพื้นที่ที่ใช้แล้วเป็นช่วงต่อเนื่องตามแกน x แต่ละช่วงเป็น [x, ความยาว, y]
+    หน่วยเป็นจำนวนช่องของกริด (จำนวนเต็ม)
+    """
+
+    def __init__(self, length, width, profile=None):
+        """
+        Constructor ของคลาส Skyline
+        Args:
+            length (int): ความยาวของพื้นที่ (แกน x)
+            width (int): ความกว้างของพื้นที่ (แกน y)
+            profile (sequence): ขอบบนเริ่มต้นของแต่ละช่องตามแกน x (ค่าเริ่มต้นคือพื้นที่ว่างทั้งหมด)
+        """
+        self.length = length
+        self.width = width
+        self.segments = []
+        for x, top in enumerate([0] * length if profile is None else profile):
+            if self.segments and self.segments[-1][2] == top:
+                self.segments[-1][1] += 1
+            else:
+                self.segments.append([x, 1, int(top)])
+        if not self.segments:
+            self.segments = [[0, length, 0]]
+
+    def _rest_y(self, i, w):
+        """
+        ระดับ y ที่สี่เหลี่ยมกว้าง w ซึ่งเริ่มที่ช่วง i วางได้ (ค่าสูงสุดของช่วงที่อยู่ใต้สี่เหลี่ยม)
+        """
+        x_end = self.segments[i][0] + w
+        y = 0
+        for x, length, top in self.segments[i:]:
+            if x >= x_end:
+                break
+            y = max(y, top)
+        return y
+
+    def positions(self, w, d, fit_w=None, fit_d=None):
+        """
+        ตำแหน่งที่วางสี่เหลี่ยม w x d ได้ทั้งหมด (ชิดมุมซ้ายของแต่ละช่วงบน skyline)
+        Args:
+            w, d (int): ขนาดที่จองบน skyline (รวมช่องว่างระหว่างกล่อง)
+            fit_w, fit_d (int): ขนาดที่ต้องอยู่ภายในพื้นที่ (ไม่รวมช่องว่างที่ยื่นเกินผนังได้); ค่าเริ่มต้นคือ w, d
+        Returns:
+            list: [(top, x, y), ...] โดย top คือขอบบนของสี่เหลี่ยมหลังวาง เรียงตาม x
+        """
+        fit_w = w if fit_w is None else fit_w
+        fit_d = d if fit_d is None else fit_d
+        found = []
+        for i, (x, _, _) in enumerate(self.segments):
+            if x + fit_w > self.length:
+                break
+            y = self._rest_y(i, w)
+            if y + fit_d <= self.width:
+                found.append((y + d, x, y))
+        return found
+
+    def find(self, w, d, fit_w=None, fit_d=None):
+        """
+        หาตำแหน่ง bottom-left ของสี่เหลี่ยม w x d (ขอบบนต่ำที่สุด แล้วจึง x น้อยที่สุด)
+        Returns:
+            tuple: (top, x, y) หรือ None หากวางไม่ได้
+        """
+        return min(self.positions(w, d, fit_w, fit_d), default=None)
+
+    def add(self, x, y, w, d):
+        """
+        บันทึกสี่เหลี่ยมที่วางที่ (x, y) ขนาด w x d ลงใน skyline
+        """
+        x_end = min(self.length, x + w)
+        merged = []
+        for sx, length, top in self.segments:
+            s_end = sx + length
+            if s_end <= x or sx >= x_end:
+                merged.append([sx, length, top])
+                continue
+            if sx < x:
+                merged.append([sx, x - sx, top])
+            if s_end > x_end:
+                merged.append([x_end, s_end - x_end, top])
+        merged.append([x, x_end - x, y + d])
+        merged.sort()
+        self.segments = []
+        for segment in merged:  # รวมช่วงที่อยู่ติดกันและสูงเท่ากัน
+            if self.segments and self.segments[-1][2] == segment[2]:
+                self.segments[-1][1] += segment[1]
+            else:
+                self.segments.append(segment)
+
+
+class LayerPlanner:
+    """
+    คลาส LayerPlanner: วางกล่องเป็นชั้น ๆ ภายในหน้าต่างลำดับความสำคัญ
+    แต่ละชั้นเลือกกลุ่มกล่องที่สูงใกล้เคียงกัน (ต่างกันไม่เกิน height_tolerance) แล้วจัดวางแบบ 2 มิติด้วย Skyline
+    บนพื้นที่ตู้ทั้งหมด จากนั้นวางลงบนผิวบนจริงของ HeightmapEngine (ตรวจความสูงและพื้นที่รองรับทุกชิ้น)
+    ชั้นถัดไปจึงซ้อนบนชั้นก่อนหน้า หรือลงไปเติมส่วนที่ชั้นก่อนหน้ายังว่าง
+    """
+
+    # ค่าที่มีผลต่อผลการวาง (ใช้สร้าง key ของ PlacementCache)
+    SETTINGS = ("priority_window", "height_tolerance")
+
+    def __init__(self, priority_window=1, height_tolerance=0.0):
+        """
+        Constructor ของคลาส LayerPlanner
+        Args:
+            priority_window (int): จำนวนระดับความสำคัญที่ใช้จัดชั้นร่วมกัน (1 = ทีละระดับ ตามลำดับอย่างเคร่งครัด)
+            height_tolerance (float): ความสูงที่ต่างกันได้ภายในชั้นเดียวกัน (ซม.)
+        """
+        self.priority_window = max(1, int(priority_window))
+        self.height_tolerance = max(0.0, float(height_tolerance))
+        self.layers = []  # (ระดับฐาน, ความสูงของชั้น, จำนวนกล่องที่วางได้) ของรอบล่าสุด ตามลำดับการวาง
+
+    def _windows(self, batches):
+        """
+        แบ่ง batches (เรียงตามความสำคัญแล้ว) เป็นหน้าต่างละ priority_window ระดับ
+        """
+        levels = sorted({batch.sku.priority for batch in batches})
+        for start in range(0, len(levels), self.priority_window):
+            window = set(levels[start:start + self.priority_window])
+            yield [batch for batch in batches if batch.sku.priority in window]
+
+    def _height_groups(self, window, remaining):
+        """
+        แบ่งกล่องที่เหลือในหน้าต่างเป็นกลุ่มความสูง เรียงตามพื้นที่ฐานรวมจากมากไปน้อย (เท่ากันเลือกกลุ่มที่สูงกว่า)
+        """
+        heights = sorted({batch.sku.height for batch in window if remaining[id(batch)]}, reverse=True)
+        groups = []
+        while heights:
+            top = heights[0]
+            members = [h for h in heights if top - h <= self.height_tolerance + 1e-9]
+            heights = heights[len(members):]
+            batches = [batch for batch in window if remaining[id(batch)] and batch.sku.height in members]
+            area = sum(batch.sku.width * batch.sku.length * remaining[id(batch)] for batch in batches)
+            groups.append((area, top, batches))
+        groups.sort(key=lambda group: (-group[0], -group[1]))
+        return [batches for _, _, batches in groups]
+
+    def _place(self, engine, batch, skyline, remaining):
+        """
+        วางกล่องใน batch ลงในชั้นปัจจุบันจนกว่าจะหมดหรือไม่มีที่ว่างบน skyline
+        Returns:
+            int: จำนวนชิ้นที่วางได้
+        """
+        orientations = batch.sku.can_rotate()
+        # ขนาดที่จองบน skyline รวมช่องว่างระหว่างกล่อง (เหมือน HeightmapEngine.place) แต่ช่องว่างยื่นเกินผนังได้
+        shapes = [(_cells(dx + engine.gap), _cells(dy + engine.gap), _cells(dx), _cells(dy))
+                  for dx, dy, _ in orientations]
+        placed = 0
+        while remaining[id(batch)]:
+            options = [(found, orientation) for orientation, shape in enumerate(shapes)
+                       if (found := skyline.find(*shape)) is not None]
+            if not options:
+                break
+            (_, i, j), orientation = min(options)
+            skyline.add(i, j, *shapes[orientation][:2])  # จองไว้แม้จะวางไม่ได้ เพื่อไม่ให้ลองตำแหน่งเดิมซ้ำ
+            dx, dy, dz = orientations[orientation]
+            x, y = engine.x0 + i, engine.y0 + j
+            i0, i1, j0, j1 = engine._window(x, y, dx, dy)
+            z = float(engine.heights[i0:i1, j0:j1].max())  # ผิวบนจริงใต้กล่อง (ไม่เกินระดับของชั้น)
+            STATS.count("candidates")
+            if z + dz > engine.container_height + 1e-9:
+                STATS.reject("height")
+                continue
+            if z != engine.frame_height and engine.support_ratio(x, y, z, dx, dy) < engine.support_threshold:
+                STATS.reject("support")
+                continue
+            if not engine.load_ok(x, y, z, dx, dy, batch.sku.weight):
+                continue
+            k = batch.qty - remaining[id(batch)]
+            batch.set_position(k, (x, y, z), orientation)
+            engine.place(x, y, z, dx, dy, dz, batch.sku.weight, batch.sku.max_weight)
+            remaining[id(batch)] -= 1
+            placed += 1
+        return placed
+
+    def _layer(self, engine, level, batches, remaining):
+        """
+        จัดชั้นหนึ่งชั้นที่ระดับ level จากกลุ่มความสูงเดียวกัน (ชิ้นที่มีฐานใหญ่วางก่อน)
+        ช่องที่ผิวบนสูงกว่า level ถือว่าถูกใช้แล้วและเป็นขอบเริ่มต้นของ Skyline
+        Returns:
+            int: จำนวนชิ้นที่วางได้
+        """
+        blocked = engine.heights > level + 1e-9
+        profile = np.where(blocked.any(axis=1), engine.ny - np.argmax(blocked[:, ::-1], axis=1), 0)
+        skyline = Skyline(engine.nx, engine.ny, profile)
+        ordered = sorted(batches, key=lambda batch: -batch.sku.width * batch.sku.length)  # stable
+        return sum(self._place(engine, batch, skyline, remaining) for batch in ordered)
+
+    def plan(self, engine, batches, deadline=None):
+        """
+        วางกล่องทั้งหมดเป็นชั้น ๆ (แก้ไขตำแหน่งใน batches และผิวบนของ engine)
+        แต่ละชั้นเริ่มจากระดับผิวบนที่ต่ำที่สุดที่ยังวางกล่องได้ ชั้นถัดไปจึงเติมพื้นที่ที่เหลือของระดับเดิมก่อนซ้อนขึ้น
+        Args:
+            engine (HeightmapEngine): ผิวบนเริ่มต้น
+            batches (list): BoxBatch เรียงตามลำดับความสำคัญ
+            deadline (float): ไม่ใช้ (จัดชั้นแบบ greedy ไม่มีการค้นหาที่ต้องตัดเวลา) รับไว้ให้เรียกแบบเดียวกับ BeamPlanner.plan
+        """
+        self.layers = []
+        remaining = {id(batch): batch.qty - int(batch.placed_mask.sum()) for batch in batches}
+        for window in self._windows(batches):
+            while self._next_layer(engine, window, remaining):
+                pass
+
+    def _next_layer(self, engine, window, remaining):
+        """
+        วางชั้นถัดไปของหน้าต่าง: ลองทีละระดับผิวบนจากต่ำไปสูง และทีละกลุ่มความสูง
+        Returns:
+            bool: False หากไม่มีกลุ่มใดวางเพิ่มได้ (ชิ้นที่เหลือในหน้าต่างนี้วางไม่ได้)
+        """
+        groups = self._height_groups(window, remaining)
+        if not groups:
+            return False
+        for level in np.unique(engine.heights):
+            for group in groups:
+                placed = self._layer(engine, float(level), group, remaining)
+                if placed:
+                    STATS.count("layers")
+                    self.layers.append((float(level), max(batch.sku.height for batch in group), placed))
+                    return True
+        return False
@@ -2,47 +2,251 @@
 import csv
 import io
 import logging
+import os
+from collections import namedtuple
+from operator import itemgetter
+
+import numpy as np
+
 from box import Box
 
 logger = logging.getLogger(__name__)
 
-def load_boxes_from_csv(csv_data):
+# Canonical column -> accepted header names (compared case-insensitively, surrounding spaces ignored)
+HEADER_ALIASES = {
+    'BoxTypes': ('BoxTypes', 'BoxType', 'Box Type'),
+    'Width': ('Width', 'w'),
+    'Length': ('Length', 'l'),
+    'Height': ('Height', 'h'),
+    'Max weight': ('Max weight', 'MaxWeight'),
+    'Conveyor': ('Conveyor',),
+    'Priority': ('Priority',),
+    'QTY': ('QTY', 'Quantity'),
+    'Weight': ('Weight', 'Box weight', 'Gross weight'),
+}
+OPTIONAL_COLUMNS = {'Max weight': 100.0, 'Weight': 0.0}  # Column -> value used when the column is absent
+NUMERIC_COLUMNS = {
+    'Width': np.float64,
+    'Length': np.float64,
+    'Height': np.float64,
+    'Max weight': np.float64,
+    'Conveyor': np.int64,
+    'Priority': np.int64,
+    'QTY': np.int64,
+    'Weight': np.float64,
+}
+
+BadRow = namedtuple('BadRow', ['line', 'column', 'value', 'reason'])
+
+
+class OrderTable:
     """
-    Loads box data from CSV data.
+    Column arrays of an order file (sizes in mm, as in the file) and the rows that were rejected.
+    """
+
+    def __init__(self, columns, bad_rows):
+        """
+        Args:
+            columns (dict): Canonical column name -> array (BoxTypes is a str array).
+            bad_rows (list): BadRow entries for rejected rows, sorted by line.
+        """
+        self.columns = columns
+        self.bad_rows = bad_rows
+
+    def __len__(self):
+        return len(self.columns['BoxTypes'])
+
+    def to_boxes(self):
+        """
+        Creates one Box per row (mm -> cm).
+
+        Returns:
+            list: List of Box objects in file order.
+        """
+        c = self.columns
+        rows = zip(c['BoxTypes'].tolist(), (c['Width'] / 10).tolist(), (c['Length'] / 10).tolist(),
+                   (c['Height'] / 10).tolist(), c['Max weight'].tolist(), c['Conveyor'].tolist(),
+                   c['Priority'].tolist(), c['QTY'].tolist(), c['Weight'].tolist())
+        return [Box(box_type=box_type, width=width, length=length, height=height, max_weight=max_weight,
+                    conveyor=conveyor, priority=priority, qty=qty, weight=weight)
+                for box_type, width, length, height, max_weight, conveyor, priority, qty, weight in rows]
+
+
+def resolve_header(header):
+    """
+    Maps the canonical columns to their positions in a header row.
+
     Args:
-        csv_data (str): CSV data as a string.
+        header (list): Header cells.
+
     Returns:
-        list: List of Box objects loaded from the CSV.
+        dict: Canonical column name -> column index (optional columns that are absent are left out).
+
+    Raises:
+        ValueError: If a required column is missing.
+    """
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    index, missing = {}, []
+    for column, aliases in HEADER_ALIASES.items():
+        found = next((positions[alias.lower()] for alias in aliases if alias.lower() in positions), None)
+        if found is not None:
+            index[column] = found
+        elif column not in OPTIONAL_COLUMNS:
+            missing.append(column)
+    if missing:
+        raise ValueError(f"Missing required column(s) {', '.join(missing)} in header {header}")
+    return index
+
+
+def _fill_optional(columns, index, n_rows):
+    """
+    Adds the optional columns that are absent from the file with their default value.
+    """
+    for column, default in OPTIONAL_COLUMNS.items():
+        if column not in index:
+            columns[column] = np.full(n_rows, default, dtype=NUMERIC_COLUMNS[column])
+    return columns
+
+
+def _read_fast(file, index):
     """
-    boxes = []
-    reader = csv.DictReader(io.StringIO(csv_data))
+    Parses the data rows with NumPy's C reader into one structured array.
 
+    Raises:
+        ValueError: If any row does not parse (the caller then reads the rows one by one).
+    """
+    names = list(index)
+    dtype = [(name, NUMERIC_COLUMNS.get(name, object)) for name in names]
+    table = np.loadtxt(file, delimiter=',', quotechar='"', usecols=[index[name] for name in names], dtype=dtype,
+                       ndmin=1, encoding=None)
+    columns = {name: np.ascontiguousarray(table[name]) for name in names}
+    columns['BoxTypes'] = np.char.strip(columns['BoxTypes'].astype(str))
+    if (columns['BoxTypes'] == '').any():
+        raise ValueError("empty box type")
+    return _fill_optional(columns, index, len(table))
+
+
+def _convert(values, dtype, column, lines, bad):
+    """
+    Converts a column of strings in one call; only when that fails are the values checked one by one
+    to report which rows are bad (bad is updated in place).
+    """
+    try:
+        return np.asarray(values, dtype=dtype), []
+    except ValueError:
+        pass
+    scalar = float if dtype is np.float64 else int
+    converted, errors = np.zeros(len(values), dtype=dtype), []
+    for i, value in enumerate(values):
+        try:
+            converted[i] = scalar(value)
+        except ValueError:
+            bad[i] = True
+            reason = 'missing value' if not value.strip() else f'not a valid {scalar.__name__}'
+            errors.append(BadRow(int(lines[i]), column, value, reason))
+    return converted, errors
+
+
+def _read_checked(reader, index, line_offset=0):
+    """
+    Reads the data rows with csv.reader and reports every bad cell as a BadRow.
+    """
+    width = max(index.values()) + 1
+    rows, lines = [], []
     for row in reader:
-        # Skip rows with all empty values or whitespace-only BoxType
-        if all(row[key] is None for key in row) or not row['BoxTypes'].strip():
-            logger.warning(f"Skipping empty or invalid row: {row}")
-            continue
+        if row:  # csv.reader yields [] for blank lines
+            rows.append(row)
+            lines.append(reader.line_num + line_offset)
+    for row in rows:
+        if len(row) < width:
+            row += [''] * (width - len(row))  # Short rows are reported as missing values below
+    cells = {column: list(map(itemgetter(i), rows)) for column, i in index.items()}
+    del rows
+
+    bad = np.zeros(len(lines), dtype=bool)
+    bad_rows = []
+    box_types = np.array([value.strip() for value in cells['BoxTypes']], dtype=str)
+    for i in np.flatnonzero(box_types == ''):
+        bad[i] = True
+        bad_rows.append(BadRow(lines[i], 'BoxTypes', cells['BoxTypes'][i], 'empty box type'))
+    columns = {'BoxTypes': box_types}
+    for column in index:
+        if column != 'BoxTypes':
+            columns[column], errors = _convert(cells[column], NUMERIC_COLUMNS[column], column, lines, bad)
+            bad_rows.extend(errors)
+    bad_rows.sort(key=lambda entry: entry.line)
+
+    if bad.any():
+        keep = ~bad
+        columns = {column: values[keep] for column, values in columns.items()}
+    return OrderTable(_fill_optional(columns, index, int((~bad).sum())), bad_rows)
+
+
+def read_order(source, encoding='utf-8'):
+    """
+    Streams an order CSV and parses every column in bulk into typed arrays.
+
+    Well-formed files are parsed in a single pass by NumPy's C reader. If any row is malformed the data
+    rows are read again with csv.reader so every bad cell can be reported (this needs a seekable source).
+
+    Args:
+        source (str or file): Path to the CSV file or an open text file object.
+        encoding (str): Encoding used when source is a path.
 
+    Returns:
+        OrderTable: Valid rows as column arrays plus structured reports of the rejected rows.
+
+    Raises:
+        ValueError: If the header is missing or lacks a required column.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', newline='', encoding=encoding) as file:
+            return read_order(file)
+
+    header = next(csv.reader([source.readline()]), None)
+    if not header:
+        raise ValueError("Order file is empty")
+    index = resolve_header(header)
+    if source.seekable():
+        start = source.tell()
         try:
-            # Trim whitespace from BoxType
-            box_type = row['BoxTypes'].strip()
-            
-            # Handle missing Max weight
-            max_weight = float(row.get('Max weight', 100)) # Default to 100 if missing
-
-            # Create Box object
-            box = Box(
-                box_type=box_type,
-                width=float(row['Width'])/10,
-                length=float(row['Length'])/10,
-                height=float(row['Height'])/10,
-                max_weight=max_weight,
-                conveyor=int(row['Conveyor']),
-                priority=int(row['Priority']),
-                qty=int(row['QTY'])
-            )
-            boxes.append(box)
-        except Exception as e:
-            logger.error(f"Error processing row: {row}\nError: {e}")
-
-    return boxes
+            return OrderTable(_read_fast(source, index), [])
+        except ValueError:
+            source.seek(start)
+    return _read_checked(csv.reader(source), index, line_offset=1)  # The header line was read above
+
+
+def log_bad_rows(bad_rows):
+    """
+    Logs each rejected row.
+    """
+    for entry in bad_rows:
+        logger.warning(f"Skipping row at line {entry.line}: {entry.column} {entry.value!r} ({entry.reason})")
+
+
+def load_boxes_from_file(filepath):
+    """
+    Loads box data directly from a CSV file without reading it into a string first.
+
+    Args:
+        filepath (str): Path to the order CSV.
+
+    Returns:
+        tuple: List of Box objects, list of BadRow entries for rows that were skipped.
+    """
+    table = read_order(filepath)
+    log_bad_rows(table.bad_rows)
+    return table.to_boxes(), table.bad_rows
+
+
+def load_boxes_from_csv(csv_data):
+    """
+    Loads box data from CSV data.
+    Args:
+        csv_data (str): CSV data as a string.
+    Returns:
+        list: List of Box objects loaded from the CSV.
+    """
+    table = read_order(io.StringIO(csv_data))
+    log_bad_rows(table.bad_rows)
+    return table.to_boxes()
@@ -1,176 +1,359 @@
 # main.py
-import csv
+import argparse
+import contextlib
+import logging
 import time
-import os  # Import the os module
-from loader import load_boxes_from_csv
+from loader import load_boxes_from_file
 from pallet import Pallet
-from container import F15Container, F9Container
-from visualization import plot_pallet
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from box import group_boxes
+from placement_cache import PlacementCache
+from feasibility import TABLE
+from instrumentation import STATS, profiled
+from metrics import SUPPORT_THRESHOLD, container_metrics, merge
+from exporter import DEFAULT_EXPORT_DIR, EXPORT_CONVENTION, Placements, export_placements
+from container import F15Container, F9Container, PalletContainer
 
+logger = logging.getLogger(__name__)
 
-def load_csv_from_file(filepath):
+PLACEMENT_ENGINE = "heightmap"  # 'voxel', 'heightmap' or 'extreme_point', see Pallet.arrange_boxes
+EXPORT_DIR = DEFAULT_EXPORT_DIR  # Default folder for exported files (BOXLOADER_EXPORT_DIR overrides it)
+CONTAINER_TYPES = {"F15": F15Container, "F9": F9Container, "Pallet": PalletContainer}
+# Containers filled in order; boxes left over from one slot move on to the next
+CONTAINER_SLOTS = [("F15", "F9"), ("F15", "F9"), ("Pallet",)]
+HEIGHT_MARGIN = 20  # Box tops must stay this far (cm) below the container height
+ORDER_TIME_BUDGET = 10.0  # Seconds the 'beam' strategy may search per order, shared by all container slots
+OCCUPANCY_BACKEND = "dense"  # 'dense' or 'bitpacked', see occupancy.OCCUPANCY_BACKENDS
+PLACEMENT_CACHE_FILE = None  # On-disk tier of the placement cache used by run (None = memory only, see --cache)
+FEASIBILITY_TABLE_FILE = "feasibility_table.json"  # Default output of `python feasibility.py` (see --feasibility-table)
+DEFAULT_ORDER_FILE = "D:\\forimport.csv"  # Order file planned when none is given on the command line
+
+
+def export_to_csv(filename, boxes, export_dir=EXPORT_DIR, fmt="csv"):
     """
-    Loads CSV data from a file.
+    Exports box data to a file in the export folder.
 
     Args:
-        filepath (str): The path to the CSV file.
+        filename (str): The name of the file (the extension follows fmt).
+        boxes (list): List of Box objects to export.
+        export_dir (str): Folder to write into (default: EXPORT_DIR).
+        fmt (str): 'csv', 'jsonl', 'parquet' or 'arrow', see exporter.FORMATS.
 
     Returns:
-        str: CSV data as a string, or None if an error occurs.
+        str: Path of the written file.
     """
-    print("Process: Loading CSV data from file...")  # Print process
-    try:
-        with open(filepath, 'r', encoding='utf-8') as file:
-            csv_data = file.read()
-        print("Process: CSV data loaded successfully.")  # Print process
-        return csv_data
-    except FileNotFoundError:
-        print(f"Error: File not found at {filepath}")
+    return export_placements(Placements.from_boxes(boxes), filename, export_dir, EXPORT_CONVENTION, fmt)
+
+
+def new_pallet(occupancy=OCCUPANCY_BACKEND):
+    """
+    Allocates the pallet every container is planned on.
+    """
+    return Pallet(106, 106, 135, frame_height=15, occupancy=occupancy)
+
+
+def plan_container(boxes, container_type, engine=PLACEMENT_ENGINE, strategy="first_fit",
+                   occupancy=OCCUPANCY_BACKEND, cache=None, pallet=None, deadline=None):
+    """
+    Plans boxes into one container on a fresh (or reset) pallet.
+
+    Args:
+        boxes (list): List of Box objects to place.
+        container_type (str): Key of CONTAINER_TYPES ('F15', 'F9' or 'Pallet').
+        engine (str): Placement engine passed to Pallet.arrange_boxes.
+        strategy (str): Placement strategy passed to Pallet.arrange_boxes.
+        occupancy (str): Occupancy backend of the pallet ('dense' or 'bitpacked').
+        cache (PlacementCache): Reuses the placement of an identical earlier request (None = always plan).
+        pallet (Pallet): Workspace to reset and plan on instead of allocating a new pallet (see plan_order).
+        deadline (float): time.perf_counter() value after which the 'beam' strategy falls back to first fit
+            (None = only the planner's own time budget).
+
+    Returns:
+        dict: pallet, container, placed and unplaced boxes, container and box volumes, utilization (%),
+            the full quality metrics (see metrics.plan_metrics), the pallet's occupancy memory in bytes
+            and whether the placement came from the cache.
+    """
+    if pallet is None:
+        pallet = new_pallet(occupancy)  # Fresh pallet per container
+    else:
+        pallet.reset()
+    container = CONTAINER_TYPES[container_type]()
+    container.x = (pallet.width - container.length) / 2  # Set container x position
+    container.y = (pallet.length - container.width) / 2  # Set container y position
+    hits_before = cache.hits if cache is not None else 0
+    placed, unplaced = pallet.arrange_boxes(  # Arrange boxes on pallet
+        boxes,
+        container_x=container.x,
+        container_y=container.y,
+        container_length=container.length,
+        container_width=container.width,
+        # Keep box tops at least HEIGHT_MARGIN cm below the container height
+        container_height=container.height - HEIGHT_MARGIN,
+        engine=engine,
+        strategy=strategy,
+        cache=cache,
+        deadline=deadline
+    )
+    metrics = container_metrics(placed, container, pallet.frame_height)
+    return {
+        "pallet": pallet,
+        "container": container,
+        "placed": placed,
+        "unplaced": unplaced,
+        "container_volume": metrics["container_volume"],
+        "box_volume": metrics["box_volume"],
+        "utilization": metrics["utilization"],
+        "metrics": metrics,
+        "memory_bytes": pallet.memory_bytes(),
+        "cache_hit": cache is not None and cache.hits > hits_before,
+    }
+
+
+def workspace(workspaces, slot, container_type, occupancy=OCCUPANCY_BACKEND):
+    """
+    Returns the pallet reused for one container option of one slot, allocating it on first use.
+
+    Args:
+        workspaces (dict): (slot, container type, occupancy) -> Pallet, kept by the caller between orders.
+        slot (int): Index of the container slot.
+        container_type (str): Key of CONTAINER_TYPES.
+        occupancy (str): Occupancy backend of the pallet.
+
+    Returns:
+        Pallet: The workspace, or None when workspaces is None.
+    """
+    if workspaces is None:
         return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    key = (slot, container_type, occupancy)
+    if key not in workspaces:
+        workspaces[key] = new_pallet(occupancy)
+    return workspaces[key]
+
+
+def _share(deadline, parts):
+    """
+    Deadline for the next of `parts` runs made one after another that split the time left until deadline evenly.
+    """
+    if deadline is None:
         return None
+    now = time.perf_counter()
+    return now + max(0.0, deadline - now) / parts
 
 
-def export_to_csv(filename, boxes):
+def plan_order(boxes, engine=PLACEMENT_ENGINE, strategy="first_fit", slots=CONTAINER_SLOTS, workers=None,
+               occupancy=OCCUPANCY_BACKEND, cache=None, workspaces=None, time_budget=ORDER_TIME_BUDGET):
     """
-    Exports box data to a CSV file in the D:\BoxLoadExport folder.
+    Plans one order over a sequence of containers; boxes left over from one container are fed into the next.
 
     Args:
-        filename (str): The name of the CSV file.
-        boxes (list): List of Box objects to export.
+        boxes (list): List of Box objects to place.
+        engine (str): Placement engine passed to Pallet.arrange_boxes.
+        strategy (str): Placement strategy passed to Pallet.arrange_boxes.
+        slots (list): Container options per slot; when a slot has several options all are tried
+            and the one with the best utilization is kept (the first option wins a tie).
+        workers (int): Processes used to try the options of a slot in parallel (1 = sequential).
+        occupancy (str): Occupancy backend of each pallet ('dense' or 'bitpacked').
+        cache (PlacementCache): Placement cache passed to every container (worker processes share its disk tier).
+        workspaces (dict): Pallets reused between calls (see workspace); only used when options are planned
+            in this process. The pallets in the result stay valid until the next call with the same dict.
+        time_budget (float): Seconds the 'beam' strategy may search for the whole order. Each slot gets what is
+            left; options planned one after another split it evenly, options planned in parallel share it.
+            Once it runs out the remaining boxes are placed by first fit (None = only the planner's own budget).
+
+    Returns:
+        dict: per-container results ("loads"), all placed and unplaced boxes, container and box volumes,
+            overall utilization (%), metrics of all containers combined (see metrics.merge), total pallet
+            occupancy memory in bytes and the number of container placements taken from the cache
+            (counted here because options may be planned in worker processes).
     """
-    export_dir = "D:\\BoxLoadExport"  # Define the export directory
-    os.makedirs(export_dir, exist_ok=True)  # Create the directory if it doesn't exist
-    filepath = os.path.join(export_dir, filename)  # Create the full file path
+    workers = max(len(options) for options in slots) if workers is None else workers
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    loads = []
+    cache_hits = 0
+    remaining = boxes
+    try:
+        for slot, options in enumerate(slots):
+            if not remaining:
+                break
+            logger.info(f"Process: Processing container slot {len(loads) + 1}: {'/'.join(options)}")
+            task = partial(plan_container, group_boxes(remaining), engine=engine, strategy=strategy,
+                           occupancy=occupancy, cache=cache, deadline=deadline)
+            if executor is not None and len(options) > 1:
+                candidates = list(executor.map(task, options))
+            else:
+                candidates = [task(option, pallet=workspace(workspaces, slot, option, occupancy),
+                                   deadline=_share(deadline, len(options) - number))
+                              for number, option in enumerate(options)]
+            best = max(candidates, key=lambda result: result["utilization"])
+            cache_hits += sum(candidate["cache_hit"] for candidate in candidates)
+            if not best["placed"]:
+                logger.info("No boxes could be placed. Trying the next container.")
+                continue
+            logger.info(f"Process: {best['container'].container_type} placed {len(best['placed'])} boxes "
+                        f"({best['utilization']:.2f}%)")
+            loads.append(best)
+            remaining = best["unplaced"]
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    with open(filepath, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Box Type', 'Priority', 'Position X', 'Position Y', 'Position Z', 'Dimensions (w,l,h) (mm)', 'Quantity'])
-        for box in boxes:
-            writer.writerow([
-                box.box_type, box.priority, box.position[0], box.position[1], box.position[2],
-                f"{box.width * 10}x{box.length * 10}x{box.height * 10}", box.qty
-            ])
+    metrics = merge(load["metrics"] for load in loads)
+    return {
+        "loads": loads,
+        "placed": [box for load in loads for box in load["placed"]],
+        "unplaced": list(remaining),
+        "container_volume": metrics["container_volume"],
+        "box_volume": metrics["box_volume"],
+        "utilization": metrics["utilization"],
+        "metrics": metrics,
+        "memory_bytes": sum(load["memory_bytes"] for load in loads),
+        "cache_hits": cache_hits,
+    }
 
 
-def main():
+def run(filepath, workers=None, plot=True, anytime=None, target=None, cache_path=PLACEMENT_CACHE_FILE,
+        table_path=None):
     """
-    Main function of the program.
+    Plans one order file, logs the result, plots every container and exports the placed and unplaced boxes.
+
+    Args:
+        filepath (str): Path to the order CSV.
+        workers (int): Processes used per container slot, passed to plan_order.
+        plot (bool): Plot every container (False = plan and export only; matplotlib is never imported).
+        anytime (float): Seconds for the multi-start planner (see multistart.plan_anytime); None = single run.
+        target (float): Utilization (%) at which the multi-start planner stops early.
+        cache_path (str): SQLite file that keeps placements between runs (None = in memory for this run only).
+        table_path (str): Feasibility table JSON to load and extend with new SKUs (None = build in memory only).
+            Nothing is written to disk unless one of these is given.
     """
     start_time = time.time()  # Record the start time
-    print(f"Start Time: {time.ctime(start_time)}")
-
-    filepath = "D:\\forimport.csv"  # Replace with your actual file path
-    csv_data = load_csv_from_file(filepath)
-
-    if csv_data is None:
-        return  # Exit if there was an error loading the file
-
-    print("Process: Loading box data from CSV...")  # Print process
-    boxes = load_boxes_from_csv(csv_data)  # Load box data from CSV
-    print("Process: Box data loaded successfully.")  # Print process
-    print("Process: Creating pallet...")  # Print process
-    pallet = Pallet(106, 106, 135, frame_height=15)  # Create pallet
-    print("Process: Pallet created successfully.")  # Print process
-    print("Process: Creating containers...")  # Print process
-    containers = [F15Container()]  # Create list of containers
-    print("Process: Containers created successfully.")  # Print process
-
-    all_placed_boxes = []
-    all_unplaced_boxes = []
-    total_container_volume = 0
-    total_box_volume = 0
-
-    for container in containers:
-        container.x = (pallet.width - container.length) / 2  # Set container x position
-        container.y = (pallet.length - container.width) / 2  # Set container y position
-        print(f"Process: Processing container: {container.container_type}")  # Print process
-
-        print("Process: Arranging boxes on pallet...")  # Print process
-        placed, unplaced = pallet.arrange_boxes(  # Arrange boxes on pallet
-            boxes,
-            container_x=container.x,
-            container_y=container.y,
-            container_length=container.length,
-            container_width=container.width,
-            container_height=container.height
-        )
-        print("Process: Boxes arranged on pallet.")  # Print process
-
-        # Stop calculation if no boxes can be placed
-        if not placed:
-            print("No boxes could be placed. Moving remaining boxes to roller and stopping calculation.")
-            all_unplaced_boxes.extend(unplaced)
-            break
-
-        # Check if any box's z position approaches the container's height minus 20 cm
-        for box in placed:
-            if box.position[2] + box.height >= container.height - 20:
-                print("Box height approaches container height limit. Moving remaining boxes to roller and stopping calculation.")
-                all_unplaced_boxes.extend(unplaced)
-                all_unplaced_boxes.extend(placed)
-                placed = []
-                break
+    logger.info(f"Start Time: {time.ctime(start_time)}")
+
+    logger.info("Process: Loading box data from CSV...")
+    try:
+        with STATS.phase("load"):
+            boxes, bad_rows = load_boxes_from_file(filepath)  # Stream box data from the CSV file
+    except FileNotFoundError:
+        logger.error(f"Error: File not found at {filepath}")
+        return
+    except ValueError as e:
+        logger.error(f"Error: {e}")
+        return
+    logger.info(f"Process: Box data loaded successfully ({len(boxes)} rows, {len(bad_rows)} skipped).")
+
+    cache = PlacementCache(path=cache_path)
+    if table_path:
+        TABLE.load(table_path)  # Worker processes are forked after this and inherit the table
+    with STATS.phase("place"):
+        if anytime:
+            from multistart import plan_anytime  # Imports main itself
 
-        all_placed_boxes.extend(placed)
-        all_unplaced_boxes.extend(unplaced)
-        total_container_volume += container.length * container.width * container.height
-
-        # Print during calculation of total box volume
-        print("Process: Calculating total box volume...")
-        for box in placed:
-            box_volume = box.get_volume()
-            print(f"  - Calculating volume for box {box.box_type}: {box_volume}")
-            total_box_volume += box_volume
-        print(f"Process: Total box volume calculated: {total_box_volume}")
-
-    # Calculate volume utilization percentage
-    print("Process: Calculating volume utilization...")  # Print process
-    volume_utilization = (total_box_volume / total_container_volume) * 100 if total_container_volume > 0 else 0
-    print(f"Volume Utilization: {volume_utilization:.2f}%")  # Display on screen
-    print("Process: Volume utilization calculated.")  # Print process
-
-    print("=" * 70)
-    print(f"{'Box Type':<10}{'Priority':<10}{'Position (x,y,z)':<20}{'Dimensions (w,l,h)':<20}")
-    print("-" * 70)
-    print("Process: Displaying placed box information...")  # Print process
-    for box in all_placed_boxes:  # Display placed box information
-        print(
-            f"{box.box_type:<10}{box.priority:<10}{str(box.position):<20}{f'{box.width}x{box.length}x{box.height}':<20}")
-    print("Process: Placed box information displayed.")  # Print process
-
-    print("\nUnplaced Boxes:")
-    print("Process: Displaying unplaced box information...")  # Print process
-    for box in all_unplaced_boxes:  # Display unplaced box information
-        print(f"- {box}")
-    print("Process: Unplaced box information displayed.")  # Print process
-
-    print("\n" + "=" * 70)
-    print(f"Total Container Volume: {total_container_volume:.2f} cubic units")
-    print(f"Total Box Volume: {total_box_volume:.2f} cubic units")
-    print(f"Volume Utilization: {volume_utilization:.2f}%")
-    
-    Cal_time = time.time()  # Record the end time
-    elapsed_Cal_time = Cal_time - start_time
-    print(f"Total Calculate Time: {elapsed_Cal_time:.4f} seconds")
-    print("Process: Plotting pallet and boxes...")  # Print process
-    print(f"Debug: Calculated Volume Utilization = {volume_utilization:.2f}%")  # Debugging
-    plot_pallet(pallet, containers, utilization=volume_utilization)  # Pass utilization to visualization
-    print("Process: Pallet and boxes plotted.")  # Print process
-
-    # Print the count of placed and unplaced boxes
-    print(f"Number of boxes placed: {len(all_placed_boxes)}")
-    print(f"Number of boxes unplaced: {len(all_unplaced_boxes)}")
-    print("=" * 70)
+            result = plan_anytime(boxes, seconds=anytime, target_utilization=target, workers=workers)
+        else:
+            result = plan_order(boxes, cache=cache, workers=workers)
+    if table_path:
+        TABLE.save()  # Keeps SKUs first seen in this process for the next run
+    all_placed_boxes = result["placed"]
+    all_unplaced_boxes = result["unplaced"]
+    total_container_volume = result["container_volume"]
+    total_box_volume = result["box_volume"]
+    volume_utilization = result["utilization"]
+
+    # Per-box tables are only formatted when debug logging is on (-v)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=" * 70)
+        logger.debug(f"{'Box Type':<10}{'Priority':<10}{'Position (x,y,z)':<20}{'Dimensions (w,l,h)':<20}")
+        logger.debug("-" * 70)
+        for box in all_placed_boxes:  # Display placed box information
+            logger.debug(f"{box.box_type:<10}{box.priority:<10}{str(box.position):<20}"
+                         f"{f'{box.width}x{box.length}x{box.height}':<20}")
+        logger.debug("\nUnplaced Boxes:")
+        for box in all_unplaced_boxes:  # Display unplaced box information
+            logger.debug(f"- {box}")
+
+    logger.info("=" * 70)
+    logger.info(f"Total Container Volume: {total_container_volume:.2f} cubic units")
+    logger.info(f"Total Box Volume: {total_box_volume:.2f} cubic units")
+    logger.info(f"Volume Utilization: {volume_utilization:.2f}%")
+    metrics = result["metrics"]
+    logger.info(f"Max Stack Height: {metrics['max_height']:.1f} cm ({metrics['height_fill']:.1f}% of container), "
+                f"Void Fraction: {metrics['void_fraction']:.2f}%")
+    logger.info(f"Centre of Gravity Offset: {metrics['cog_offset']:.1f}%, "
+                f"Support: min {metrics['support_min'] * 100:.0f}% / mean {metrics['support_mean'] * 100:.1f}% "
+                f"({metrics['unsupported']} box(es) below {SUPPORT_THRESHOLD * 100:.0f}%)")
+    logger.info(f"Pallet Occupancy Memory: {result['memory_bytes'] / 1024:.1f} KB")
+    logger.info(f"Placement Cache Hits: {result['cache_hits']} container plan(s) reused")
+
+    elapsed_Cal_time = time.time() - start_time
+    logger.info(f"Total Calculate Time: {elapsed_Cal_time:.4f} seconds")
+    if plot:
+        logger.info("Process: Plotting pallet and boxes...")
+        with STATS.phase("plot"):
+            from visualization import plot_pallet  # matplotlib is only imported when plotting
+
+            for number, load in enumerate(result["loads"], start=1):  # One figure per container
+                container = load["container"]
+                plot_pallet(load["pallet"], [container], utilization=load["utilization"],
+                            output_file=f"pallet_visualization_{number}_{container.container_type}.png")
+        logger.info("Process: Pallet and boxes plotted.")
+
+    logger.info(f"Number of boxes placed: {len(all_placed_boxes)}")
+    logger.info(f"Number of boxes unplaced: {len(all_unplaced_boxes)}")
+    logger.info("=" * 70)
     end_time = time.time()  # Record the end time
-    print(f"End Time: {time.ctime(end_time)}")
-    elapsed_time = end_time - start_time  # Calculate the elapsed time
-    print(f"Total Execution Time: {elapsed_time:.4f} seconds")
-    print("Finished")
+    logger.info(f"End Time: {time.ctime(end_time)}")
+    logger.info(f"Total Execution Time: {end_time - start_time:.4f} seconds")
+    logger.info("Finished")
+
+    with STATS.phase("export"):
+        for number, load in enumerate(result["loads"], start=1):  # One placed file per container
+            export_to_csv(f"placed_{number}_{load['container'].container_type}.csv", load["placed"])
+        export_to_csv('to_free_roller.csv', all_unplaced_boxes)  # Export กล่องที่วางไม่ได้
+
+
+def main(argv=None):
+    """
+    Main function of the program.
+
+    Args:
+        argv (list): Command-line arguments (default: sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description="Plan one order CSV onto pallets.")
+    parser.add_argument('csv', nargs='?', default=DEFAULT_ORDER_FILE, help="Order CSV file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Also log per-box progress and box tables")
+    parser.add_argument('--no-plot', action='store_true',
+                        help="Plan and export only: no figures, and matplotlib is not imported")
+    parser.add_argument('--anytime', type=float, metavar='SECONDS',
+                        help="Try seeded box orders and rotations on all cores for SECONDS and keep the best plan")
+    parser.add_argument('--target', type=float, metavar='PCT',
+                        help="With --anytime: stop as soon as the utilization reaches PCT")
+    parser.add_argument('--cache', metavar='PATH', help="SQLite file that caches placements between runs")
+    parser.add_argument('--feasibility-table', metavar='PATH',
+                        help="SKU feasibility table JSON to load and extend (see feasibility.py)")
+    parser.add_argument('--profile', nargs='?', const='main.prof', metavar='PATH',
+                        help="Run under cProfile and write the stats to PATH (default: main.prof)")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Count candidates/checks/rejections, time each phase and write them as JSON to PATH")
+    args = parser.parse_args(argv)
 
-    export_to_csv('placed.csv', all_placed_boxes)
-    export_to_csv('to_free_roller.csv', all_unplaced_boxes)  # Export กล่องที่วางไม่ได้
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.verbose:
+        for name in (__name__, 'pallet'):
+            logging.getLogger(name).setLevel(logging.DEBUG)
+    instrumented = bool(args.profile or args.trace)
+    if instrumented:
+        STATS.enable()
+    # Instrumented runs plan in this process so worker time shows up in the counters and the profile
+    with profiled(args.profile) if args.profile else contextlib.nullcontext():
+        run(args.csv, workers=1 if instrumented else None, plot=not args.no_plot, anytime=args.anytime,
+            target=args.target, cache_path=args.cache, table_path=args.feasibility_table)
+    if instrumented:
+        STATS.log_summary()
+        if args.trace:
+            STATS.write_trace(args.trace, order=args.csv)
+            logger.info(f"Trace written to {args.trace}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+# metrics.py
+import numpy as np
+
+# ขอบของช่วงสัดส่วนพื้นที่รองรับ: <50%, 50-75%, 75-90%, 90-<100%, 100% (เท่ากับ support_threshold ของ HeightmapEngine)
+SUPPORT_BINS = (0.0, 0.5, 0.75, 0.9, 1.0 - 1e-9, 1.0 + 1e-9)
+SUPPORT_THRESHOLD = 0.5
+
+
+def support_ratios(position, dims, floor, tolerance=1e-6):
+    """
+    สัดส่วนพื้นที่ฐานของแต่ละกล่องที่วางบนผิวบนของกล่องด้านล่างพอดี (กล่องบนพื้นได้ 1.0)
+    คำนวณจากตำแหน่งและขนาดของกล่องเท่านั้น (ไม่ใช้ occupancy grid): เรียงกล่องตามระดับผิวบนแล้วใช้ searchsorted
+    จับคู่ฐานของแต่ละกล่องกับกล่องที่ผิวบนอยู่ระดับเดียวกันเท่านั้น แทนการเทียบทุกคู่
+    Args:
+        position (np.ndarray): (n, 3) มุมล่างซ้ายของกล่อง
+        dims (np.ndarray): (n, 3) ขนาดตามแกน x, y, z หลังหมุน
+        floor (float): ระดับ z ของพื้น
+        tolerance (float): ระยะที่ถือว่าฐานกับผิวบนอยู่ระดับเดียวกัน
+    Returns:
+        np.ndarray: (n,) สัดส่วน 0.0 - 1.0
+    """
+    low = position
+    high = position + dims
+    ratios = np.ones(len(position))
+    raised = np.flatnonzero(np.abs(position[:, 2] - floor) > tolerance)
+    if not len(raised):
+        return ratios
+    order = np.argsort(high[:, 2], kind="stable")
+    tops = high[order, 2]
+    first = np.searchsorted(tops, low[raised, 2] - tolerance, side="left")
+    counts = np.searchsorted(tops, low[raised, 2] + tolerance, side="right") - first
+    # คู่ (กล่อง i, กล่องด้านล่าง j) ทุกคู่ที่ฐานของ i อยู่ระดับเดียวกับผิวบนของ j
+    i = np.repeat(raised, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    j = order[np.repeat(first, counts) + offsets]
+    overlap_x = np.minimum(high[i, 0], high[j, 0]) - np.maximum(low[i, 0], low[j, 0])
+    overlap_y = np.minimum(high[i, 1], high[j, 1]) - np.maximum(low[i, 1], low[j, 1])
+    contact = np.bincount(i, weights=np.clip(overlap_x, 0, None) * np.clip(overlap_y, 0, None),
+                          minlength=len(position))
+    ratios[raised] = np.minimum(1.0, contact[raised] / (dims[raised, 0] * dims[raised, 1]))
+    return ratios
+
+
+def plan_metrics(position, dims, bounds, weight=None, support_threshold=SUPPORT_THRESHOLD):
+    """
+    คำนวณคุณภาพของการวางในตู้หนึ่งตู้จากอาร์เรย์ตำแหน่งและขนาดในครั้งเดียว
+    Args:
+        position (array-like): (n, 3) มุมล่างซ้ายของกล่อง (แถวที่เป็น NaN คือกล่องที่วางไม่ได้และถูกข้าม)
+        dims (array-like): (n, 3) ขนาดตามแกน x, y, z หลังหมุน (ไม่รวมช่องว่างระหว่างกล่อง)
+        bounds (tuple): (x, y, พื้น z, ยาว, กว้าง, สูง) ของตู้ในหน่วยเดียวกับ position
+        weight (array-like): (n,) น้ำหนักของกล่อง ใช้หาจุดศูนย์ถ่วง (None หรือศูนย์ทั้งหมด = ใช้ปริมาตรแทน)
+        support_threshold (float): สัดส่วนพื้นที่รองรับที่ต่ำกว่านี้นับเป็น unsupported
+    Returns:
+        dict: placed, box_volume, container_volume, utilization (%), max_height (จากพื้น), height_fill (%),
+              envelope_volume (พื้นที่ตู้ x max_height), void_fraction (% ของ envelope ที่ว่าง),
+              cog (x, y, z), cog_offset (% ของครึ่งความยาว/กว้างตู้ ตามแกนที่ห่างจากกลางตู้มากกว่า),
+              cog_height (% ของความสูงตู้), support_min, support_mean, unsupported และ
+              support_hist (จำนวนกล่องในแต่ละช่วงของ SUPPORT_BINS)
+    """
+    position = np.asarray(position, dtype=np.float64).reshape(-1, 3)
+    dims = np.asarray(dims, dtype=np.float64).reshape(-1, 3)
+    x0, y0, floor, length, width, height = bounds
+    placed = ~np.isnan(position[:, 0])
+    position, dims = position[placed], dims[placed]
+    volumes = dims.prod(axis=1)
+    box_volume = float(volumes.sum())
+    container_volume = float(length * width * height)
+    max_height = float((position[:, 2] + dims[:, 2]).max() - floor) if len(position) else 0.0
+    envelope_volume = float(length * width * max_height)
+    metrics = {
+        "placed": int(len(position)),
+        "box_volume": box_volume,
+        "container_volume": container_volume,
+        "utilization": box_volume / container_volume * 100 if container_volume > 0 else 0.0,
+        "max_height": max_height,
+        "height_fill": max_height / height * 100 if height > 0 else 0.0,
+        "envelope_volume": envelope_volume,
+        "void_fraction": (1 - box_volume / envelope_volume) * 100 if envelope_volume > 0 else 0.0,
+        "cog": None,
+        "cog_offset": 0.0,
+        "cog_height": 0.0,
+        "support_min": 1.0,
+        "support_mean": 1.0,
+        "unsupported": 0,
+        "support_hist": [0] * (len(SUPPORT_BINS) - 1),
+    }
+    if not len(position):
+        return metrics
+    mass = volumes
+    if weight is not None:
+        weight = np.asarray(weight, dtype=np.float64).reshape(-1)[placed]
+        if weight.sum() > 0:
+            mass = weight
+    cog = (position + dims / 2).T @ mass / mass.sum()
+    offset = np.abs(cog[:2] - (x0 + length / 2, y0 + width / 2)) / (length / 2, width / 2)
+    ratios = support_ratios(position, dims, floor)
+    metrics.update({
+        "cog": tuple(cog.tolist()),
+        "cog_offset": float(offset.max()) * 100,
+        "cog_height": float(cog[2] - floor) / height * 100 if height > 0 else 0.0,
+        "support_min": float(ratios.min()),
+        "support_mean": float(ratios.mean()),
+        "unsupported": int(np.count_nonzero(ratios < support_threshold)),
+        "support_hist": np.histogram(ratios, bins=SUPPORT_BINS)[0].tolist(),
+    })
+    return metrics
+
+
+def container_metrics(boxes, container, floor):
+    """
+    plan_metrics ของกล่อง (Box) ที่วางแล้วในตู้ container.Container ที่ตำแหน่ง (container.x, container.y)
+    Args:
+        boxes (list): Box ที่วางแล้ว (กล่องที่ไม่มี position ถูกข้าม)
+        container (Container): ตู้ที่ใช้วาง
+        floor (float): ระดับ z ของพื้น (Pallet.frame_height)
+    """
+    position = [box.position or (np.nan, np.nan, np.nan) for box in boxes]
+    dims = [(box.width, box.length, box.height) for box in boxes]
+    bounds = (container.x, container.y, floor, container.length, container.width, container.height)
+    return plan_metrics(position, dims, bounds, [box.weight for box in boxes])
+
+
+def merge(metrics):
+    """
+    รวมผลของ plan_metrics หลายตู้ (เช่นทุกตู้ของ order เดียว) เป็นผลเดียว
+    ปริมาตรและจำนวนกล่องรวมกัน ความสูงและระยะจุดศูนย์ถ่วงใช้ค่าของตู้ที่แย่ที่สุด
+    Returns:
+        dict: คีย์เดียวกับ plan_metrics (cog เป็น None เพราะแต่ละตู้มีจุดศูนย์ถ่วงของตัวเอง)
+    """
+    metrics = list(metrics)
+    if not metrics:
+        return plan_metrics(np.empty((0, 3)), np.empty((0, 3)), (0, 0, 0, 0, 0, 0))
+    placed = sum(m["placed"] for m in metrics)
+    box_volume = sum(m["box_volume"] for m in metrics)
+    container_volume = sum(m["container_volume"] for m in metrics)
+    envelope_volume = sum(m["envelope_volume"] for m in metrics)
+    return {
+        "placed": placed,
+        "box_volume": box_volume,
+        "container_volume": container_volume,
+        "utilization": box_volume / container_volume * 100 if container_volume > 0 else 0.0,
+        "max_height": max(m["max_height"] for m in metrics),
+        "height_fill": max(m["height_fill"] for m in metrics),
+        "envelope_volume": envelope_volume,
+        "void_fraction": (1 - box_volume / envelope_volume) * 100 if envelope_volume > 0 else 0.0,
+        "cog": None,
+        "cog_offset": max(m["cog_offset"] for m in metrics),
+        "cog_height": max(m["cog_height"] for m in metrics),
+        "support_min": min(m["support_min"] for m in metrics),
+        "support_mean": sum(m["support_mean"] * m["placed"] for m in metrics) / placed if placed else 1.0,
+        "unsupported": sum(m["unsupported"] for m in metrics),
+        "support_hist": np.sum([m["support_hist"] for m in metrics], axis=0).tolist(),
+    }
@@ -0,0 +1,134 @@
+# multistart.py
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from box import Box
+from main import plan_order
+
+logger = logging.getLogger(__name__)
+
+# ผลที่ดีที่สุดจนถึงขณะนั้น: seed ที่ให้ผล, จำนวนกล่องที่วางไม่ได้, การใช้พื้นที่ (%), เวลาที่ผ่านไป (วินาที), จำนวนรอบที่เสร็จแล้ว
+Improvement = namedtuple("Improvement", ["seed", "unplaced", "utilization", "elapsed", "starts"])
+
+_START = {}  # รายการกล่องและค่าของ plan_order ใน worker process (ส่งครั้งเดียวผ่าน initializer)
+
+
+def perturb(boxes, seed):
+    """
+    สร้างลำดับกล่องแบบสุ่มตาม seed: สลับลำดับแถวภายในลำดับความสำคัญเดียวกัน และสุ่มหมุนฐาน (สลับกว้างกับยาว)
+    ลำดับความสำคัญไม่เปลี่ยน (Pallet.arrange_boxes เรียงแบบ stable จึงคงลำดับที่สุ่มไว้ภายในแต่ละระดับ)
+    Args:
+        boxes (list): รายการ Box ของ order
+        seed (int): 0 = ลำดับเดิม (ผลเดียวกับ plan_order ปกติ ใช้เป็น baseline)
+    Returns:
+        list: รายการ Box ใหม่ (ไม่แก้ไข boxes เดิม)
+    """
+    if seed == 0:
+        return list(boxes)
+    rng = np.random.default_rng(seed)
+    order = sorted(rng.permutation(len(boxes)).tolist(), key=lambda i: boxes[i].priority)
+    rotate = (rng.random(len(boxes)) < 0.5).tolist()
+    perturbed = []
+    for i in order:
+        box = boxes[i]
+        width, length = (box.length, box.width) if rotate[i] else (box.width, box.length)
+        perturbed.append(Box(box.box_type, width, length, box.height, box.max_weight, box.conveyor, box.priority,
+                             qty=box.qty, weight=box.weight))
+    return perturbed
+
+
+def _score(unplaced, utilization):
+    """
+    คีย์สำหรับเปรียบเทียบผล (น้อยกว่าดีกว่า): กล่องที่ต้องส่งไป free roller น้อยที่สุดก่อน แล้วจึงใช้พื้นที่มากที่สุด
+    """
+    return unplaced, -utilization
+
+
+def _init_worker(boxes, options):
+    _START["boxes"] = boxes
+    _START["options"] = options
+
+
+def _run_start(seed):
+    """
+    วางกล่องหนึ่งรอบตาม seed ใน worker process
+    Returns:
+        tuple: (seed, จำนวนกล่องที่วางไม่ได้, การใช้พื้นที่ %)
+    """
+    result = plan_order(perturb(_START["boxes"], seed), workers=1, **_START["options"])
+    return seed, len(result["unplaced"]), result["utilization"]
+
+
+def anytime_starts(boxes, seconds=10.0, target_utilization=None, workers=None, max_starts=None, **options):
+    """
+    วางกล่องซ้ำหลายรอบด้วย seed ต่างกันบน process pool และส่งผลที่ดีที่สุดจนถึงขณะนั้นออกมาทีละครั้ง
+    รอบแรกคือ seed 0 (ลำดับเดิม) ซึ่งคำนวณใน process นี้ก่อนเสมอ รอบอื่นจะแทนที่ได้เมื่อดีกว่าอย่างเคร่งครัดเท่านั้น
+    Args:
+        boxes (list): รายการ Box ของ order
+        seconds (float): เวลาสูงสุด (รอบที่กำลังคำนวณตอนหมดเวลาจะถูกทิ้ง)
+        target_utilization (float): หยุดทันทีเมื่อการใช้พื้นที่ถึงค่านี้ (%); None = ใช้เวลาจนครบ
+        workers (int): จำนวน process (ค่าเริ่มต้นคือจำนวน CPU)
+        max_starts (int): จำนวนรอบสูงสุดรวม baseline (None = ไม่จำกัด)
+        **options: ค่าที่ส่งต่อให้ plan_order (engine, strategy, slots, occupancy)
+    Yields:
+        Improvement: ทุกครั้งที่ได้ผลที่ดีกว่าเดิม (ครั้งแรกคือ baseline)
+    """
+    start_time = time.perf_counter()
+    deadline = start_time + seconds
+    baseline = plan_order(list(boxes), workers=1, **options)
+    best = Improvement(0, len(baseline["unplaced"]), baseline["utilization"], time.perf_counter() - start_time, 1)
+    yield best
+
+    def done():
+        return target_utilization is not None and best.utilization >= target_utilization
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    starts = 1
+    next_seed = 1
+    pending = set()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(list(boxes), options))
+    try:
+        while not done():
+            while len(pending) < 2 * workers and (max_starts is None or next_seed < max_starts):
+                pending.add(executor.submit(_run_start, next_seed))
+                next_seed += 1
+            remaining = deadline - time.perf_counter()
+            if not pending or remaining <= 0:
+                break
+            finished, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in finished:
+                seed, unplaced, utilization = future.result()
+                starts += 1
+                if _score(unplaced, utilization) < _score(best.unplaced, best.utilization):
+                    best = Improvement(seed, unplaced, utilization, time.perf_counter() - start_time, starts)
+                    yield best
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    logger.info(f"Multi-start: {starts} start(s) in {time.perf_counter() - start_time:.2f} s, best seed {best.seed}")
+
+
+def plan_anytime(boxes, seconds=10.0, target_utilization=None, workers=None, max_starts=None,
+                 on_improvement=None, **options):
+    """
+    วางกล่องแบบ anytime ด้วย anytime_starts แล้วคำนวณผลของ seed ที่ดีที่สุดอีกครั้งใน process นี้
+    Args:
+        on_improvement (callable): เรียกด้วย Improvement ทุกครั้งที่ได้ผลที่ดีกว่าเดิม (ค่าเริ่มต้นคือเขียนลง logging)
+        (Args อื่นดู anytime_starts)
+    Returns:
+        dict: ผลแบบเดียวกับ plan_order พร้อม "seed" ที่เลือก (0 = baseline)
+    """
+    best = None
+    for best in anytime_starts(boxes, seconds, target_utilization, workers, max_starts, **options):
+        if on_improvement is not None:
+            on_improvement(best)
+        else:
+            logger.info(f"Multi-start: seed {best.seed} -> {best.unplaced} unplaced, "
+                        f"{best.utilization:.2f}% ({best.elapsed:.2f} s, {best.starts} start(s))")
+    result = plan_order(perturb(boxes, best.seed), workers=1, **options)  # ผลเดิมซ้ำได้ทุกครั้ง (ไม่มีการสุ่มภายใน)
+    result["seed"] = best.seed
+    return result
@@ -0,0 +1,182 @@
+# occupancy.py
+import numpy as np
+
+# จำนวนบิตที่เป็น 1 ของทุกค่า byte (ใช้นับช่องที่ถูกจองในแบบ bit-packed)
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class DenseOccupancy:
+    """
+    คลาส DenseOccupancy: ตารางพื้นที่ถูกจองแบบ bool ทีละช่อง (1 byte ต่อช่อง)
+    """
+
+    def __init__(self, width, length, height):
+        """
+        Constructor ของคลาส DenseOccupancy
+        Args:
+            width (int): จำนวนช่องตามแกน x
+            length (int): จำนวนช่องตามแกน y
+            height (int): จำนวนช่องตามแกน z
+        """
+        self.shape = (width, length, height)
+        self.grid = np.zeros(self.shape, dtype=bool)
+
+    @property
+    def nbytes(self):
+        """
+        Returns:
+            int: หน่วยความจำที่ใช้เก็บตาราง (byte)
+        """
+        return self.grid.nbytes
+
+    def any(self, x0, x1, y0, y1, z0, z1):
+        """
+        ตรวจสอบว่ามีช่องที่ถูกจองในช่วง [x0, x1) x [y0, y1) x [z0, z1) หรือไม่
+        """
+        return bool(self.grid[x0:x1, y0:y1, z0:z1].any())
+
+    def count(self, x0, x1, y0, y1, z0, z1):
+        """
+        นับจำนวนช่องที่ถูกจองในช่วง [x0, x1) x [y0, y1) x [z0, z1)
+        """
+        return int(np.count_nonzero(self.grid[x0:x1, y0:y1, z0:z1]))
+
+    def fill(self, x0, x1, y0, y1, z0, z1):
+        """
+        ทำเครื่องหมายว่าช่วง [x0, x1) x [y0, y1) x [z0, z1) ถูกจองแล้ว
+        """
+        self.grid[x0:x1, y0:y1, z0:z1] = True
+
+    def column(self, x, y, z0, z1):
+        """
+        คืนสถานะการจองของช่อง (x, y) ตั้งแต่ z0 ถึง z1 (ไม่รวม z1)
+        """
+        return self.grid[x, y, z0:z1]
+
+    def column_counts(self, z0, z1):
+        """
+        นับจำนวนช่องที่ถูกจองในช่วง [z0, z1) ของทุกคอลัมน์ (x, y)
+        Returns:
+            np.ndarray: ขนาด (width, length)
+        """
+        return np.count_nonzero(self.grid[:, :, z0:z1], axis=2)
+
+    def to_dense(self):
+        """
+        คืนตาราง bool แบบเต็ม (ตารางจริง ไม่ใช่สำเนา)
+        """
+        return self.grid
+
+    def clear(self):
+        """
+        ล้างการจองทั้งหมด
+        """
+        self.grid[...] = False
+
+
+class BitPackedOccupancy:
+    """
+    คลาส BitPackedOccupancy: ตารางพื้นที่ถูกจองที่อัดแกน z เป็นบิต (8 ช่องต่อ 1 byte)
+    ใช้หน่วยความจำน้อยกว่า DenseOccupancy 8 เท่าและให้ผลการตรวจสอบเหมือนกันทุกประการ
+    """
+
+    def __init__(self, width, length, height):
+        """
+        Constructor ของคลาส BitPackedOccupancy
+        Args:
+            width (int): จำนวนช่องตามแกน x
+            length (int): จำนวนช่องตามแกน y
+            height (int): จำนวนช่องตามแกน z
+        """
+        self.shape = (width, length, height)
+        self.bits = np.zeros((width, length, (height + 7) // 8), dtype=np.uint8)  # บิต k ของ byte b คือ z = 8b + k
+
+    @property
+    def nbytes(self):
+        """
+        Returns:
+            int: หน่วยความจำที่ใช้เก็บตาราง (byte)
+        """
+        return self.bits.nbytes
+
+    def _z_mask(self, z0, z1):
+        """
+        แปลงช่วง [z0, z1) เป็นช่วง byte และ mask ของแต่ละ byte (ตัดช่วงให้อยู่ในตารางแบบเดียวกับ slicing)
+        Returns:
+            tuple: (b0, b1, mask) หรือ None หากช่วงว่าง
+        """
+        z0, z1, _ = slice(z0, z1).indices(self.shape[2])
+        if z0 >= z1:
+            return None
+        b0, b1 = z0 // 8, (z1 - 1) // 8 + 1
+        mask = np.full(b1 - b0, 0xFF, dtype=np.uint8)
+        mask[0] &= (0xFF << (z0 % 8)) & 0xFF
+        mask[-1] &= 0xFF >> (7 - (z1 - 1) % 8)
+        return b0, b1, mask
+
+    def any(self, x0, x1, y0, y1, z0, z1):
+        """
+        ตรวจสอบว่ามีช่องที่ถูกจองในช่วง [x0, x1) x [y0, y1) x [z0, z1) หรือไม่
+        """
+        z_range = self._z_mask(z0, z1)
+        if z_range is None:
+            return False
+        b0, b1, mask = z_range
+        return bool((self.bits[x0:x1, y0:y1, b0:b1] & mask).any())
+
+    def count(self, x0, x1, y0, y1, z0, z1):
+        """
+        นับจำนวนช่องที่ถูกจองในช่วง [x0, x1) x [y0, y1) x [z0, z1)
+        """
+        z_range = self._z_mask(z0, z1)
+        if z_range is None:
+            return 0
+        b0, b1, mask = z_range
+        return int(_POPCOUNT[self.bits[x0:x1, y0:y1, b0:b1] & mask].sum(dtype=np.int64))
+
+    def fill(self, x0, x1, y0, y1, z0, z1):
+        """
+        ทำเครื่องหมายว่าช่วง [x0, x1) x [y0, y1) x [z0, z1) ถูกจองแล้ว
+        """
+        z_range = self._z_mask(z0, z1)
+        if z_range is None:
+            return
+        b0, b1, mask = z_range
+        self.bits[x0:x1, y0:y1, b0:b1] |= mask
+
+    def column(self, x, y, z0, z1):
+        """
+        คืนสถานะการจองของช่อง (x, y) ตั้งแต่ z0 ถึง z1 (ไม่รวม z1)
+        """
+        return np.unpackbits(self.bits[x, y], bitorder="little")[:self.shape[2]][z0:z1].astype(bool)
+
+    def column_counts(self, z0, z1):
+        """
+        นับจำนวนช่องที่ถูกจองในช่วง [z0, z1) ของทุกคอลัมน์ (x, y) โดยไม่แตกบิตเป็นตาราง bool
+        Returns:
+            np.ndarray: ขนาด (width, length)
+        """
+        z_range = self._z_mask(z0, z1)
+        if z_range is None:
+            return np.zeros(self.shape[:2], dtype=np.int32)
+        b0, b1, mask = z_range
+        return _POPCOUNT[self.bits[:, :, b0:b1] & mask].sum(axis=2, dtype=np.int32)
+
+    def to_dense(self):
+        """
+        คืนตาราง bool แบบเต็ม (เป็นสำเนา ใช้สำหรับตรวจสอบหรือแสดงผลเท่านั้น)
+        """
+        return np.unpackbits(self.bits, axis=2, bitorder="little")[:, :, :self.shape[2]].astype(bool)
+
+    def clear(self):
+        """
+        ล้างการจองทั้งหมด
+        """
+        self.bits[...] = 0
+
+
+# backend ที่เลือกได้ผ่าน Pallet(occupancy=...)
+OCCUPANCY_BACKENDS = {
+    "dense": DenseOccupancy,
+    "bitpacked": BitPackedOccupancy,
+}
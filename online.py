@@ -0,0 +1,147 @@
+# online.py
+import time
+from collections import namedtuple
+
+from box import BoxBatch
+from feasibility import TABLE
+from heightmap import HeightmapEngine
+
+# ผลการตัดสินใจของกล่องหนึ่งชิ้น
+# box: Box ที่วางแล้ว (หรือกล่องเดิมหากวางไม่ได้), position: (x, y, z) หรือ None, orientation: ดัชนีใน can_rotate(),
+# mode: 'best_fit' / 'first_fit' / 'none', elapsed: เวลาที่ใช้ (วินาที), over_budget: ใช้เวลาเกิน latency_budget
+Placement = namedtuple("Placement", ["box", "position", "orientation", "mode", "elapsed", "over_budget"])
+
+
+class OnlinePlanner:
+    """
+    คลาส OnlinePlanner: วางกล่องทีละชิ้นตามลำดับที่มาจากสายพาน
+    เก็บ HeightmapEngine ไว้ตลอดจึงใช้เวลาต่อการตัดสินใจคงที่ (ขึ้นกับขนาดกริด ไม่ขึ้นกับจำนวนกล่องที่วางแล้ว)
+    """
+
+    # ทุกครั้งที่ใช้ first fit แทนเพราะ best fit ช้าเกิน ค่าเฉลี่ยเวลาของ best fit จะลดลงตามตัวคูณนี้
+    # จึงกลับไปลอง best fit อีกครั้งเป็นระยะ (เช่น หลังการเรียกครั้งแรกที่ช้าเพราะยังไม่ warm)
+    COST_DECAY = 0.8
+
+    def __init__(self, pallet, container_x, container_y, container_length, container_width, container_height,
+                 strategy="best_fit", score_weights=None, latency_budget=None, max_undo=32):
+        """
+        Constructor ของคลาส OnlinePlanner
+        Args:
+            pallet (Pallet): พาเลทที่ใช้วาง (กล่องที่มีอยู่แล้วถูกนำมาสร้างผิวบน)
+            container_x, container_y (float): ตำแหน่งของตู้คอนเทนเนอร์บนพาเลท
+            container_length, container_width (float): ขนาดของตู้คอนเทนเนอร์
+            container_height (float): ความสูงสูงสุดที่ผิวบนของกล่องวางได้
+            strategy (str): 'best_fit' (ลองทั้ง 2 แนวการหมุนแล้วเลือกคะแนนสูงสุด) หรือ 'first_fit'
+            score_weights (dict): น้ำหนักเกณฑ์ให้คะแนนสำหรับ 'best_fit' (ดู scoring.DEFAULT_WEIGHTS)
+            latency_budget (float): เวลาสูงสุดต่อการตัดสินใจ (วินาที) หาก best fit คาดว่าจะใช้เวลาเกิน
+                จะใช้ first fit แทน และการค้นหา best fit หยุดเมื่อครบเวลานี้ (หากยังไม่พบตำแหน่งจะใช้ first fit);
+                None = ไม่จำกัด
+            max_undo (int): จำนวนผิวบนก่อนหน้าที่เก็บไว้สำหรับ undo_last (เกินนี้จะสร้างผิวบนใหม่จากกล่องที่เหลือ)
+        """
+        if strategy not in ("first_fit", "best_fit"):
+            raise ValueError(f"Unknown placement strategy: {strategy}")
+        self.pallet = pallet
+        self.container = (container_x, container_y, container_length, container_width, container_height)
+        self.strategy = strategy
+        self.score_weights = score_weights
+        self.latency_budget = latency_budget
+        self.max_undo = max(0, int(max_undo))
+        self.engine = HeightmapEngine(pallet, *self.container)
+        self.placements = []  # Placement ของกล่องที่วางได้ ตามลำดับ
+        self.rejected = []  # กล่องที่วางไม่ได้ (ส่งไป free roller)
+        self._history = []  # engine ก่อนวางแต่ละชิ้น (copy-on-write) สำหรับ undo_last
+        self._cost = {"best_fit": 0.0, "first_fit": 0.0}  # ค่าเฉลี่ยเวลาของแต่ละวิธี (EMA)
+
+    def _timed(self, mode, search):
+        """
+        เรียก search() แล้วปรับค่าเฉลี่ยเวลาของวิธีนั้น
+        """
+        start = time.perf_counter()
+        found = search()
+        elapsed = time.perf_counter() - start
+        self._cost[mode] = elapsed if not self._cost[mode] else 0.8 * self._cost[mode] + 0.2 * elapsed
+        return found
+
+    def _first_fit(self, orientations, weight=0.0):
+        """
+        ตำแหน่งแรกที่วางได้ ลองแนวการหมุนตามลำดับ
+        """
+        for orientation, (dx, dy, dz) in enumerate(orientations):
+            position = self.engine.find_position(dx, dy, dz, weight)
+            if position is not None:
+                return (*position, orientation)
+        return None
+
+    def place_next(self, box):
+        """
+        วางกล่องหนึ่งชิ้นทันทีที่มาถึง
+        Args:
+            box (Box): กล่องที่มาจากสายพาน (วางหนึ่งชิ้นไม่ว่า qty จะเป็นเท่าใด)
+        Returns:
+            Placement: ผลการตัดสินใจ (position เป็น None หากวางไม่ได้)
+        """
+        start = time.perf_counter()
+        deadline = None if self.latency_budget is None else start + self.latency_budget
+        orientations = box.can_rotate()
+        found, mode = None, "none"
+        use_best = self.strategy == "best_fit" and (
+            self.latency_budget is None or self._cost["best_fit"] <= self.latency_budget)
+        if self.strategy == "best_fit" and not use_best:
+            self._cost["best_fit"] *= self.COST_DECAY
+        if TABLE.for_engine(box, self.engine).best is None:
+            pass  # วางไม่ได้ทุกแนวการหมุนแม้ในตู้ว่าง (ตาราง feasibility) จึงไม่ต้องค้นหา
+        elif use_best:
+            found = self._timed("best_fit", lambda: self.engine.best_position(orientations, self.score_weights,
+                                                                              box.weight, deadline))
+            mode = "best_fit"
+            if found is None and deadline is not None and time.perf_counter() > deadline:
+                # หมดเวลาก่อนพบตำแหน่ง จึงหาตำแหน่งแรกที่วางได้แทนการส่งกล่องไป free roller
+                found = self._timed("first_fit", lambda: self._first_fit(orientations, box.weight))
+                mode = "first_fit"
+        else:
+            found = self._timed("first_fit", lambda: self._first_fit(orientations, box.weight))
+            mode = "first_fit"
+        if found is None:
+            elapsed = time.perf_counter() - start
+            self.rejected.append(box)
+            return Placement(box, None, 0, "none", elapsed, self._over(elapsed))
+
+        x, y, z, orientation = found
+        batch = BoxBatch(box, qty=1)
+        batch.set_position(0, (x, y, z), orientation)
+        placed = batch.to_boxes()[0]
+        dx, dy, dz = orientations[orientation]
+        self._history.append(self.engine)
+        if len(self._history) > self.max_undo:
+            self._history.pop(0)
+        self.engine = self.engine.copy()  # ผิวบนเดิมยังใช้ได้สำหรับ undo_last
+        self.engine.place(x, y, z, dx, dy, dz, box.weight, box.max_weight)
+        self.pallet.mark_space_occupied(x, y, z, dx, dy, dz)
+        self.pallet.boxes.append(placed)
+        elapsed = time.perf_counter() - start
+        placement = Placement(placed, placed.position, orientation, mode, elapsed, self._over(elapsed))
+        self.placements.append(placement)
+        return placement
+
+    def _over(self, elapsed):
+        return self.latency_budget is not None and elapsed > self.latency_budget
+
+    def undo_last(self):
+        """
+        ยกเลิกการวางชิ้นล่าสุด (เช่น หุ่นยนต์หยิบไม่สำเร็จ) และคืนผิวบนกับพื้นที่ถูกจองให้เหมือนก่อนวาง
+        Returns:
+            Placement: การวางที่ถูกยกเลิก หรือ None หากไม่มี
+        """
+        if not self.placements:
+            return None
+        placement = self.placements.pop()
+        self.pallet.boxes.remove(placement.box)
+        if self._history:
+            self.engine = self._history.pop()
+        else:
+            self.engine = HeightmapEngine(self.pallet, *self.container)  # สร้างผิวบนใหม่จากกล่องที่เหลือ
+        # พื้นที่จองของกล่องข้างเคียงอาจทับกันที่ขอบ จึงจองใหม่จากกล่องที่เหลือแทนการลบเฉพาะช่องของชิ้นนี้
+        self.pallet.occupancy.clear()
+        for box in self.pallet.boxes:
+            self.pallet.mark_space_occupied(*box.position, box.width, box.length, box.height)
+        return placement
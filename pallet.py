@@ -1,6 +1,23 @@
 # pallet.py
+import logging
+
 import numpy as np
-from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from box import BoxBatch
+from heightmap import HeightmapEngine
+from beam_search import BeamPlanner
+from layers import LayerPlanner
+from extreme_points import ExtremePointIndex
+from feasibility import TABLE
+from occupancy import OCCUPANCY_BACKENDS, DenseOccupancy
+from placement_cache import fingerprint
+from kernels import column_tables, first_free_voxel, first_free_voxel_columns, integral_volume, update_integral
+from instrumentation import STATS
+
+logger = logging.getLogger(__name__)
+
+# engine ที่ตรวจว่ากล่องด้านล่างไม่รับน้ำหนักเกิน Box.max_weight (ผ่าน SupportGraph ของ HeightmapEngine)
+LOAD_CHECKED_ENGINES = ("heightmap",)
+_LOAD_NOTED = set()  # engine ที่แจ้งเรื่องน้ำหนักแล้วใน process นี้ (แจ้งครั้งเดียวต่อ engine)
 
 
 class Pallet:
@@ -8,7 +25,7 @@ class Pallet:
     คลาส Pallet: แทนพาเลทสำหรับวางกล่อง
     """
 
-    def __init__(self, width, length, height, frame_height=15, gap=0.2):
+    def __init__(self, width, length, height, frame_height=15, gap=0.2, occupancy="dense"):
         """
         Constructor ของคลาส Pallet
         Args:
@@ -17,14 +34,40 @@ class Pallet:
             height (float): ความสูงของพาเลท (หน่วย: เซนติเมตร)
             frame_height (float): ความสูงของโครงพาเลท (หน่วย: เซนติเมตร)
             gap (float): ช่องว่างระหว่างกล่อง (หน่วย: เซนติเมตร)
+            occupancy (str): รูปแบบการเก็บตารางพื้นที่ถูกจอง 'dense' (bool ทีละช่อง) หรือ 'bitpacked' (8 ช่องต่อ byte)
         """
+        if occupancy not in OCCUPANCY_BACKENDS:
+            raise ValueError(f"Unknown occupancy backend: {occupancy}")
         self.width = width
         self.length = length
         self.height = height
         self.frame_height = frame_height
         self.gap = gap  # ช่องว่างระหว่างกล่อง
         self.boxes = []  # รายการกล่องที่วางบนพาเลท
-        self.occupancy_grid = np.zeros((int(width), int(length), int(height)), dtype=bool)  # ตารางแสดงพื้นที่ที่ถูกจอง
+        self.occupancy = OCCUPANCY_BACKENDS[occupancy](int(width), int(length), int(height))  # ตารางแสดงพื้นที่ที่ถูกจอง
+        self._scan_table = None  # ตารางทำงานของ engine 'voxel' (จัดสรรครั้งแรกที่ใช้ แล้วใช้ซ้ำ)
+
+    @property
+    def occupancy_grid(self):
+        """
+        ตารางพื้นที่ที่ถูกจองแบบ bool เต็มขนาด (width, length, height)
+        """
+        return self.occupancy.to_dense()
+
+    def reset(self):
+        """
+        ล้างกล่องและพื้นที่ที่ถูกจองทั้งหมด เพื่อใช้พาเลทเดิมวางรอบใหม่โดยไม่จัดสรรตารางใหม่
+        """
+        self.boxes = []
+        self.occupancy.clear()
+
+    def memory_bytes(self):
+        """
+        หน่วยความจำที่ใช้เก็บตารางพื้นที่ถูกจองของพาเลทนี้ รวมตารางทำงานของ engine 'voxel' ที่จัดสรรไว้
+        Returns:
+            int: จำนวน byte
+        """
+        return self.occupancy.nbytes + (self._scan_table.nbytes if self._scan_table is not None else 0)
 
     def has_sufficient_support(self, x, y, z, dx, dy, dz, threshold=0.5):
         """
@@ -32,9 +75,14 @@ class Pallet:
         """
         if z == self.frame_height:
             return True  # กล่องที่วางบนพื้นไม่ต้องตรวจสอบ
-        support_area = np.sum(self.occupancy_grid[int(x):int(x + dx), int(y):int(y + dy), :int(z)])
+        support_area = self.occupancy.count(int(x), int(x + dx), int(y), int(y + dy), 0, int(z))
         total_area = dx * dy
-        return (support_area / total_area) >= threshold
+        supported = (support_area / total_area) >= threshold
+        if STATS.enabled:
+            STATS.count("support_checks")
+            if not supported:
+                STATS.reject("support")
+        return supported
 
     def is_space_available(self, x, y, z, dx, dy, dz):
         """
@@ -51,8 +99,14 @@ class Pallet:
         """
         x_end, y_end, z_end = int(x + dx), int(y + dy), int(z + dz)
         if x_end > self.width or y_end > self.length or z_end > self.height:
+            STATS.reject("bounds")
             return False
-        return not self.occupancy_grid[int(x):x_end, int(y):y_end, int(z):z_end].any()
+        free = not self.occupancy.any(int(x), x_end, int(y), y_end, int(z), z_end)
+        if STATS.enabled:
+            STATS.count("collision_checks")
+            if not free:
+                STATS.reject("collision")
+        return free
 
     def mark_space_occupied(self, x, y, z, dx, dy, dz):
         """
@@ -65,12 +119,17 @@ class Pallet:
             dy (float): ความยาวของกล่อง
             dz (float): ความสูงของกล่อง
         """
-        x_end = int(x + dx + self.gap)
-        y_end = int(y + dy + self.gap)
-        z_end = int(z + dz)
-        self.occupancy_grid[int(x):x_end, int(y):y_end, int(z):z_end] = True
+        self.occupancy.fill(*self._reserved_range(x, y, z, dx, dy, dz))
+
+    def _reserved_range(self, x, y, z, dx, dy, dz):
+        """
+        ช่วงช่อง (x0, x1, y0, y1, z0, z1) ที่ mark_space_occupied จอง (รวมช่องว่างระหว่างกล่อง)
+        """
+        return int(x), int(x + dx + self.gap), int(y), int(y + dy + self.gap), int(z), int(z + dz)
 
-    def arrange_boxes(self, boxes, container_x, container_y, container_length, container_width, container_height):
+    def arrange_boxes(self, boxes, container_x, container_y, container_length, container_width, container_height,
+                      engine="voxel", strategy="first_fit", score_weights=None, planner=None, cache=None,
+                      deadline=None):
         """
         จัดเรียงกล่องบนพาเลทโดยพิจารณาฐานที่มั่นคง
         Args:
@@ -80,55 +139,271 @@ class Pallet:
             container_length (float): ความยาวของตู้คอนเทนเนอร์
             container_width (float): ความกว้างของตู้คอนเทนเนอร์
             container_height (float): ความสูงของตู้คอนเทนเนอร์
+            engine (str): วิธีค้นหาตำแหน่ง 'voxel' (ไล่ทุกช่องของ occupancy_grid), 'heightmap' (ผิวบน 2.5 มิติ)
+                หรือ 'extreme_point' (ตรวจเฉพาะจุดจาก ExtremePointIndex)
+                เฉพาะ 'heightmap' (ทุก strategy) ที่ตรวจน้ำหนักที่วางทับไม่ให้เกิน max_weight ของกล่องด้านล่าง
+                'voxel' และ 'extreme_point' ไม่ตรวจ (มี warning เมื่อกล่องมีน้ำหนัก; แจ้งครั้งเดียวต่อ engine ต่อ process)
+            strategy (str): 'first_fit' (ตำแหน่งแรกที่วางได้), 'best_fit' (ลองทั้ง 2 แนวการหมุน
+                แล้วเลือกตำแหน่งที่คะแนนสูงสุด), 'beam' (มองล่วงหน้าด้วย BeamPlanner)
+                หรือ 'layer' (จัดเป็นชั้นด้วย LayerPlanner) โดยทุกแบบยกเว้น 'first_fit' ใช้ได้กับ engine 'heightmap' เท่านั้น
+            score_weights (dict): น้ำหนักของเกณฑ์ให้คะแนนสำหรับ 'best_fit' (ดู scoring.DEFAULT_WEIGHTS)
+            planner (BeamPlanner | LayerPlanner): ค่าสำหรับ 'beam' หรือ 'layer'
+                (ค่าเริ่มต้นคือ BeamPlanner() หรือ LayerPlanner())
+            cache (PlacementCache): แคชผลการวาง ใช้เมื่อพาเลทยังว่างเท่านั้น (None = คำนวณใหม่ทุกครั้ง)
+            deadline (float): เวลา time.perf_counter() ที่ 'beam' ต้องเปลี่ยนเป็น first fit (เช่น เวลาที่เหลือของทั้ง order)
+                ใช้ร่วมกับ time_budget ของ planner; None = ใช้ time_budget อย่างเดียว
         Returns:
             tuple: รายการกล่องที่วางได้, รายการกล่องที่วางไม่ได้
         """
-        sorted_boxes = sorted(boxes, key=lambda x: x.priority)  # เรียงกล่องตามลำดับความสำคัญ
+        if engine not in ("voxel", "heightmap", "extreme_point"):
+            raise ValueError(f"Unknown placement engine: {engine}")
+        if strategy not in ("first_fit", "best_fit", "beam", "layer"):
+            raise ValueError(f"Unknown placement strategy: {strategy}")
+        if strategy != "first_fit" and engine != "heightmap":
+            raise ValueError(f"Placement strategy '{strategy}' requires engine='heightmap'")
+        if engine not in _LOAD_NOTED and boxes:
+            weighted = any(box.weight > 0 for box in boxes)
+            if engine not in LOAD_CHECKED_ENGINES and weighted:
+                _LOAD_NOTED.add(engine)
+                logger.warning(f"Placement engine '{engine}' ignores Box.max_weight; boxes may be stacked beyond "
+                               f"their load limit (use engine='heightmap' to enforce it)")
+            elif engine in LOAD_CHECKED_ENGINES and not weighted:
+                _LOAD_NOTED.add(engine)
+                logger.info("Boxes have no weight (order without a Weight column): "
+                            "the Max weight load check will not reject any placement")
+        # กล่องแต่ละแถวถูกขยายตาม QTY เป็น BoxBatch และเรียงตามลำดับความสำคัญ
+        batches = [BoxBatch(box) for box in sorted(boxes, key=lambda x: x.priority)]
+        container = (container_x, container_y, container_length, container_width, container_height)
+        if strategy == "beam":
+            planner = planner or BeamPlanner(score_weights=score_weights)
+        elif strategy == "layer":
+            planner = planner or LayerPlanner()
+        else:
+            planner = None
+        key = self._cache_key(batches, container, engine, strategy, score_weights, planner) \
+            if cache is not None and not self.boxes else None
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            self._apply_cached(batches, cached)
+        elif strategy in ("beam", "layer"):
+            self._place_batches_planner(batches, *container, planner=planner, deadline=deadline)
+        elif engine == "heightmap" and strategy == "best_fit":
+            self._place_batches_best_fit(batches, *container, score_weights=score_weights)
+        elif engine == "heightmap":
+            self._place_batches_heightmap(batches, *container)
+        elif engine == "extreme_point":
+            self._place_batches_extreme_point(batches, *container)
+        else:
+            self._place_batches_voxel(batches, *container)
+        if key is not None and cached is None:
+            cache.put(key, [(batch.positions.copy(), batch.orientations.copy()) for batch in batches])
         placed_boxes = []  # รายการกล่องที่วางได้
         unplaced_boxes = []  # รายการกล่องที่วางไม่ได้
-        for index, box in enumerate(sorted_boxes):
-            print(f"Process กำลังคำนวณสำหรับกล่องที่ {index + 1}/{len(sorted_boxes)}: {box.box_type}")  # Process message
-            placed = False
-            for z in range(int(self.frame_height), int(container_height - box.height + 1)):
-                for y in range(int(container_y), int(container_y + container_width - box.length + 1)):
-                    for x in range(int(container_x), int(container_x + container_length - box.width + 1)):
-                        if self.is_space_available(x, y, z, box.width, box.length, box.height) and \
-                           (z == self.frame_height or self.has_sufficient_support(x, y, z, box.width, box.length, box.height)):
-                            box.position = (x, y, z)
-                            self.boxes.append(box)
-                            placed_boxes.append(box)
-                            self.mark_space_occupied(x, y, z, box.width, box.length, box.height)
-                            placed = True
-                            break
-                    if placed:
-                        break
-                if placed:
-                    break
-            if not placed:
-                unplaced_boxes.append(box)
+        for batch in batches:
+            placed_boxes.extend(batch.to_boxes(placed=True))
+            unplaced_boxes.extend(batch.to_boxes(placed=False))
+        self.boxes.extend(placed_boxes)
         return placed_boxes, unplaced_boxes
 
-    def draw_pallet_frame(self, ax):
+    def _cache_key(self, batches, container, engine, strategy, score_weights, planner):
         """
-        วาดโครงพาเลทลงบนกราฟ 3 มิติ
-        Args:
-            ax (matplotlib.axes._subplots.Axes3DSubplot): แกนของกราฟ 3 มิติ
-        """
-        x, y, z = 0, 0, 0
-        dx, dy, dz = self.width, self.length, self.frame_height
-
-        # กำหนดจุดยอดของโครงพาเลท
-        vertices = np.array([
-            [x, y, z], [x + dx, y, z], [x + dx, y + dy, z], [x, y + dy, z],
-            [x, y, z + dz], [x + dx, y, z + dz], [x + dx, y + dy, z + dz], [x, y + dy, z + dz]
-        ])
-
-        # กำหนดขอบของโครงพาเลท
-        edges = [
-            [0, 1], [1, 2], [2, 3], [3, 0],  # ฐาน
-            [4, 5], [5, 6], [6, 7], [7, 4],  # ด้านบน
-            [0, 4], [1, 5], [2, 6], [3, 7]  # ขอบแนวตั้ง
-        ]
-
-        # วาดขอบของโครงพาเลทลงบนกราฟ
-        ax.add_collection3d(Line3DCollection(vertices[edges], color='black', linestyle='dashed', linewidth=2))
+        สร้าง key ของแคชจากรายการ SKU ตามลำดับการวาง ขนาดพาเลทและตู้ ระยะห่าง และค่าของ engine
+        """
+        skus = [(b.sku.box_type, b.sku.width, b.sku.length, b.sku.height, b.sku.max_weight, b.sku.conveyor,
+                 b.sku.priority, b.qty, b.sku.weight) for b in batches]
+        pallet = (self.width, self.length, self.height, self.frame_height, self.gap)
+        settings = {"engine": engine, "strategy": strategy, "score_weights": score_weights}
+        if planner is not None:
+            settings["planner"] = {name: getattr(planner, name) for name in planner.SETTINGS}
+        return fingerprint("pallet", skus, pallet, container, settings)
+
+    def _apply_cached(self, batches, cached):
+        """
+        นำตำแหน่งจากแคชมาใส่ใน BoxBatch และจองพื้นที่ของกล่องที่วางแล้ว
+        """
+        for batch, (positions, orientations) in zip(batches, cached):
+            batch.positions[...] = positions
+            batch.orientations[...] = orientations
+            for k in np.flatnonzero(batch.placed_mask):
+                dx, dy, dz = batch.dims(batch.orientations[k])
+                self.mark_space_occupied(*batch.positions[k], dx, dy, dz)
+
+    def _place_batches_voxel(self, batches, container_x, container_y, container_length, container_width,
+                             container_height):
+        """
+        วางกล่องทีละชิ้นโดยไล่ทุกช่อง (z, y, x) ของ occupancy_grid
+        backend 'dense' ใช้ integral volume ที่สร้างครั้งเดียวแล้วปรับเฉพาะช่องที่จองเพิ่มหลังวางแต่ละชิ้น
+        backend อื่นนับช่องที่ถูกจองทีละชั้นจาก backend โดยตรง จึงไม่ต้องแตกเป็นตาราง bool เต็มขนาด
+        """
+        dense = isinstance(self.occupancy, DenseOccupancy)
+        if dense:
+            grid = self.occupancy.to_dense()
+            self._scan_table = integral_volume(grid, out=self._scan_table)
+        elif self._scan_table is None:
+            self._scan_table = column_tables(self.occupancy.shape)
+        total = sum(batch.qty for batch in batches)
+        index = 0
+        for batch in batches:
+            box = batch.sku
+            for k in range(batch.qty):
+                index += 1
+                logger.debug("Process กำลังคำนวณสำหรับกล่องที่ %d/%d: %s", index, total, box.box_type)
+                # ไล่ทุกช่อง (z, y, x) ด้วย kernel ที่ตรวจเหมือน is_space_available และ has_sufficient_support
+                STATS.count("scans")
+                ranges = ((int(container_x), int(container_x + container_length - box.width + 1)),
+                          (int(container_y), int(container_y + container_width - box.length + 1)),
+                          (int(self.frame_height), int(container_height - box.height + 1)))
+                if dense:
+                    position = first_free_voxel(self._scan_table, *ranges, box.width, box.length, box.height,
+                                                self.frame_height)
+                else:
+                    position = first_free_voxel_columns(self.occupancy, self._scan_table, *ranges, box.width,
+                                                        box.length, box.height, self.frame_height)
+                if position is None:
+                    break  # ชิ้นที่เหลือมีขนาดเท่ากันจึงวางไม่ได้เช่นกัน
+                batch.set_position(k, position)
+                if dense:
+                    x0, x1, y0, y1, z0, z1 = self._reserved_range(*position, box.width, box.length, box.height)
+                    added = ~grid[x0:x1, y0:y1, z0:z1]  # ช่องที่ยังไม่ถูกจอง (ขอบอาจทับการจองของกล่องข้างเคียง)
+                    self.mark_space_occupied(*position, box.width, box.length, box.height)
+                    update_integral(self._scan_table, added, x0, y0, z0)
+                else:
+                    self.mark_space_occupied(*position, box.width, box.length, box.height)
+
+    def _place_batches_heightmap(self, batches, container_x, container_y, container_length, container_width,
+                                 container_height):
+        """
+        วางกล่องด้วย HeightmapEngine; ชิ้นที่เหมือนกันจะถูกวางต่อกันเป็นแถวในครั้งเดียว (place_row)
+        SKU ที่ตาราง feasibility ระบุว่าวางไม่ได้จะถูกข้ามทันที และ SKU แรกบนพื้นตู้ว่างถูกวางเป็นบล็อก (place_block)
+        """
+        engine = HeightmapEngine(self, container_x, container_y, container_length, container_width, container_height)
+        total = sum(batch.qty for batch in batches)
+        index = 0
+        for batch in batches:
+            box = batch.sku
+            tiling = TABLE.for_engine(box, engine).tilings[0]
+            if not tiling.fits:
+                STATS.reject("infeasible", batch.qty)
+                index += batch.qty
+                continue
+            k = 0
+            for position in engine.place_block(box.width, box.length, box.height, batch.qty, tiling.per_row,
+                                               tiling.rows, tiling.layers, box.weight, box.max_weight):
+                batch.set_position(k, position)
+                self.mark_space_occupied(*position, box.width, box.length, box.height)
+                k += 1
+            STATS.count("blocks", k)
+            while k < batch.qty:
+                logger.debug("Process กำลังคำนวณสำหรับกล่องที่ %d/%d: %s", index + k + 1, total, box.box_type)
+                position = engine.find_position(box.width, box.length, box.height, box.weight)
+                if position is None:
+                    break  # ชิ้นที่เหลือมีขนาดเท่ากันจึงวางไม่ได้เช่นกัน
+                x, y, z = position
+                for row_x in engine.place_row(x, y, z, box.width, box.length, box.height, batch.qty - k,
+                                              box.weight, box.max_weight):
+                    batch.set_position(k, (row_x, y, z))
+                    self.mark_space_occupied(row_x, y, z, box.width, box.length, box.height)
+                    k += 1
+            index += batch.qty
+
+    def _place_batches_best_fit(self, batches, container_x, container_y, container_length, container_width,
+                                container_height, score_weights=None):
+        """
+        วางกล่องทีละชิ้นด้วย HeightmapEngine.best_position โดยประเมินทั้ง 2 แนวการหมุนของ Box.can_rotate
+        """
+        engine = HeightmapEngine(self, container_x, container_y, container_length, container_width, container_height)
+        total = sum(batch.qty for batch in batches)
+        index = 0
+        for batch in batches:
+            box = batch.sku
+            orientations = box.can_rotate()
+            if TABLE.for_engine(box, engine).best is None:  # วางไม่ได้ทุกแนวการหมุนแม้ในตู้ว่าง
+                STATS.reject("infeasible", batch.qty)
+                index += batch.qty
+                continue
+            for k in range(batch.qty):
+                index += 1
+                logger.debug("Process กำลังคำนวณสำหรับกล่องที่ %d/%d: %s", index, total, box.box_type)
+                found = engine.best_position(orientations, score_weights, box.weight)
+                if found is None:
+                    break  # ชิ้นที่เหลือมีขนาดเท่ากันจึงวางไม่ได้เช่นกัน
+                x, y, z, orientation = found
+                dx, dy, dz = orientations[orientation]
+                batch.set_position(k, (x, y, z), orientation)
+                engine.place(x, y, z, dx, dy, dz, box.weight, box.max_weight)
+                self.mark_space_occupied(x, y, z, dx, dy, dz)
+
+    def _place_batches_planner(self, batches, container_x, container_y, container_length, container_width,
+                               container_height, planner, deadline=None):
+        """
+        วางกล่องด้วย planner ที่ทำงานบน HeightmapEngine (BeamPlanner หรือ LayerPlanner) แล้วจองพื้นที่ของกล่องที่วางได้
+        """
+        engine = HeightmapEngine(self, container_x, container_y, container_length, container_width, container_height)
+        logger.debug("Process กำลังคำนวณด้วย %s สำหรับกล่อง %d ชิ้น", type(planner).__name__,
+                     sum(batch.qty for batch in batches))
+        planner.plan(engine, batches, deadline)
+        for batch in batches:
+            for k in np.flatnonzero(batch.placed_mask):
+                dx, dy, dz = batch.dims(batch.orientations[k])
+                self.mark_space_occupied(*batch.positions[k], dx, dy, dz)
+
+    def _drop_point(self, x, y, z):
+        """
+        เลื่อนจุดลงตามแนวแกน z จนถึงผิวบนของกล่องที่อยู่ด้านล่าง (หรือพื้นพาเลท)
+        """
+        if not (0 <= x < self.width and 0 <= y < self.length):
+            return z
+        below = np.flatnonzero(self.occupancy.column(int(x), int(y), int(self.frame_height), int(z)))
+        return int(self.frame_height) + (int(below[-1]) + 1 if below.size else 0)
+
+    def _add_extreme_points(self, points, x, y, z, dx, dy, dz):
+        """
+        อัปเดต ExtremePointIndex หลังวางกล่อง โดยใช้ขอบเขตเดียวกับ mark_space_occupied
+        และเพิ่มจุดด้านขวา, ด้านหลัง, ด้านบน พร้อมจุดที่เลื่อนลงถึงผิวรองรับ
+        """
+        x_end = int(x + dx + self.gap)
+        y_end = int(y + dy + self.gap)
+        z_end = int(z + dz)
+        right = (x_end, int(y), int(z))
+        back = (int(x), y_end, int(z))
+        new_points = [right, back, (int(x), int(y), z_end)]
+        for px, py, pz in (right, back):
+            dropped = self._drop_point(px, py, pz)
+            if dropped != pz:
+                new_points.append((px, py, dropped))
+        points.add_box(int(x), int(y), int(z), x_end - int(x), y_end - int(y), z_end - int(z), new_points)
+
+    def _place_batches_extreme_point(self, batches, container_x, container_y, container_length, container_width,
+                                     container_height):
+        """
+        วางกล่องโดยตรวจเฉพาะจุดใน ExtremePointIndex แทนการไล่ทุกช่อง
+        ใช้ occupancy_grid ตรวจพื้นที่ว่างและพื้นที่รองรับเหมือน engine 'voxel'
+        """
+        x_end, y_end = container_x + container_length, container_y + container_width
+        points = ExtremePointIndex([(int(container_x), int(container_y), int(self.frame_height))])
+        for placed in self.boxes:  # นำกล่องที่วางไว้แล้วมาสร้างจุด
+            px, py, pz = placed.position
+            self._add_extreme_points(points, px, py, pz, placed.width, placed.length, placed.height)
+        total = sum(batch.qty for batch in batches)
+        index = 0
+        for batch in batches:
+            box = batch.sku
+            for k in range(batch.qty):
+                index += 1
+                logger.debug("Process กำลังคำนวณสำหรับกล่องที่ %d/%d: %s", index, total, box.box_type)
+                position = None
+                for x, y, z in points:
+                    STATS.count("candidates")
+                    if x < container_x or y < container_y or x + box.width > x_end or y + box.length > y_end \
+                            or z + box.height > container_height:
+                        STATS.reject("bounds")
+                        continue
+                    if self.is_space_available(x, y, z, box.width, box.length, box.height) and \
+                       (z == self.frame_height or self.has_sufficient_support(x, y, z, box.width, box.length, box.height)):
+                        position = (x, y, z)
+                        break
+                if position is None:
+                    break  # ชิ้นที่เหลือมีขนาดเท่ากันจึงวางไม่ได้เช่นกัน
+                batch.set_position(k, position)
+                self.mark_space_occupied(*position, box.width, box.length, box.height)
+                self._add_extreme_points(points, *position, box.width, box.length, box.height)
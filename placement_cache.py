@@ -0,0 +1,177 @@
+# placement_cache.py
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _canonical(value):
+    """
+    แปลงค่าชนิด NumPy ให้เป็นค่า Python สำหรับ json.dumps
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot fingerprint value of type {type(value).__name__}")
+
+
+def fingerprint(*parts):
+    """
+    คำนวณ hash มาตรฐานของข้อมูลที่ใช้วางกล่อง (รายการ SKU ขนาดตู้ ระยะห่าง และค่าของ engine)
+    Args:
+        *parts: ค่าใดๆ ที่แปลงเป็น JSON ได้ (dict ถูกเรียง key ก่อนเสมอ)
+    Returns:
+        str: SHA-256 แบบ hex
+    """
+    text = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=_canonical)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PlacementCache:
+    """
+    คลาส PlacementCache: แคชผลการวางกล่อง 2 ชั้น
+    ชั้นแรกเป็น LRU ในหน่วยความจำ ชั้นที่สองเป็นไฟล์ SQLite ที่ลบรายการที่ใช้นานที่สุดเมื่อเกินขนาดที่กำหนด
+    เมื่อส่งไปยัง process อื่น (pickle) จะส่งเฉพาะการตั้งค่า process ปลายทางเริ่มด้วยหน่วยความจำว่างและใช้ไฟล์เดียวกัน
+    """
+
+    def __init__(self, capacity=256, path=None, max_disk_bytes=64 * 1024 * 1024):
+        """
+        Constructor ของคลาส PlacementCache
+        Args:
+            capacity (int): จำนวนรายการสูงสุดในหน่วยความจำ
+            path (str): ไฟล์ SQLite ของชั้นที่สอง (None = ใช้เฉพาะหน่วยความจำ)
+            max_disk_bytes (int): ขนาดรวมสูงสุดของข้อมูลในไฟล์ (byte)
+        """
+        self.capacity = max(1, int(capacity))
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._connection = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "path": self.path, "max_disk_bytes": self.max_disk_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _db(self):
+        """
+        เปิดไฟล์ SQLite (ครั้งแรกที่ใช้) หรือคืน None หากไม่ได้กำหนด path
+        """
+        if self.path is None:
+            return None
+        if self._connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS placements "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            self._connection.commit()
+        return self._connection
+
+    def _remember(self, key, value):
+        """
+        เก็บค่าในชั้นหน่วยความจำและลบรายการที่ใช้นานที่สุดเมื่อเกิน capacity
+        """
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        ค้นหาผลการวางจาก key
+        Returns:
+            object: ค่าที่เก็บไว้ หรือ None หากไม่พบ
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.memory_hits += 1
+            return self._memory[key]
+        db = self._db()
+        if db is not None:
+            row = db.execute("SELECT value FROM placements WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE placements SET last_used = ? WHERE key = ?", (time.time(), key))
+                db.commit()
+                value = pickle.loads(row[0])
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        บันทึกผลการวางลงทั้งสองชั้น
+        """
+        self._remember(key, value)
+        db = self._db()
+        if db is None:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_disk_bytes:
+            return  # ใหญ่เกินกว่าจะเก็บในไฟล์
+        db.execute("INSERT OR REPLACE INTO placements (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                   (key, blob, len(blob), time.time()))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM placements").fetchone()[0]
+        if total > self.max_disk_bytes:
+            evicted = 0
+            for old_key, size in db.execute("SELECT key, size FROM placements ORDER BY last_used").fetchall():
+                if total - evicted <= self.max_disk_bytes:
+                    break
+                db.execute("DELETE FROM placements WHERE key = ?", (old_key,))
+                evicted += size
+        db.commit()
+
+    def stats(self):
+        """
+        Returns:
+            dict: จำนวน hit (รวม/หน่วยความจำ/ไฟล์) miss อัตรา hit และจำนวนรายการและขนาดของแต่ละชั้น
+        """
+        lookups = self.hits + self.misses
+        db = self._db()
+        disk_entries, disk_bytes = (0, 0) if db is None else db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM placements").fetchone()
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
+        }
+
+    def clear(self):
+        """
+        ล้างทั้งสองชั้นและรีเซ็ตสถิติ
+        """
+        self._memory.clear()
+        db = self._db()
+        if db is not None:
+            db.execute("DELETE FROM placements")
+            db.commit()
+        self.hits = self.memory_hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        """
+        ปิดไฟล์ SQLite
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,36 @@
+# scoring.py
+import numpy as np
+
+# น้ำหนักของแต่ละเกณฑ์ในการให้คะแนนตำแหน่งวางกล่อง
+DEFAULT_WEIGHTS = {
+    "contact": 1.0,  # สัดส่วนฐานที่สัมผัสผิวรองรับ (ยิ่งมากยิ่งดี)
+    "edge": 0.5,     # สัดส่วนขอบที่ชิดผนังหรือกล่องข้างเคียง (ยิ่งมาก edge waste ยิ่งน้อย)
+    "height": 1.0,   # ความสูงผิวบนหลังวางเทียบกับความสูงตู้ (ยิ่งต่ำยิ่งดี)
+}
+
+
+def placement_scores(contact_ratio, edge_ratio, top_z, height_limit, weights=None):
+    """
+    คำนวณคะแนนของตำแหน่งวางกล่องหลายตำแหน่งพร้อมกัน (Tightest Fit / Lowest Edge Waste)
+    Args:
+        contact_ratio (np.ndarray): สัดส่วนพื้นที่ฐานที่มีผิวรองรับ (0 - 1)
+        edge_ratio (np.ndarray): สัดส่วนขอบของกล่องที่ชิดผนังหรือกล่องอื่น (0 - 1)
+        top_z (np.ndarray): ความสูงผิวบนของกล่องหลังวาง
+        height_limit (float): ความสูงสูงสุดของตู้ ใช้ปรับค่าความสูงให้อยู่ในช่วง 0 - 1
+        weights (dict): น้ำหนักของแต่ละเกณฑ์ (ค่าเริ่มต้นคือ DEFAULT_WEIGHTS)
+    Returns:
+        np.ndarray: คะแนนของแต่ละตำแหน่ง (ยิ่งมากยิ่งดี)
+    """
+    w = DEFAULT_WEIGHTS if weights is None else {**DEFAULT_WEIGHTS, **weights}
+    contact_ratio = np.asarray(contact_ratio, dtype=float)
+    edge_ratio = np.asarray(edge_ratio, dtype=float)
+    top_z = np.asarray(top_z, dtype=float)
+    return w["contact"] * contact_ratio + w["edge"] * edge_ratio - w["height"] * top_z / height_limit
+
+
+def best_index(scores):
+    """
+    คืนดัชนีของคะแนนสูงสุด (หากเท่ากันเลือกตำแหน่งแรก) หรือ None หากไม่มีคะแนน
+    """
+    scores = np.asarray(scores)
+    return int(np.argmax(scores)) if scores.size else None
@@ -0,0 +1,394 @@
+# service.py
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from box import Box
+from feasibility import TABLE
+from exporter import EXPORT_CONVENTION, Convention, Placements, check_convention, placement_dicts
+from loader import read_order
+from main import plan_order, workspace, CONTAINER_SLOTS, OCCUPANCY_BACKEND, PLACEMENT_ENGINE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"  # Local only; the service has no authentication
+DEFAULT_PORT = 8765
+QUEUE_SIZE = 32  # Requests waiting for a worker; further requests are answered 'busy' at once
+REQUEST_TIMEOUT = 30.0  # Seconds from arrival to response (queue wait included)
+MAX_REQUEST_BYTES = 16 * 1024 * 1024  # Longest accepted request line
+
+# Planning state of a worker process: pallets reused between requests (see main.workspace)
+_WORKSPACES = {}
+
+
+def _warm_worker(occupancy=OCCUPANCY_BACKEND, table_path=None):
+    """
+    Process pool initializer: allocates the pallet of every container option and plans a one-box order,
+    so imports, grid allocation and first-call costs are paid before the first request arrives.
+    The precomputed feasibility table is loaded here as well when table_path is given (it is never written).
+    """
+    if table_path:
+        TABLE.load(table_path)
+    for slot, options in enumerate(CONTAINER_SLOTS):
+        for container_type in options:
+            workspace(_WORKSPACES, slot, container_type, occupancy)
+    plan_order([Box("WARMUP", 10, 10, 10, 100.0, 1, 1)], workers=1, occupancy=occupancy, workspaces=_WORKSPACES)
+
+
+def _worker_pid():
+    """
+    Returns the pid of the worker (used to start every process of the pool up front).
+    """
+    time.sleep(0.05)  # Keep the worker busy so the pool starts another process for the next call
+    return os.getpid()
+
+
+def _order_text(request):
+    """
+    Order CSV text of a request: 'csv' (order file contents) or 'rows' (objects keyed by order file headers).
+    """
+    if "csv" in request:
+        return request["csv"]
+    rows = request.get("rows")
+    if not rows:
+        raise ValueError("Request has neither 'csv' nor 'rows'")
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=list(dict.fromkeys(key for row in rows for key in row)))
+    writer.writeheader()
+    writer.writerows(rows)
+    return text.getvalue()
+
+
+def _request_convention(value):
+    """
+    Converts the 'convention' of a request to a Convention; fields left out keep their EXPORT_CONVENTION value.
+    """
+    allowed = ", ".join(Convention._fields)
+    if not isinstance(value, dict):
+        raise ValueError(f"'convention' must be an object with the fields {allowed}")
+    unknown = sorted(set(value) - set(Convention._fields))
+    if unknown:
+        raise ValueError(f"Unknown convention field(s): {', '.join(map(str, unknown))} (allowed: {allowed})")
+    return check_convention(EXPORT_CONVENTION._replace(**value))
+
+
+def plan_request(request, occupancy=OCCUPANCY_BACKEND):
+    """
+    Plans one order request in a worker process on its reused pallets.
+
+    Args:
+        request (dict): 'csv' or 'rows', plus optional 'engine', 'strategy' and 'convention'
+            ({'units': 'mm' or 'cm', 'z_ref': 'bottom' or 'top'}; fields left out follow exporter.EXPORT_CONVENTION).
+        occupancy (str): Occupancy backend of the pallets.
+
+    Returns:
+        dict: Response with the placements of every container, the unplaced boxes and the rejected rows.
+    """
+    start_time = time.perf_counter()
+    convention = _request_convention(request["convention"]) if "convention" in request else EXPORT_CONVENTION
+    table = read_order(io.StringIO(_order_text(request)))
+    result = plan_order(table.to_boxes(), engine=request.get("engine", PLACEMENT_ENGINE),
+                        strategy=request.get("strategy", "first_fit"), workers=1, occupancy=occupancy,
+                        workspaces=_WORKSPACES)
+    return {
+        "status": "ok",
+        "containers": [{"container": load["container"].container_type,
+                        "utilization": round(load["utilization"], 4),
+                        "boxes": placement_dicts(Placements.from_boxes(load["placed"]).to(convention))}
+                       for load in result["loads"]],
+        "unplaced": placement_dicts(Placements.from_boxes(result["unplaced"]).to(convention)),
+        "utilization": round(result["utilization"], 4),
+        "bad_rows": [entry._asdict() for entry in table.bad_rows],
+        "seconds": round(time.perf_counter() - start_time, 6),
+    }
+
+
+class PlanningService:
+    """
+    Long-running planning server: JSON lines over TCP (localhost) or a Unix socket.
+
+    Each request line is a JSON object answered by one JSON line, in order, on the same connection.
+    Plans run in a pre-warmed process pool; at most `workers` plans run at once, up to `queue_size` more wait
+    in a bounded queue and anything beyond that is answered {"status": "busy"} straight away (backpressure).
+    Requests not answered within their timeout get {"status": "timeout"}; a plan that has already started
+    still finishes in its worker (processes cannot be interrupted) and keeps that worker busy until then.
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, timeout=REQUEST_TIMEOUT, occupancy=OCCUPANCY_BACKEND,
+                 table_path=None):
+        """
+        Args:
+            workers (int): Worker processes (default: CPU count).
+            queue_size (int): Requests that may wait for a worker.
+            timeout (float): Default seconds per request (a request may lower or raise it with 'timeout').
+            occupancy (str): Occupancy backend of the worker pallets.
+            table_path (str): Feasibility table JSON each worker loads at start-up (None = built in memory).
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        self.occupancy = occupancy
+        self.table_path = table_path
+        self.executor = None
+        self.queue = None
+        self.counters = {"ok": 0, "error": 0, "busy": 0, "timeout": 0}
+        self._dispatchers = []
+        self._server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """
+        Starts the worker pool, waits until every worker is warm, then listens.
+
+        Args:
+            host (str): TCP host (ignored when path is given).
+            port (int): TCP port (0 = any free port, see address).
+            path (str): Unix socket path instead of TCP.
+        """
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker,
+                                            initargs=(self.occupancy, self.table_path))
+        pids = await asyncio.gather(*(loop.run_in_executor(self.executor, _worker_pid) for _ in range(self.workers)))
+        logger.info(f"Planning workers ready: {sorted(set(pids))}")
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle, path=path, limit=MAX_REQUEST_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_REQUEST_BYTES)
+        logger.info(f"Planning service listening on {self.address}")
+
+    @property
+    def address(self):
+        """
+        Listening address: (host, port) for TCP or the socket path.
+        """
+        sockname = self._server.sockets[0].getsockname()
+        return sockname if isinstance(sockname, str) else tuple(sockname[:2])
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening, cancels the dispatchers and shuts the worker pool down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def _dispatch(self):
+        """
+        Takes queued requests and runs them in the pool, one at a time per dispatcher.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            request, future = await self.queue.get()
+            try:
+                if future.done():  # Timed out while waiting in the queue
+                    continue
+                try:
+                    response = await loop.run_in_executor(self.executor, plan_request, request, self.occupancy)
+                except Exception as e:
+                    response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                if not future.done():
+                    future.set_result(response)
+            finally:
+                self.queue.task_done()
+
+    async def submit(self, request):
+        """
+        Plans one request through the queue.
+
+        Returns:
+            dict: The response (status 'ok', 'error', 'busy' or 'timeout'), with the request 'id' if it had one.
+        """
+        if request.get("op") == "ping":
+            response = {"status": "ok"}
+        elif request.get("op") == "stats":
+            response = {"status": "ok", "workers": self.workers, "queued": self.queue.qsize(),
+                        "queue_size": self.queue_size, "counters": dict(self.counters)}
+        else:
+            future = asyncio.get_running_loop().create_future()
+            try:
+                timeout = float(request.get("timeout", self.timeout))
+                self.queue.put_nowait((request, future))
+            except (TypeError, ValueError) as e:
+                response = {"status": "error", "error": f"Invalid timeout: {e}"}
+            except asyncio.QueueFull:
+                response = {"status": "busy", "error": "Request queue is full, retry later"}
+            else:
+                try:
+                    response = await asyncio.wait_for(asyncio.shield(future), timeout)
+                except asyncio.TimeoutError:
+                    future.cancel()
+                    response = {"status": "timeout", "error": f"No plan within {timeout} seconds"}
+            self.counters[response["status"]] += 1
+        if "id" in request:
+            response = {"id": request["id"], **response}
+        return response
+
+    async def _handle(self, reader, writer):
+        """
+        Serves one connection: reads request lines and writes response lines until the client closes it.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line longer than MAX_REQUEST_BYTES
+                    writer.write(_encode({"status": "error", "error": "Request too large"}))
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                except ValueError as e:
+                    response = {"status": "error", "error": f"Invalid request: {e}"}
+                else:
+                    response = await self.submit(request)
+                writer.write(_encode(response))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _encode(message):
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+class PlanningClient:
+    """
+    Blocking client for PlanningService (one connection, requests answered in order).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, timeout=None):
+        """
+        Args:
+            host (str), port (int): TCP address of the service.
+            path (str): Unix socket path instead of TCP.
+            timeout (float): Socket timeout in seconds (None = wait indefinitely).
+        """
+        if path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile("rb")
+
+    def request(self, message):
+        """
+        Sends one request and waits for its response.
+        """
+        self.sock.sendall(_encode(message))
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Planning service closed the connection")
+        return json.loads(line)
+
+    def ping(self):
+        return self.request({"op": "ping"})
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+    def plan(self, csv_text=None, rows=None, **options):
+        """
+        Plans an order given as order file text or as rows keyed by order file headers.
+
+        Args:
+            csv_text (str): Contents of an order CSV.
+            rows (list): Dicts such as {'BoxTypes': 'C12', 'Width': 320, ...} (mm, like the order file).
+            **options: engine, strategy, convention, timeout or id, see PlanningService.
+        """
+        message = dict(options)
+        if csv_text is not None:
+            message["csv"] = csv_text
+        else:
+            message["rows"] = rows
+        return self.request(message)
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+async def _serve(args):
+    service = PlanningService(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout,
+                              table_path=args.feasibility_table)
+    await service.start(args.host, args.port, args.unix)
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point:
+        python service.py serve [--port 8765 | --unix /tmp/boxloader.sock] [--workers N]
+        python service.py plan order.csv [--port 8765 | --unix /tmp/boxloader.sock]
+    """
+    parser = argparse.ArgumentParser(description="Local pallet planning service.")
+    parser.add_argument('command', choices=['serve', 'plan'])
+    parser.add_argument('order', nargs='?', help="Order CSV to plan (plan command)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="Unix socket path instead of TCP")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Worker processes (serve)")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="Waiting requests before 'busy' (serve)")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help="Seconds per request")
+    parser.add_argument('--strategy', default='first_fit', choices=['first_fit', 'best_fit', 'beam', 'layer'])
+    parser.add_argument('--feasibility-table', metavar='PATH',
+                        help="SKU feasibility table JSON loaded by every worker (serve, see feasibility.py)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.order:
+        parser.error("plan needs an order file")
+    with open(args.order, 'r', encoding='utf-8') as file:
+        csv_text = file.read()
+    with PlanningClient(args.host, args.port, args.unix) as client:
+        response = client.plan(csv_text, strategy=args.strategy, timeout=args.timeout)
+    if response["status"] != "ok":
+        print(f"Error: {response['status']}: {response.get('error', '')}")
+        return 1
+    for number, load in enumerate(response["containers"], start=1):
+        print(f"{number}. {load['container']:<8}{len(load['boxes']):>6} boxes{load['utilization']:>10.2f}%")
+    print(f"Unplaced: {len(response['unplaced'])}  Utilization: {response['utilization']:.2f}%  "
+          f"Plan time: {response['seconds']:.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
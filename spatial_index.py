@@ -0,0 +1,131 @@
+# spatial_index.py
+import math
+from collections import defaultdict
+
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    คลาส SpatialIndex: ดัชนีเชิงพื้นที่ของกล่องที่วางแล้ว
+    - grid hash แบบสม่ำเสมอบนระนาบ (x, y) สำหรับหากล่องที่อยู่ใกล้ (ใช้ตรวจการชน)
+    - dictionary ตามความสูงผิวบน (z + ความสูง) สำหรับหากล่องที่รองรับฐาน
+    """
+
+    def __init__(self, cell_size=100):
+        """
+        Constructor ของคลาส SpatialIndex
+        Args:
+            cell_size (float): ขนาดช่องของ grid hash (หน่วยเดียวกับพิกัดกล่อง)
+        """
+        self.cell_size = cell_size
+        self.items = []  # ข้อมูลกล่องตามลำดับที่เพิ่ม
+        self.extents = []  # (x, y, z, dx, dy, dz) ของแต่ละกล่อง
+        self.cells = defaultdict(list)  # (i, j) -> ดัชนีกล่องที่ครอบคลุมช่องนี้
+        self.by_top = defaultdict(set)  # ความสูงผิวบน -> ดัชนีกล่อง
+
+    def __len__(self):
+        return len(self.items)
+
+    @staticmethod
+    def _top_key(value):
+        return round(value, 6)
+
+    def _cell_range(self, x, y, dx, dy):
+        """
+        คืนช่วงช่องของ grid ที่พื้นที่ [x, x+dx] x [y, y+dy] (รวมขอบ) ครอบคลุม
+        """
+        size = self.cell_size
+        return (math.floor(x / size), math.floor((x + dx) / size),
+                math.floor(y / size), math.floor((y + dy) / size))
+
+    def insert(self, item, x, y, z, dx, dy, dz):
+        """
+        เพิ่มกล่องลงในดัชนี
+        Args:
+            item (object): ข้อมูลกล่องที่จะคืนกลับจากการค้นหา
+            x, y, z (float): ตำแหน่งมุมล่างซ้ายของกล่อง
+            dx, dy, dz (float): ขนาดของกล่อง
+        Returns:
+            int: ดัชนีของกล่องในโครงสร้างนี้
+        """
+        box_id = len(self.items)
+        self.items.append(item)
+        self.extents.append((x, y, z, dx, dy, dz))
+        i0, i1, j0, j1 = self._cell_range(x, y, dx, dy)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells[(i, j)].append(box_id)
+        self.by_top[self._top_key(z + dz)].add(box_id)
+        return box_id
+
+    def _ids_in_cells(self, i0, i1, j0, j1):
+        found = set()
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                found.update(self.cells.get((i, j), ()))
+        return sorted(found)
+
+    def nearby_ids(self, x, y, dx, dy):
+        """
+        คืนดัชนีของกล่องที่อยู่ในช่อง grid เดียวกับพื้นที่ [x, x+dx] x [y, y+dy] (เรียงตามลำดับที่เพิ่ม)
+        """
+        return self._ids_in_cells(*self._cell_range(x, y, dx, dy))
+
+    def nearby_groups(self, xs, ys, dx, dy):
+        """
+        จัดกลุ่มจุด (xs[i], ys[i]) ตามช่อง grid ของมุม (x, y) แล้วคืนกล่องที่อาจซ้อนทับพื้นที่ [x, x+dx] x [y, y+dy]
+        ของทุกจุดในกลุ่ม เพื่อตรวจทั้งกลุ่มพร้อมกันกับกล่องใกล้เคียงชุดเดียว (ค้นหา grid ครั้งเดียวต่อช่องแทนทุกจุด)
+        Returns:
+            list: (rows, ids) ของแต่ละกลุ่ม: ดัชนีของจุดใน xs และดัชนีของกล่อง (เรียงตามลำดับที่เพิ่ม)
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if not xs.size:
+            return []
+        size = self.cell_size
+        corners = np.floor(np.stack([xs / size, ys / size], axis=1)).astype(np.int64)
+        keys, inverse = np.unique(corners, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = []
+        for k, (i, j) in enumerate(keys.tolist()):
+            # มุมอยู่ในช่อง (i, j) จึงขอบอีกด้านไม่เกิน (i + 1) * size + dx
+            i1, j1 = math.floor(((i + 1) * size + dx) / size), math.floor(((j + 1) * size + dy) / size)
+            groups.append((np.flatnonzero(inverse == k), self._ids_in_cells(i, i1, j, j1)))
+        return groups
+
+    def nearby(self, x, y, dx, dy):
+        """
+        คืนกล่องที่อาจซ้อนทับกับพื้นที่ [x, x+dx] x [y, y+dy] บนระนาบ (x, y)
+        """
+        return [self.items[box_id] for box_id in self.nearby_ids(x, y, dx, dy)]
+
+    def resting_on(self, z, x, y, dx, dy):
+        """
+        คืนกล่องที่ผิวบนอยู่ที่ระดับ z และอยู่ใกล้พื้นที่ [x, x+dx] x [y, y+dy]
+        """
+        tops = self.by_top.get(self._top_key(z))
+        if not tops:
+            return []
+        if len(tops) < 16:
+            ids = sorted(tops)
+        else:
+            ids = [box_id for box_id in self.nearby_ids(x, y, dx, dy) if box_id in tops]
+        return [self.items[box_id] for box_id in ids]
+
+    def collides(self, x, y, z, dx, dy, dz):
+        """
+        ตรวจสอบว่ากล่องที่ (x, y, z) ขนาด dx x dy x dz ซ้อนทับกับกล่องที่อยู่ในดัชนีหรือไม่
+        (หยุดทันทีที่พบกล่องที่ชน)
+        """
+        extents = self.extents
+        i0, i1, j0, j1 = self._cell_range(x, y, dx, dy)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for box_id in self.cells.get((i, j), ()):
+                    bx, by, bz, bdx, bdy, bdz = extents[box_id]
+                    if not (x + dx <= bx or x >= bx + bdx or
+                            y + dy <= by or y >= by + bdy or
+                            z + dz <= bz or z >= bz + bdz):
+                        return True
+        return False
@@ -0,0 +1,107 @@
+# support_graph.py
+import heapq
+import math
+
+
+class SupportGraph:
+    """
+    คลาส SupportGraph: กราฟการรองรับน้ำหนักของกล่องที่วางแล้ว (กล่อง -> กล่องที่อยู่ด้านล่างพร้อมสัดส่วนน้ำหนักที่ส่งลงไป)
+    เก็บภาระสะสม (น้ำหนักทั้งหมดที่กดอยู่บนกล่อง) ของทุกกล่องไว้ และอัปเดตเฉพาะกล่องที่อยู่ใต้กล่องใหม่
+    จึงไม่ต้องคำนวณภาระของทั้งกองใหม่ทุกครั้งที่ตรวจตำแหน่ง
+
+    น้ำหนักของกล่องกระจายลงกล่องด้านล่างตามสัดส่วนพื้นที่สัมผัส (ส่วนที่วางบนพื้นพาเลทไม่ส่งต่อ)
+    """
+
+    def __init__(self):
+        self.base = []  # ระดับฐาน z ของแต่ละกล่อง (ใช้เรียงลำดับจากบนลงล่าง)
+        self.max_load = []  # น้ำหนักสูงสุดที่วางทับกล่องได้ (Box.max_weight)
+        self.load = []  # ภาระสะสมปัจจุบัน
+        self.below = []  # [(กล่องด้านล่าง, สัดส่วน), ...] ของแต่ละกล่อง
+
+    def __len__(self):
+        return len(self.base)
+
+    def copy(self):
+        """
+        สำเนาที่แก้ไขได้อิสระ (รายการ below ของแต่ละกล่องไม่ถูกแก้ไขหลังเพิ่ม จึงใช้ร่วมกันได้)
+        """
+        clone = SupportGraph()
+        clone.base = self.base.copy()
+        clone.max_load = self.max_load.copy()
+        clone.load = self.load.copy()
+        clone.below = self.below.copy()
+        return clone
+
+    def _shares(self, contacts):
+        """
+        แปลง {กล่อง: พื้นที่สัมผัส} เป็น [(กล่อง, สัดส่วน)] (กล่อง -1 = พื้นพาเลท ไม่นำไปส่งต่อ)
+        """
+        total = sum(contacts.values())
+        if total <= 0:
+            return ()
+        return tuple((node, area / total) for node, area in contacts.items() if node >= 0)
+
+    def _propagate(self, shares, weight):
+        """
+        ไล่ภาระที่เพิ่มขึ้นลงไปตามกราฟจากบนลงล่าง
+        Yields:
+            tuple: (กล่อง, ภาระที่เพิ่มขึ้น) เมื่อรวมภาระจากทุกเส้นทางของกล่องนั้นครบแล้ว
+        """
+        added = {}
+        heap = []
+        for node, share in shares:
+            if node not in added:
+                heapq.heappush(heap, (-self.base[node], node))
+            added[node] = added.get(node, 0.0) + weight * share
+        while heap:
+            _, node = heapq.heappop(heap)  # กล่องด้านบนมีฐานสูงกว่าเสมอ จึงได้รับภาระครบก่อนถูกดึงออก
+            delta = added.pop(node)
+            yield node, delta
+            for lower, share in self.below[node]:
+                if lower not in added:
+                    heapq.heappush(heap, (-self.base[lower], lower))
+                added[lower] = added.get(lower, 0.0) + delta * share
+
+    def can_add(self, contacts, weight):
+        """
+        ตรวจว่ากล่องน้ำหนัก weight ที่วางบนกล่องตาม contacts จะทำให้กล่องใดรับน้ำหนักเกินหรือไม่
+        Args:
+            contacts (dict): {กล่องด้านล่าง: พื้นที่สัมผัส}
+            weight (float): น้ำหนักของกล่องใหม่
+        Returns:
+            bool: True หากไม่มีกล่องใดรับน้ำหนักเกิน max_load
+        """
+        if weight <= 0:
+            return True
+        for node, delta in self._propagate(self._shares(contacts), weight):
+            if self.load[node] + delta > self.max_load[node] + 1e-9:
+                return False
+        return True
+
+    def add(self, base, weight, max_load, contacts):
+        """
+        เพิ่มกล่องที่วางแล้วและเพิ่มภาระให้กล่องด้านล่าง
+        Args:
+            base (float): ระดับฐาน z ของกล่อง
+            weight (float): น้ำหนักของกล่อง
+            max_load (float): น้ำหนักสูงสุดที่วางทับกล่องนี้ได้ (None = ไม่จำกัด)
+            contacts (dict): {กล่องด้านล่าง: พื้นที่สัมผัส}
+        Returns:
+            int: หมายเลขของกล่องในกราฟ
+        """
+        shares = self._shares(contacts)
+        if weight > 0:
+            for node, delta in self._propagate(shares, weight):
+                self.load[node] += delta
+        self.base.append(base)
+        self.max_load.append(math.inf if max_load is None else max_load)
+        self.load.append(0.0)
+        self.below.append(shares)
+        return len(self.base) - 1
+
+    def overloaded(self):
+        """
+        Returns:
+            list: หมายเลขของกล่องที่รับน้ำหนักเกิน max_load (ควรเป็นรายการว่างเสมอ)
+        """
+        return [node for node, (load, limit) in enumerate(zip(self.load, self.max_load)) if load > limit + 1e-9]
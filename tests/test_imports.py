@@ -0,0 +1,12 @@
+import pytest
+
+from benchmark import IMPORT_MODULES, LAZY_MODULES, measure_import
+
+
+@pytest.mark.parametrize("module", IMPORT_MODULES)
+def test_entry_point_does_not_import_lazy_modules(module):
+    # import ใน interpreter ใหม่ จึงไม่ได้รับโมดูลที่ test อื่นโหลดไว้แล้ว
+    result = measure_import(module, repeats=1)
+
+    assert result["status"] == "ok", result
+    assert not set(result["lazy_modules_loaded"]) & set(LAZY_MODULES)
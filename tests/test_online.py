@@ -0,0 +1,68 @@
+import numpy as np
+
+from box import Box
+from online import OnlinePlanner
+from pallet import Pallet
+
+
+def _planner():
+    pallet = Pallet(106, 106, 135, frame_height=15)
+    return pallet, OnlinePlanner(pallet, 3, 3, 100, 100, 120, strategy="first_fit")
+
+
+def _expected_occupancy(placements):
+    expected = Pallet(106, 106, 135, frame_height=15)
+    for placement in placements:
+        expected.mark_space_occupied(*placement.position, 30, 40, 15)
+    return expected.occupancy_grid
+
+
+def test_same_box_placed_repeatedly_gets_separate_instances():
+    pallet, planner = _planner()
+    sku = Box("C12", 30, 40, 15, 100, 1, 1)
+    placements = [planner.place_next(sku) for _ in range(4)]
+
+    assert all(placement.position is not None for placement in placements)
+    assert len({id(box) for box in pallet.boxes}) == 4
+    assert len({box.position for box in pallet.boxes}) == 4
+    assert all(box is not sku for box in pallet.boxes)
+    assert sku.position is None
+    assert (sku.width, sku.length) == (30, 40)
+
+
+def test_undo_after_repeated_box_restores_occupancy():
+    pallet, planner = _planner()
+    sku = Box("C12", 30, 40, 15, 100, 1, 1)
+    placements = [planner.place_next(sku) for _ in range(4)]
+
+    undone = planner.undo_last()
+
+    assert undone is placements[-1]
+    assert pallet.boxes == [placement.box for placement in placements[:-1]]
+    assert [box.position for box in pallet.boxes] == [placement.position for placement in placements[:-1]]
+    assert np.array_equal(pallet.occupancy_grid, _expected_occupancy(placements[:-1]))
+    # ตำแหน่งที่ถูกยกเลิกต้องว่างให้วางชิ้นถัดไปได้อีกครั้ง
+    assert planner.place_next(sku).position == undone.position
+
+
+def test_best_fit_is_tried_again_after_a_slow_decision():
+    pallet = Pallet(106, 106, 135, frame_height=15)
+    planner = OnlinePlanner(pallet, 3, 3, 100, 100, 120, strategy="best_fit", latency_budget=1.0)
+    planner._cost["best_fit"] = 10.0  # เช่น การเรียกครั้งแรกที่ช้าเพราะยังไม่ warm
+    sku = Box("C12", 30, 40, 15, 100, 1, 1)
+
+    modes = [planner.place_next(sku).mode for _ in range(16)]
+
+    assert modes[0] == "first_fit"
+    assert "best_fit" in modes
+    assert modes[-1] == "best_fit"
+
+
+def test_best_position_stops_at_deadline():
+    pallet = Pallet(106, 106, 135, frame_height=15)
+    planner = OnlinePlanner(pallet, 3, 3, 100, 100, 120)
+    orientations = Box("C12", 30, 40, 15, 100, 1, 1).can_rotate()
+
+    # เลยเวลาแล้วตั้งแต่เริ่ม จึงประเมินเฉพาะแนวการหมุนแรก
+    assert planner.engine.best_position(orientations, deadline=0.0) == \
+        planner.engine.best_position(orientations[:1])
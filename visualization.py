@@ -1,44 +1,147 @@
 # visualization.py
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection, Line3DCollection
 
-def plot_pallet(pallet, containers=None, utilization=0, output_file="pallet_visualization.png"):
+# มุมมองที่บันทึกเป็นภาพ: ชื่อ -> (azim, elev)
+VIEWS = {
+    "front_left": (45, 30),
+    "front_right": (-45, 30),
+    "back_left": (135, 30),
+    "back_right": (-135, 30)
+}
+
+# จุดยอดของ 6 ด้านของกล่องขนาด 1x1x1 (ล่าง, บน, x=0, x=dx, y=0, y=dy)
+_UNIT_FACES = np.array([
+    [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)],
+    [(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)],
+    [(0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0)],
+    [(1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0)],
+    [(0, 0, 0), (0, 0, 1), (1, 0, 1), (1, 0, 0)],
+    [(0, 1, 0), (0, 1, 1), (1, 1, 1), (1, 1, 0)]
+], dtype=float)
+
+
+def box_faces(positions, dims):
+    """
+    สร้างจุดยอดของทุกด้านของกล่องทุกใบพร้อมกัน
+    Args:
+        positions (np.ndarray): ตำแหน่งมุมล่างของกล่อง ขนาด (n, 3)
+        dims (np.ndarray): ขนาดของกล่อง (width, length, height) ขนาด (n, 3)
+    Returns:
+        np.ndarray: จุดยอดของด้าน ขนาด (n * 6, 4, 3) เรียงด้านของกล่องเดียวกันติดกัน
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    dims = np.asarray(dims, dtype=float).reshape(-1, 3)
+    faces = positions[:, None, None, :] + _UNIT_FACES[None] * dims[:, None, None, :]
+    return faces.reshape(-1, 4, 3)
+
+
+def _box_arrays(boxes):
     """
-    วาดภาพพาเลทและกล่องที่วางอยู่บนพาเลท
+    แปลงรายการกล่องเป็น array ของตำแหน่ง ขนาด และสี
+    """
+    positions = np.array([box.position for box in boxes], dtype=float).reshape(-1, 3)
+    dims = np.array([(box.width, box.length, box.height) for box in boxes], dtype=float).reshape(-1, 3)
+    colors = np.array([box.color for box in boxes], dtype=float).reshape(-1, 3)
+    return positions, dims, colors
+
+
+def draw_pallet_frame(ax, pallet):
+    """
+    วาดโครงพาเลทลงบนกราฟ 3 มิติ
     Args:
+        ax (Axes3D): แกน 3 มิติ
         pallet (Pallet): พาเลทที่ต้องการวาด
-        containers (list): รายการตู้คอนเทนเนอร์ (ถ้ามี)
-        utilization (float): เปอร์เซ็นต์การใช้พื้นที่
-        output_file (str): ชื่อไฟล์สำหรับบันทึกภาพ
     """
-    fig = plt.figure(figsize=(12, 8))  # สร้างรูปภาพ
+    x, y, z = 0, 0, 0
+    dx, dy, dz = pallet.width, pallet.length, pallet.frame_height
+
+    # กำหนดจุดยอดของโครงพาเลท
+    vertices = np.array([
+        [x, y, z], [x + dx, y, z], [x + dx, y + dy, z], [x, y + dy, z],
+        [x, y, z + dz], [x + dx, y, z + dz], [x + dx, y + dy, z + dz], [x, y + dy, z + dz]
+    ])
+
+    # กำหนดขอบของโครงพาเลท
+    edges = [
+        [0, 1], [1, 2], [2, 3], [3, 0],  # ฐาน
+        [4, 5], [5, 6], [6, 7], [7, 4],  # ด้านบน
+        [0, 4], [1, 5], [2, 6], [3, 7]  # ขอบแนวตั้ง
+    ]
+
+    # วาดขอบของโครงพาเลทลงบนกราฟ
+    ax.add_collection3d(Line3DCollection(vertices[edges], color='black', linestyle='dashed', linewidth=2))
+
+
+def draw_container(ax, container, frame_height):
+    """
+    วาดตู้คอนเทนเนอร์ลงบนกราฟ 3 มิติ
+    Args:
+        ax (Axes3D): แกน 3 มิติ
+        container (Container): ตู้คอนเทนเนอร์ที่ต้องการวาด
+        frame_height (float): ความสูงของโครงพาเลท (หน่วย: เซนติเมตร)
+    """
+    x, y, z = container.x, container.y, frame_height  # กำหนดตำแหน่งเริ่มต้นของตู้คอนเทนเนอร์
+    dx, dy, dz = container.length, container.width, container.height  # กำหนดขนาดของตู้คอนเทนเนอร์
+
+    # กำหนดจุดยอดของตู้คอนเทนเนอร์
+    vertices = np.array([
+        [x, y, z], [x+dx, y, z], [x+dx, y+dy, z], [x, y+dy, z],
+        [x, y, z+dz], [x+dx, y, z+dz], [x+dx, y+dy, z+dz], [x, y+dy, z+dz]
+    ])
+
+    # กำหนดหน้าของตู้คอนเทนเนอร์
+    faces = [
+        [vertices[4], vertices[5], vertices[6], vertices[7]],  # ด้านบน
+        [vertices[0], vertices[1], vertices[2], vertices[3]],  # ฐาน
+        [vertices[0], vertices[1], vertices[5], vertices[4]],  # ด้านหน้า
+        [vertices[2], vertices[3], vertices[7], vertices[6]],  # ด้านหลัง
+        [vertices[1], vertices[2], vertices[6], vertices[5]],  # ด้านขวา
+        [vertices[0], vertices[3], vertices[7], vertices[4]]    # ด้านซ้าย
+    ]
+
+    # วาดหน้าของตู้คอนเทนเนอร์ลงบนกราฟ
+    ax.add_collection3d(Poly3DCollection(faces[1:], facecolor=container.color, alpha=container.alpha))  # 5 ด้านที่ไม่เปิด
+    ax.add_collection3d(Poly3DCollection([faces[0]], facecolor=container.color, alpha=0))  # เปิดด้านบน
+
+
+def draw_boxes(ax, boxes, labels=True):
+    """
+    วาดกล่องทั้งหมดเป็น Poly3DCollection เดียว
+    Args:
+        ax (Axes3D): แกน 3 มิติ
+        boxes (list): รายการกล่องที่วางแล้ว
+        labels (bool): แสดงชื่อกล่องบนกล่อง
+    """
+    if not boxes:
+        return
+    positions, dims, colors = _box_arrays(boxes)
+    ax.add_collection3d(Poly3DCollection(box_faces(positions, dims), facecolors=np.repeat(colors, 6, axis=0),
+                                         alpha=0.9, edgecolors='black', linewidths=1))
+    if labels:
+        centers = positions + dims / 2
+        for (cx, cy, cz), box in zip(centers, boxes):
+            ax.text(cx, cy, cz, box.box_type, color='black', fontsize=8, ha='center')
+
+
+def _build_axes(fig, pallet, containers, utilization, labels):
+    """
+    สร้างแกน 3 มิติพร้อมพาเลท ตู้คอนเทนเนอร์ กล่อง และจุด pickup บน fig
+    """
     ax = fig.add_subplot(111, projection='3d')  # สร้างแกน 3 มิติ
-    
-    pallet.draw_pallet_frame(ax)  # วาดโครงพาเลท
-    
+
+    draw_pallet_frame(ax, pallet)  # วาดโครงพาเลท
+
     if containers:
         for container in containers:
-            container.draw(ax, pallet.frame_height)  # วาดตู้คอนเทนเนอร์ (ถ้ามี)
-    
-    for box in pallet.boxes:  # วนลูปเพื่อวาดกล่องแต่ละใบ
-        x, y, z = box.position  # ตำแหน่งของกล่อง
-        dx, dy, dz = box.width, box.length, box.height  # ขนาดของกล่อง
-        
-        # กำหนดจุดยอดของกล่อง
-        verts = [
-            [(x, y, z), (x+dx, y, z), (x+dx, y+dy, z), (x, y+dy, z)],
-            [(x, y, z+dz), (x+dx, y, z+dz), (x+dx, y+dy, z+dz), (x, y+dy, z+dz)],
-            [(x, y, z), (x, y, z+dz), (x, y+dy, z+dz), (x, y+dy, z)],
-            [(x+dx, y, z), (x+dx, y, z+dz), (x+dx, y+dy, z+dz), (x+dx, y+dy, z)],
-            [(x, y, z), (x, y, z+dz), (x+dx, y, z+dz), (x+dx, y, z)],
-            [(x, y+dy, z), (x, y+dy, z+dz), (x+dx, y+dy, z+dz), (x+dx, y+dy, z)]
-        ]
-        
-        # วาดกล่องลงบนกราฟ
-        ax.add_collection3d(Poly3DCollection(verts, facecolors=box.color, alpha=0.9, edgecolors='black', linewidths=1))
-        # แสดงชื่อกล่องบนกล่อง
-        ax.text(x+dx/2, y+dy/2, z+dz/2, box.box_type, color='black', fontsize=8, ha='center')
+            draw_container(ax, container, pallet.frame_height)  # วาดตู้คอนเทนเนอร์ (ถ้ามี)
 
+    draw_boxes(ax, pallet.boxes, labels)
     add_volume_utilization_text(ax, utilization)  # Display utilization
     add_pickup_points(ax, pallet.boxes)  # Add pickup points
 
@@ -46,25 +149,89 @@ def plot_pallet(pallet, containers=None, utilization=0, output_file="pallet_visu
     ax.set_xlim([0, pallet.width])
     ax.set_ylim([0, pallet.length])
     ax.set_zlim([0, pallet.height])
-    
+
     # กำหนดชื่อแกน
     ax.set_xlabel('Width (X)')
     ax.set_ylabel('Length (Y)')
     ax.set_zlabel('Height (Z)')
-    
-    # Save images from four corners
-    views = {
-        "front_left": (45, 30),
-        "front_right": (-45, 30),
-        "back_left": (135, 30),
-        "back_right": (-135, 30)
-    }
-    for view_name, (azim, elev) in views.items():
+    return ax
+
+
+def _save_views(fig, ax, utilization, output_file, view_names):
+    """
+    บันทึกภาพจากแต่ละมุมมองใน view_names
+    Returns:
+        list: ชื่อไฟล์ภาพที่บันทึก
+    """
+    files = []
+    for view_name in view_names:
+        azim, elev = VIEWS[view_name]
         ax.view_init(elev=elev, azim=azim)
-        plt.title(f'Pallet Loading Visualization ({view_name.replace("_", " ").capitalize()} View)\nVolume Utilization: {utilization:.2f}%')
-        plt.savefig(f"{output_file.replace('.png', '')}_{view_name}.png")  # Save each view
+        ax.set_title(f'Pallet Loading Visualization ({view_name.replace("_", " ").capitalize()} View)\n'
+                     f'Volume Utilization: {utilization:.2f}%')
+        files.append(f"{output_file.replace('.png', '')}_{view_name}.png")
+        fig.savefig(files[-1])  # Save each view
+    return files
+
+
+def plot_pallet(pallet, containers=None, utilization=0, output_file="pallet_visualization.png", show=True,
+                labels=True):
+    """
+    วาดภาพพาเลทและกล่องที่วางอยู่บนพาเลท บันทึกภาพจากสี่มุม แล้วแสดงกราฟ
+    Args:
+        pallet (Pallet): พาเลทที่ต้องการวาด
+        containers (list): รายการตู้คอนเทนเนอร์ (ถ้ามี)
+        utilization (float): เปอร์เซ็นต์การใช้พื้นที่
+        output_file (str): ชื่อไฟล์สำหรับบันทึกภาพ
+        show (bool): แสดงกราฟหลังบันทึก (False = ปิดรูปทันที)
+        labels (bool): แสดงชื่อกล่องบนกล่อง
+    """
+    fig = plt.figure(figsize=(12, 8))  # สร้างรูปภาพ
+    ax = _build_axes(fig, pallet, containers, utilization, labels)
+    _save_views(fig, ax, utilization, output_file, VIEWS)
+    if show:
+        plt.show()  # แสดงกราฟ
+    else:
+        plt.close(fig)
+
+
+def _render(pallet, containers, utilization, output_file, view_names, labels):
+    """
+    วาดภาพแบบไม่ใช้หน้าจอ (Agg) โดยไม่ผ่าน pyplot จึงไม่เปลี่ยน backend และไม่ค้างรูปไว้ในหน่วยความจำ
+    """
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = _build_axes(fig, pallet, containers, utilization, labels)
+    return _save_views(fig, ax, utilization, output_file, view_names)
+
+
+def render_views(pallet, containers=None, utilization=0, output_file="pallet_visualization.png", views=None,
+                 labels=True, workers=1):
+    """
+    บันทึกภาพพาเลทจากหลายมุมมองแบบไม่ใช้หน้าจอ (เหมาะกับงาน batch)
+    Args:
+        pallet (Pallet): พาเลทที่ต้องการวาด
+        containers (list): รายการตู้คอนเทนเนอร์ (ถ้ามี)
+        utilization (float): เปอร์เซ็นต์การใช้พื้นที่
+        output_file (str): ชื่อไฟล์สำหรับบันทึกภาพ (เติมชื่อมุมมองต่อท้าย)
+        views (list): ชื่อมุมมองจาก VIEWS (ค่าเริ่มต้นคือทุกมุมมอง)
+        labels (bool): แสดงชื่อกล่องบนกล่อง
+        workers (int): จำนวน process ที่ใช้วาดมุมมองพร้อมกัน (1 = วาดใน process นี้)
+    Returns:
+        list: ชื่อไฟล์ภาพที่บันทึก เรียงตาม views
+    """
+    views = list(VIEWS) if views is None else list(views)
+    workers = max(1, min(workers or 1, len(views)))
+    if workers == 1:
+        return _render(pallet, containers, utilization, output_file, views, labels)
+    groups = [views[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render, pallet, containers, utilization, output_file, group, labels)
+                   for group in groups]
+        for future in futures:
+            future.result()  # ส่งต่อข้อผิดพลาดจาก worker
+    return [f"{output_file.replace('.png', '')}_{view_name}.png" for view_name in views]
 
-    plt.show()  # แสดงกราฟ
 
 def add_volume_utilization_text(ax, utilization):
     """
@@ -77,13 +244,13 @@ def add_volume_utilization_text(ax, utilization):
 
 def add_pickup_points(ax, boxes):
     """
-    แสดงจุด pickup บนกล่อง
+    แสดงจุด pickup (กึ่งกลางผิวบน) ของกล่องทุกใบด้วย scatter ครั้งเดียว
     Args:
         ax (Axes3D): แกน 3 มิติ
         boxes (list): รายการกล่อง
     """
-    for box in boxes:
-        x, y, z = box.position
-        dx, dy, dz = box.width, box.length, box.height
-        pickup_x, pickup_y, pickup_z = x + dx / 2, y + dy / 2, z + dz
-        ax.scatter(pickup_x, pickup_y, pickup_z, color='red', s=20, label='Pickup Point')
+    if not boxes:
+        return
+    positions, dims, _ = _box_arrays(boxes)
+    pickup = positions + dims * (0.5, 0.5, 1.0)
+    ax.scatter(pickup[:, 0], pickup[:, 1], pickup[:, 2], color='red', s=20, label='Pickup Point')